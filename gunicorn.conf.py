@@ -0,0 +1,87 @@
+"""gunicorn settings for production
+
+    gunicorn -c gunicorn.conf.py
+
+The app is preloaded in the master (unihub.wsgi warms its caches at
+import), so workers fork ready for traffic and share the loaded code and
+cached data copy-on-write. Workers are gthread: one process per CPU by
+default, each with half as many threads as its database pool has
+connections. A request holds one pooled connection for its duration and,
+while saving the session, briefly a second, so a full set of threads never
+waits on the pool. Set UNIHUB_DB_CONNECTIONS to the share of the server's
+max_connections this deployment may use and the worker count is capped to
+fit it.
+
+Environment: UNIHUB_BIND, UNIHUB_WORKERS, UNIHUB_THREADS,
+UNIHUB_DB_CONNECTIONS, UNIHUB_PIDFILE.
+
+Reloads. HUP re-reads this file and replaces workers gracefully, but with
+preload_app they fork from the code the master already loaded. To deploy
+new code without dropping a request:
+
+    OLD=$(cat $PIDFILE)
+    kill -USR2 $OLD   # new master loads and warms the new code, sharing the
+                      # listening socket; its pid is in $PIDFILE.2
+    kill -WINCH $OLD  # old workers finish in-flight requests and exit
+    kill -QUIT $OLD   # old master exits; the new one takes over $PIDFILE
+
+If the new master fails to boot, the old one is still serving; send it
+HUP to bring its workers back after WINCH.
+"""
+
+import os
+
+from unihub.app import app as _app
+
+
+def _env_int(name, default=None):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def worker_sizing(cpus, pool_size, connection_budget=None):
+    """(workers, threads) for gthread workers
+
+    One worker per CPU and one thread per two pooled connections; with a
+    connection budget, no more workers than budget // pool_size (at least 1).
+    """
+    workers = max(1, cpus)
+    if connection_budget:
+        workers = max(1, min(workers, connection_budget // pool_size))
+    return workers, max(1, pool_size // 2)
+
+
+wsgi_app = 'unihub.wsgi:app'
+bind = os.environ.get('UNIHUB_BIND', '0.0.0.0:8000')
+pidfile = os.environ.get('UNIHUB_PIDFILE', '/tmp/unihub-gunicorn.pid')
+preload_app = True
+
+worker_class = 'gthread'
+workers, threads = worker_sizing(os.cpu_count() or 1, _app.config['DB_POOL_MAX_SIZE'],
+                                 _env_int('UNIHUB_DB_CONNECTIONS'))
+workers = _env_int('UNIHUB_WORKERS', workers)
+threads = _env_int('UNIHUB_THREADS', threads)
+
+# Recycle workers to bound memory growth; replacements fork from the warm
+# master, so they start without cold caches
+max_requests = 5000
+max_requests_jitter = 500
+
+timeout = 30
+graceful_timeout = 30  # in-flight requests get this long on reload or shutdown
+keepalive = 5
+
+
+def post_fork(server, worker):
+    from unihub.warmup import warm_pool
+    
+    # The master closed its connections after warm-up; open this worker's own
+    warm_pool(_app)
+
+
+def when_ready(server):
+    from unihub.wsgi import warmup_report
+    
+    server.log.info('Warm-up: %s', warmup_report)
+    server.log.info('UniHub ready: %d gthread workers x %d threads, pool of %d per worker',
+                    workers, threads, _app.config['DB_POOL_MAX_SIZE'])
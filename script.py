@@ -128,6 +128,122 @@ DATABASE SCHEMA DESIGN FOR UNIHUB - UNIVERSITY STUDENT INFORMATION PORTAL
     - created_at (TIMESTAMP, DEFAULT CURRENT_TIMESTAMP)
     - is_active (BOOLEAN, DEFAULT TRUE)
 
+11. ATTENDANCE_SUMMARY TABLE (attendance_summary)
+    - student_id (INT, FOREIGN KEY -> students.student_id)
+    - subject_id (INT, FOREIGN KEY -> subjects.subject_id)
+    - present_count (INT, NOT NULL, DEFAULT 0)
+    - absent_count (INT, NOT NULL, DEFAULT 0)
+    - late_count (INT, NOT NULL, DEFAULT 0)
+    - PRIMARY KEY (student_id, subject_id)
+    - Maintained in the same transaction as every attendance insert, update
+      and delete; rebuild or verify with `flask attendance-summary`
+
+12. SEMESTER_GPA TABLE (semester_gpa)
+    - student_id (INT, FOREIGN KEY -> students.student_id)
+    - semester (INT, NOT NULL)
+    - weighted_points (DECIMAL(8,2), NOT NULL, DEFAULT 0)  -- SUM(grade_points * credits)
+    - credits (INT, NOT NULL, DEFAULT 0)
+    - gpa (DECIMAL(4,2), NOT NULL, DEFAULT 0)
+    - PRIMARY KEY (student_id, semester)
+
+13. STUDENT_CGPA TABLE (student_cgpa)
+    - student_id (INT, PRIMARY KEY, FOREIGN KEY -> students.student_id)
+    - weighted_points (DECIMAL(10,2), NOT NULL, DEFAULT 0)
+    - credits (INT, NOT NULL, DEFAULT 0)
+    - cgpa (DECIMAL(4,2), NOT NULL, DEFAULT 0)
+    - Both rollups are updated with every grade insert, update and delete;
+      rebuild or verify with `flask gpa-rollups`
+
+14. CACHE_VERSIONS TABLE (cache_versions)
+    - name (VARCHAR(50), PRIMARY KEY)  -- e.g. 'notifications'
+    - version (BIGINT, NOT NULL, DEFAULT 0)
+    - Bumped in the same transaction as the write it describes; cached
+      results are keyed by the version they were built from
+
+15. USER_SESSIONS TABLE (user_sessions)
+    - session_id (VARCHAR(64), PRIMARY KEY)  -- opaque ID, the only thing in the cookie
+    - user_id (INT, NULL, FOREIGN KEY -> users.user_id)
+    - data (VARCHAR(1024), NOT NULL)  -- compact JSON array of session keys
+    - expires_at (BIGINT, NOT NULL)  -- unix time, slides forward on use
+    - INDEX (user_id), INDEX (expires_at)
+
+16. STUDENT_CHANGES TABLE (student_changes)
+    - student_id (INT, PRIMARY KEY, FOREIGN KEY -> students.student_id)
+    - changed_at (TIMESTAMP, DEFAULT CURRENT_TIMESTAMP)
+    - Flagged by every attendance and grade write that changes a counter or
+      rollup; consumed by the incremental risk scoring run
+
+17. RISK_SCORE_RUNS TABLE (risk_score_runs)
+    - run_id (INT, PRIMARY KEY, AUTO_INCREMENT)
+    - started_at (TIMESTAMP, NOT NULL)
+    - finished_at (TIMESTAMP, NULL)
+    - mode (ENUM('full', 'incremental'), NOT NULL)
+    - students_scored (INT, NOT NULL, DEFAULT 0)
+
+18. RISK_SCORES TABLE (risk_scores)
+    - student_id (INT, PRIMARY KEY, FOREIGN KEY -> students.student_id)
+    - course_id (INT, FOREIGN KEY -> courses.course_id)
+    - attendance_pct (DECIMAL(5,2), NULL)
+    - latest_gpa (DECIMAL(4,2), NULL)
+    - gpa_trend (DECIMAL(5,2), NOT NULL, DEFAULT 0)  -- GPA change per semester
+    - arrears (DECIMAL(10,2), NOT NULL, DEFAULT 0)
+    - score (DECIMAL(5,2), NOT NULL)  -- 0-100
+    - risk_level (ENUM('Low', 'Medium', 'High'), NOT NULL)
+    - run_id (INT, FOREIGN KEY -> risk_score_runs.run_id)
+    - INDEX (risk_level, score); written by `flask score-risk`
+
+19. FEE_LEDGER TABLE (fee_ledger)
+    - student_id (INT, FOREIGN KEY -> students.student_id)
+    - fee_structure_id (INT, FOREIGN KEY -> fee_structure.fee_structure_id)
+    - course_id, semester, academic_year (copied from fee_structure)
+    - total_fee (DECIMAL(10,2), NOT NULL)
+    - paid (DECIMAL(10,2), NOT NULL, DEFAULT 0)  -- Completed payments only
+    - balance (DECIMAL(10,2), NOT NULL)  -- total_fee - paid
+    - PRIMARY KEY (student_id, fee_structure_id), INDEX (balance)
+    - Updated whenever a payment is recorded or changes status; rebuild or
+      verify with `flask fee-ledger`
+
+20. DISPATCH_JOBS TABLE (dispatch_jobs)
+    - job_id (INT, PRIMARY KEY, AUTO_INCREMENT)
+    - kind (ENUM('notification', 'fee_reminder'), NOT NULL)
+    - reference_id (INT, NULL)  -- admin_notifications.notification_id for notifications
+    - subject (VARCHAR(200), NOT NULL)
+    - status (ENUM('Queued', 'Running', 'Done', 'Failed'), DEFAULT 'Queued')
+    - recipients, sent, failed (INT, NOT NULL, DEFAULT 0)
+    - created_by (INT, FOREIGN KEY -> users.user_id)
+    - created_at (TIMESTAMP, DEFAULT CURRENT_TIMESTAMP)
+    - finished_at (TIMESTAMP, NULL)
+
+21. DISPATCH_DELIVERIES TABLE (dispatch_deliveries)
+    - job_id (INT, FOREIGN KEY -> dispatch_jobs.job_id)
+    - user_id (INT, FOREIGN KEY -> users.user_id)
+    - address (VARCHAR(100), NOT NULL)
+    - status (ENUM('Pending', 'Sent', 'Failed'), DEFAULT 'Pending')
+    - attempts (INT, NOT NULL, DEFAULT 0)
+    - last_error (VARCHAR(255), NULL)
+    - sent_at (TIMESTAMP, NULL)
+    - PRIMARY KEY (job_id, user_id), INDEX (job_id, status)
+    - Written once per recipient chunk; resuming a job skips Sent rows
+
+22. ATTENDANCE_CALENDAR TABLE (attendance_calendar)
+    - student_id (INT, FOREIGN KEY -> students.student_id)
+    - subject_id (INT, FOREIGN KEY -> subjects.subject_id)
+    - month (CHAR(7), NOT NULL)  -- 'YYYY-MM'
+    - present_days, absent_days, late_days (INT, NOT NULL, DEFAULT 0)
+      -- bitmaps, bit (day - 1) set for each day with that status
+    - PRIMARY KEY (student_id, subject_id, month)
+    - Maintained by every attendance write; rebuild or verify with
+      `flask attendance-calendar`
+
+23. STUDENT_VERSIONS TABLE (student_versions)
+    - student_id (INT, FOREIGN KEY -> students.student_id)
+    - scope (VARCHAR(20), NOT NULL)  -- attendance, grades, fees, internships, profile
+    - version (BIGINT, NOT NULL, DEFAULT 0)
+    - PRIMARY KEY (student_id, scope)
+    - Bumped by every write in the same transaction; /api/v1 ETags are
+      derived from it together with cache_versions ('student_data',
+      'notifications')
+
 KEY RELATIONSHIPS:
 ==================
 1. users -> students (One-to-One)
@@ -141,6 +257,18 @@ KEY RELATIONSHIPS:
 9. courses -> fee_structure (One-to-Many)
 10. students -> fee_payments (One-to-Many)
 11. fee_structure -> fee_payments (One-to-Many)
+12. students + subjects -> attendance_summary (One row per pair)
+13. students -> semester_gpa (One-to-Many)
+14. students -> student_cgpa (One-to-One)
+15. users -> user_sessions (One-to-Many)
+16. students -> student_changes (One-to-One, while a change is pending)
+17. students -> risk_scores (One-to-One)
+18. risk_score_runs -> risk_scores (One-to-Many)
+19. students + fee_structure -> fee_ledger (One row per pair)
+20. admin_notifications -> dispatch_jobs (One-to-Many)
+21. dispatch_jobs + users -> dispatch_deliveries (One row per pair)
+22. students + subjects -> attendance_calendar (One row per month)
+23. students -> student_versions (One row per scope)
 
 INDEXES FOR PERFORMANCE:
 ========================
@@ -148,6 +276,9 @@ INDEXES FOR PERFORMANCE:
 - Index on attendance.attendance_date
 - Index on grades.student_id, grades.semester
 - Index on fee_payments.student_id, fee_payments.payment_date
+- Index on attendance.student_id, attendance.attendance_date
+- Index on internships.student_id, internships.start_date
+- Histories are keyset-paginated on these indexes, with the primary key as tiebreaker
 - Index on users.email
 - Composite index on (subject_id, semester) in subjects table
 """
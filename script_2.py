@@ -55,7 +55,8 @@ KEY FLASK ROUTES & FUNCTIONALITY:
 1. LOGIN ROUTE (/login)
    - Validates enrollment number and password
    - Creates session on successful login
-   - Hashes passwords using SHA256
+   - Verifies passwords with scrypt on a bounded worker pool
+   - Upgrades legacy SHA256 hashes on the next successful login
    - Updates last login timestamp
 
 2. DASHBOARD ROUTE (/dashboard)
@@ -121,7 +122,7 @@ Step 4: Round to 2 decimal places
 
 SECURITY BEST PRACTICES:
 ========================
-1. Password Hashing: Use SHA256 for password storage
+1. Password Hashing: Use a salted KDF (scrypt) for password storage
 2. Session Management: Use Flask's secure session with secret key
 3. SQL Injection Prevention: Use parameterized queries
 4. CSRF Protection: Implement Flask-WTF for form protection
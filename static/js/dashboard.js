@@ -0,0 +1,53 @@
+/* Dashboard: refresh GPA and notifications from /api/v1/dashboard
+ *
+ * The browser revalidates with the ETag the API sends, so a refresh where
+ * nothing changed is a 304 with no body.
+ */
+
+(function () {
+    'use strict';
+
+    var REFRESH_MS = 60000;
+
+    function escapeHtml(text) {
+        var div = document.createElement('div');
+        div.textContent = text == null ? '' : String(text);
+        return div.innerHTML;
+    }
+
+    function render(data) {
+        var stats = document.querySelectorAll('.stats strong');
+        if (stats.length === 2) {
+            stats[0].textContent = data.gpa;
+            stats[1].textContent = data.cgpa;
+        }
+        var list = document.querySelector('.notifications');
+        if (!list) {
+            return;
+        }
+        if (!data.notifications.length) {
+            list.innerHTML = '<li>No notifications</li>';
+            return;
+        }
+        list.innerHTML = data.notifications.map(function (item) {
+            return '<li><strong>' + escapeHtml(item.title) + '</strong> &mdash; ' +
+                escapeHtml(item.content) + ' <small>' + escapeHtml(item.created_at) + '</small></li>';
+        }).join('');
+    }
+
+    function refresh() {
+        fetch('/api/v1/dashboard', {credentials: 'same-origin', cache: 'no-cache'})
+            .then(function (response) {
+                if (response.ok) {
+                    return response.json().then(render);
+                }
+            })
+            .catch(function () {});
+    }
+
+    setInterval(function () {
+        if (!document.hidden) {
+            refresh();
+        }
+    }, REFRESH_MS);
+})();
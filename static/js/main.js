@@ -0,0 +1,13 @@
+/* UniHub main script */
+
+(function () {
+    'use strict';
+
+    // Highlight the sidebar link for the current page
+    var links = document.querySelectorAll('.sidebar a');
+    for (var i = 0; i < links.length; i++) {
+        if (links[i].pathname === window.location.pathname) {
+            links[i].classList.add('active');
+        }
+    }
+})();
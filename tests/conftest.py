@@ -0,0 +1,116 @@
+"""Shared fixtures: the application on a fresh SQLite database per test"""
+
+import os
+
+# Read by unihub.app at import
+os.environ['UNIHUB_DATABASE_BACKEND'] = 'sqlite'
+os.environ.pop('UNIHUB_CACHE_REDIS_URL', None)
+os.environ.pop('UNIHUB_SESSION_BACKEND', None)
+
+import pytest
+
+from unihub import analytics, db
+from unihub.app import app as unihub_app
+from unihub.passwords import hash_password
+
+PASSWORD = 'correct horse'
+
+# A cheap KDF keeps fixtures fast; verification accepts any werkzeug method
+PASSWORD_HASH = hash_password(PASSWORD, 'pbkdf2:sha256:1000')
+
+
+@pytest.fixture
+def app(tmp_path):
+    """The application with its pool on an empty schema in tmp_path"""
+    backend = unihub_app.extensions['db_backend']
+    pool = unihub_app.extensions['db_pool']
+    pool.close()
+    backend.path = str(tmp_path / 'unihub.db')
+    conn = backend.connect()
+    backend.create_schema(conn)
+    conn.close()
+    
+    # Per-process caches and version checks must not leak between tests
+    unihub_app.extensions['caches'].clear()
+    for state in ('notifications_version', 'profiles_version'):
+        unihub_app.extensions.pop(state, None)
+    analytics.init_app(unihub_app)
+    unihub_app.config['TESTING'] = True
+    yield unihub_app
+    unihub_app.extensions['last_login_buffer'].flush()
+    pool.close()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def cursor(app):
+    """A cursor on the app context's pooled connection; tests commit what they need"""
+    with app.app_context():
+        yield db.get_cursor()
+
+
+def add_user(cursor, username, user_type='student', password_hash=PASSWORD_HASH):
+    """Insert a users row; returns its user_id"""
+    cursor.execute("""
+        INSERT INTO users (username, email, password_hash, user_type)
+        VALUES (%s, %s, %s, %s)
+    """, (username, f'{username}@unihub.test', password_hash, user_type))
+    return cursor.lastrowid
+
+
+def add_student(cursor, enrollment_number, course_id, semester=1):
+    """Insert a student with a login of their own; returns the student_id"""
+    user_id = add_user(cursor, enrollment_number.lower())
+    cursor.execute("""
+        INSERT INTO students
+            (user_id, enrollment_number, first_name, last_name, date_of_birth, gender,
+             course_id, semester, admission_date)
+        VALUES (%s, %s, 'Test', %s, '2005-01-01', 'Other', %s, %s, '2024-08-01')
+    """, (user_id, enrollment_number, enrollment_number, course_id, semester))
+    return cursor.lastrowid
+
+
+@pytest.fixture
+def school(app):
+    """One course with three first-semester subjects, a fee structure, two
+    students (EN1, EN2) and an admin user ('admin'); returns their IDs
+    """
+    with app.app_context():
+        cursor = db.get_cursor()
+        cursor.execute("""
+            INSERT INTO courses (course_code, course_name, department, duration_years, total_semesters)
+            VALUES ('BCS', 'Computer Science', 'Engineering', 4, 8)
+        """)
+        course_id = cursor.lastrowid
+        subject_ids = []
+        for number, credits in enumerate((4, 3, 2), start=1):
+            cursor.execute("""
+                INSERT INTO subjects (subject_code, subject_name, course_id, semester, credits)
+                VALUES (%s, %s, %s, 1, %s)
+            """, (f'CS10{number}', f'Subject {number}', course_id, credits))
+            subject_ids.append(cursor.lastrowid)
+        cursor.execute("""
+            INSERT INTO fee_structure
+                (course_id, semester, tuition_fee, library_fee, lab_fee, total_fee, academic_year)
+            VALUES (%s, 1, 40000, 2000, 3000, 45000, '2024-25')
+        """, (course_id,))
+        fee_structure_id = cursor.lastrowid
+        ids = {
+            'course_id': course_id,
+            'subject_ids': subject_ids,
+            'fee_structure_id': fee_structure_id,
+            'student_id': add_student(cursor, 'EN1', course_id),
+            'other_student_id': add_student(cursor, 'EN2', course_id),
+            'admin_user_id': add_user(cursor, 'admin', 'admin'),
+        }
+        db.commit()
+    return ids
+
+
+def login(client, identifier, password=PASSWORD):
+    """POST the login form"""
+    return client.post('/login', data={'enrollment_number': identifier, 'password': password})
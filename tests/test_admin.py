@@ -0,0 +1,30 @@
+from conftest import login
+
+
+def test_admin_signs_in_and_reaches_the_admin_panel(client, school):
+    response = login(client, 'admin')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/admin/')
+    
+    index = client.get('/admin/')
+    assert index.status_code == 200
+    assert index.get_json()['user_id'] == school['admin_user_id']
+    assert client.get('/admin/fees/defaulters').status_code == 200
+    # Admins have no student pages
+    assert client.get('/dashboard').status_code == 302
+
+
+def test_students_are_refused_the_admin_panel(client, school):
+    login(client, 'EN1')
+    assert client.get('/admin/').status_code == 403
+    assert client.get('/admin/fees/defaulters').status_code == 403
+
+
+def test_admin_panel_requires_a_sign_in(client, school):
+    assert client.get('/admin/').status_code == 401
+
+
+def test_admin_wrong_password_is_refused(client, school):
+    assert login(client, 'admin', 'wrong').status_code == 200
+    assert client.get('/admin/').status_code == 401
+
@@ -0,0 +1,65 @@
+import pytest
+
+from conftest import login
+from unihub import analytics, db
+
+
+def add_attendance(cursor, student_id, subject_id, day, status, created_at):
+    cursor.execute("""
+        INSERT INTO attendance (student_id, subject_id, attendance_date, status, created_at)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (student_id, subject_id, day, status, created_at))
+    db.commit()
+
+
+def test_refresh_reads_only_rows_from_the_watermark(app, cursor, school):
+    student, subject = school['student_id'], school['subject_ids'][0]
+    add_attendance(cursor, student, subject, '2024-08-05', 'Present', '2024-08-05 09:00:00')
+    add_attendance(cursor, student, subject, '2024-08-06', 'Absent', '2024-08-06 09:00:00')
+    snapshots = analytics.get_analytics(refresh=True)
+    assert len(snapshots.attendance.frame) == 2
+    assert str(snapshots.attendance.watermark) == '2024-08-06 09:00:00'
+    
+    add_attendance(cursor, student, subject, '2024-08-07', 'Late', '2024-08-07 09:00:00')
+    counts = snapshots.refresh()
+    # The row at the old watermark is read again but kept once
+    assert counts['attendance'] == 2
+    assert sorted(snapshots.attendance.frame['attendance_id']) == [1, 2, 3]
+    assert str(snapshots.attendance.watermark) == '2024-08-07 09:00:00'
+    
+    assert snapshots.refresh()['attendance'] == 1
+    assert snapshots.refresh(full=True)['attendance'] == 3
+
+
+def test_changes_in_place_wait_for_the_full_reload(app, cursor, school):
+    student, subject = school['student_id'], school['subject_ids'][0]
+    add_attendance(cursor, student, subject, '2024-08-05', 'Present', '2024-08-05 09:00:00')
+    add_attendance(cursor, student, subject, '2024-08-06', 'Present', '2024-08-06 09:00:00')
+    snapshots = analytics.get_analytics(refresh=True)
+    cursor.execute("UPDATE attendance SET status = 'Absent' WHERE attendance_id = 1")
+    db.commit()
+    
+    snapshots.refresh()
+    assert snapshots.attendance_percentages()['value'].tolist() == [100.0]
+    snapshots.full_reload = 0
+    snapshots.refresh()
+    assert snapshots.attendance_percentages()['value'].tolist() == [50.0]
+
+
+def test_cohort_report_over_the_admin_api(app, client, cursor, school):
+    first, other = school['student_id'], school['other_student_id']
+    subject = school['subject_ids'][0]
+    for day, status in (('2024-08-05', 'Present'), ('2024-08-06', 'Absent')):
+        add_attendance(cursor, first, subject, day, 'Present', f'{day} 09:00:00')
+        add_attendance(cursor, other, subject, day, status, f'{day} 09:00:00')
+    login(client, 'admin')
+    
+    report = client.get('/admin/analytics/attendance').get_json()
+    assert report['by'] == ['course_id', 'semester', 'subject_id']
+    [cohort] = report['cohorts']
+    assert (cohort['subject_id'], cohort['count'], cohort['mean']) == (subject, 2, 75.0)
+    assert sum(cohort['histogram']) == 2
+    assert cohort['histogram'][5] == cohort['histogram'][-1] == 1
+    
+    with app.app_context(), pytest.raises(ValueError):
+        analytics.cohort_report('attendance', by=['status'])
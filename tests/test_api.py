@@ -0,0 +1,84 @@
+import pytest
+
+from conftest import login
+from unihub import db
+from unihub.attendance import mark_attendance
+from unihub.fees import update_fee_structure
+from unihub.internships import add_internship, set_internship_status
+
+
+def test_conditional_get_until_the_data_changes(app, client, school):
+    login(client, 'EN1')
+    first = client.get('/api/v1/attendance')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    
+    again = client.get('/api/v1/attendance', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert again.data == b''
+    
+    with app.app_context():
+        mark_attendance(db.get_cursor(), school['student_id'], school['subject_ids'][0],
+                        '2024-08-05', 'Present')
+        db.commit()
+    changed = client.get('/api/v1/attendance', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['totals']['present'] == 1
+
+
+def test_etag_ignores_other_students_writes(app, client, school):
+    login(client, 'EN1')
+    etag = client.get('/api/v1/attendance').headers['ETag']
+    with app.app_context():
+        mark_attendance(db.get_cursor(), school['other_student_id'], school['subject_ids'][0],
+                        '2024-08-05', 'Present')
+        db.commit()
+    assert client.get('/api/v1/attendance', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_api_requires_a_student_session(client):
+    assert client.get('/api/v1/attendance').status_code == 401
+
+
+def test_internship_writes_change_the_etag(app, client, school):
+    login(client, 'EN1')
+    etag = client.get('/api/v1/internships').headers['ETag']
+    with app.app_context():
+        internship_id = add_internship(db.get_cursor(), school['student_id'], 'Acme', 'Intern',
+                                       '2024-05-01', '2024-07-01', 2)
+        db.commit()
+    added = client.get('/api/v1/internships', headers={'If-None-Match': etag})
+    assert added.status_code == 200
+    assert added.get_json()['internships'][0]['status'] == 'Ongoing'
+    assert added.get_json()['totals'] == {'internships': 1, 'total_credits': 0}
+    
+    with app.app_context():
+        assert set_internship_status(db.get_cursor(), internship_id, 'Completed', credits_earned=4)
+        db.commit()
+    completed = client.get('/api/v1/internships', headers={'If-None-Match': added.headers['ETag']})
+    assert completed.status_code == 200
+    assert completed.get_json()['internships'][0]['credits_earned'] == 4
+
+
+def test_fee_structure_edits_change_the_fees_etag(app, client, school):
+    login(client, 'EN1')
+    etag = client.get('/api/v1/fees').headers['ETag']
+    with app.app_context():
+        update_fee_structure(db.get_cursor(), school['fee_structure_id'], 50000)
+        db.commit()
+    edited = client.get('/api/v1/fees', headers={'If-None-Match': etag})
+    assert edited.status_code == 200
+    assert edited.get_json()['fee_structure']['total_fee'] == 50000
+
+
+@pytest.mark.parametrize('path', ['/api/v1/dashboard', '/api/v1/grades', '/api/v1/fees',
+                                  '/dashboard', '/grades', '/fees'])
+def test_missing_profile_is_not_found(app, client, cursor, school, path):
+    login(client, 'EN1')
+    # A student whose course is gone has no profile row
+    cursor.execute('UPDATE students SET course_id = NULL WHERE student_id = %s',
+                   (school['student_id'],))
+    db.commit()
+    assert client.get(path).status_code == 404
@@ -0,0 +1,75 @@
+import asyncio
+from urllib.parse import urlencode
+
+import pytest
+
+from conftest import PASSWORD
+from unihub.asgi import PortalASGI, _read_body
+
+
+def messages(*chunks):
+    """An ASGI receive callable delivering chunks as one streamed body"""
+    queue = [{'type': 'http.request', 'body': chunk, 'more_body': number < len(chunks) - 1}
+             for number, chunk in enumerate(chunks)]
+    
+    async def receive():
+        return queue.pop(0)
+    return receive
+
+
+def request(portal, method, path, chunks=(), headers=()):
+    """Run one HTTP request through the ASGI app; returns (status, headers, body)"""
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method, 'path': path,
+        'query_string': b'', 'root_path': '', 'scheme': 'http',
+        'headers': [(name.encode(), value.encode()) for name, value in headers],
+    }
+    sent = []
+    
+    async def send(message):
+        sent.append(message)
+    
+    async def run():
+        await portal(scope, messages(*chunks) if chunks else messages(b''), send)
+        if portal.pool is not None:
+            await portal.pool.close()
+    asyncio.run(run())
+    start = sent[0]
+    return (start['status'], {name.decode(): value.decode() for name, value in start['headers']},
+            b''.join(message.get('body', b'') for message in sent[1:]))
+
+
+@pytest.fixture
+def portal(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SQLITE_PATH', app.extensions['db_backend'].path)
+    portal = PortalASGI(app)
+    yield portal
+    portal.executor.shutdown()
+
+
+def test_large_bodies_are_spooled_to_disk():
+    chunks = [bytes([number]) * 1000 for number in range(5)]
+    body = asyncio.run(_read_body(messages(*chunks), max_memory=2048))
+    assert body._rolled
+    assert body.read() == b''.join(chunks)
+    body.close()
+    
+    small = asyncio.run(_read_body(messages(b'a=1'), max_memory=2048))
+    assert not small._rolled
+    assert small.read() == b'a=1'
+
+
+def test_streamed_form_reaches_flask_and_async_views_render(portal, school, monkeypatch):
+    monkeypatch.setitem(portal.app.config, 'ASGI_BODY_MEMORY_SIZE', 16)
+    form = urlencode({'enrollment_number': 'EN1', 'password': PASSWORD}).encode()
+    status, headers, _ = request(
+        portal, 'POST', '/login', [form[:10], form[10:]],
+        [('content-type', 'application/x-www-form-urlencoded'),
+         ('content-length', str(len(form)))])
+    assert status == 302
+    assert headers['location'].endswith('/dashboard')
+    
+    cookie = headers['set-cookie'].split(';', 1)[0]
+    status, _, body = request(portal, 'GET', '/fees', headers=[('cookie', cookie)])
+    assert status == 200
+    assert b'45000' in body
@@ -0,0 +1,119 @@
+from conftest import login
+from unihub import db
+from unihub.attendance import (delete_attendance, get_attendance_summary, get_month_calendar,
+                               get_subject_summaries, get_summary, mark_attendance,
+                               mark_attendance_batch, rebuild_calendar, rebuild_summary,
+                               summarize, verify_calendar, verify_summary)
+
+
+def assert_consistent(cursor):
+    assert verify_summary(cursor) == []
+    assert verify_calendar(cursor) == []
+
+
+def test_mark_update_and_delete_keep_counters_and_calendar(cursor, school):
+    student, subject = school['student_id'], school['subject_ids'][0]
+    mark_attendance(cursor, student, subject, '2024-08-05', 'Present')
+    mark_attendance(cursor, student, subject, '2024-08-06', 'Absent')
+    mark_attendance(cursor, student, subject, '2024-08-07', 'Present')
+    assert_consistent(cursor)
+    
+    # Same status again, then a change of status
+    mark_attendance(cursor, student, subject, '2024-08-05', 'Present', remarks='on time')
+    mark_attendance(cursor, student, subject, '2024-08-06', 'Late')
+    assert_consistent(cursor)
+    assert get_summary(cursor, student, subject) == summarize(2, 0, 1)
+    
+    assert delete_attendance(cursor, student, subject, '2024-08-07')
+    assert not delete_attendance(cursor, student, subject, '2024-08-07')
+    assert_consistent(cursor)
+    assert get_summary(cursor, student, subject) == summarize(1, 0, 1)
+    
+    calendar = get_month_calendar(cursor, student, '2024-08')
+    assert [entry['summary'] for entry in calendar] == [summarize(1, 0, 1)]
+
+
+def test_batch_upsert_keeps_counters_and_calendar(cursor, school):
+    student, other = school['student_id'], school['other_student_id']
+    first, second = school['subject_ids'][:2]
+    mark_attendance(cursor, student, first, '2024-08-05', 'Absent')
+    
+    written = mark_attendance_batch(cursor, [
+        (student, first, '2024-08-05', 'Present', None, None),
+        (student, first, '2024-08-06', 'Absent', None, None),
+        (student, second, '2024-08-06', 'Late', None, None),
+        (other, first, '2024-08-06', 'Present', None, None),
+        # A repeated key: the last record wins
+        (other, first, '2024-08-06', 'Absent', None, None),
+    ])
+    assert written == 4
+    assert_consistent(cursor)
+    assert get_summary(cursor, student, first) == summarize(1, 1, 0)
+    assert get_summary(cursor, other, first) == summarize(0, 1, 0)
+    
+    # Rewriting rows with unchanged statuses moves no counters
+    mark_attendance_batch(cursor, [(student, first, '2024-08-06', 'Absent', None, 'again')])
+    assert_consistent(cursor)
+    assert get_summary(cursor, student, first) == summarize(1, 1, 0)
+
+
+def test_rebuild_matches_maintained_values(cursor, school):
+    student = school['student_id']
+    for day, status in (('2024-08-05', 'Present'), ('2024-08-06', 'Late'),
+                        ('2024-09-02', 'Absent')):
+        for subject in school['subject_ids']:
+            mark_attendance(cursor, student, subject, day, status)
+    delete_attendance(cursor, student, school['subject_ids'][0], '2024-09-02')
+    db.commit()
+    
+    def snapshot():
+        cursor.execute('SELECT * FROM attendance_summary ORDER BY student_id, subject_id')
+        summary = cursor.fetchall()
+        cursor.execute("""
+            SELECT student_id, subject_id, month, present_days, absent_days, late_days
+            FROM attendance_calendar
+            WHERE present_days | absent_days | late_days != 0
+            ORDER BY student_id, subject_id, month
+        """)
+        return summary, cursor.fetchall()
+    
+    maintained = snapshot()
+    rebuild_summary(cursor)
+    rebuild_calendar(cursor)
+    assert snapshot() == maintained
+
+
+def test_page_and_api_list_the_same_subjects(client, cursor, school):
+    student = school['student_id']
+    kept, emptied = school['subject_ids'][:2]
+    mark_attendance(cursor, student, kept, '2024-08-05', 'Present')
+    mark_attendance(cursor, student, emptied, '2024-08-05', 'Absent')
+    # Leaves a counter row with a zero total
+    delete_attendance(cursor, student, emptied, '2024-08-05')
+    db.commit()
+    
+    login(client, 'EN1')
+    page = client.get('/attendance').get_data(as_text=True)
+    subjects = client.get('/api/v1/attendance').get_json()['subjects']
+    assert [subject['subject_code'] for subject in subjects] == ['CS101']
+    assert 'CS101' in page and 'CS102' not in page
+
+
+def test_summary_for_many_students_in_one_query(cursor, school):
+    student, other = school['student_id'], school['other_student_id']
+    first, second = school['subject_ids'][:2]
+    mark_attendance_batch(cursor, [
+        (student, first, '2024-08-05', 'Present', None, None),
+        (student, second, '2024-08-05', 'Late', None, None),
+        (other, first, '2024-08-05', 'Absent', None, None),
+    ])
+    
+    summary = get_attendance_summary(cursor, [student, other, 999])
+    assert summary[student] == get_subject_summaries(cursor, student)
+    assert summary[other] == get_subject_summaries(cursor, other)
+    assert summary[999] == []
+    
+    only_second = get_attendance_summary(cursor, [student, other], second)
+    assert [subject['subject_code'] for subject in only_second[student]] == ['CS102']
+    assert only_second[other] == []
+    assert get_attendance_summary(cursor, []) == {}
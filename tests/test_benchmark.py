@@ -0,0 +1,86 @@
+import copy
+import sqlite3
+
+from conftest import PASSWORD_HASH, login
+from unihub import db
+from unihub.benchmark import (MIN_SAMPLES, check_results, combine_runs, compare, prepare_database,
+                              seed_database)
+from unihub.fees import verify_ledger
+
+
+def figures(rps=100.0, p50=10.0, p95=20.0, requests=MIN_SAMPLES, errors=0, queries=4.0):
+    return {'requests': requests, 'errors': errors, 'seconds': requests / rps, 'rps': rps,
+            'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p95 * 1.5, 'queries_per_request': queries}
+
+
+def results(**route):
+    """A one-stage run with a single /fees route"""
+    return {
+        'version': 1,
+        'settings': {'students': 10, 'stages': [8]},
+        'environment': {'cpus': 4},
+        'stages': [dict(figures(), concurrency=8, routes={'/fees': figures(**route)})],
+    }
+
+
+def dump(path, table, order):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f'SELECT * FROM {table} ORDER BY {order}').fetchall()
+    finally:
+        conn.close()
+
+
+def test_seeded_cohort_is_reproducible(tmp_path):
+    first, second = str(tmp_path / 'first.db'), str(tmp_path / 'second.db')
+    counts = prepare_database(first, 8, 5, seed=3, password_method='pbkdf2:sha256:1000')
+    assert prepare_database(second, 8, 5, seed=3, password_method='pbkdf2:sha256:1000') == counts
+    assert counts['students'] == 8 and counts['attendance'] > 0
+    for table, order in (('attendance', 'attendance_id'), ('grades', 'grade_id'),
+                         ('fee_payments', 'payment_id'),
+                         ('fee_ledger', 'student_id, fee_structure_id')):
+        assert dump(first, table, order) == dump(second, table, order)
+
+
+def test_seeded_students_can_sign_in_and_read_pages(client, cursor):
+    counts = seed_database(cursor, students=4, days=5, password_hash=PASSWORD_HASH)
+    assert verify_ledger(cursor) == []
+    db.commit()
+    assert counts['students'] == 4
+    
+    assert login(client, 'BN00001').status_code == 302
+    for path in ('/dashboard', '/attendance', '/grades', '/fees', '/internships'):
+        assert client.get(path).status_code == 200
+
+
+def test_combined_runs_sum_counts_and_take_medians():
+    runs = [dict(figures(rps=rps, p95=p95), routes={'/fees': figures(rps=rps, p95=p95)})
+            for rps, p95 in ((90.0, 30.0), (100.0, 10.0), (120.0, 20.0))]
+    combined = combine_runs(runs)
+    assert (combined['requests'], combined['rps'], combined['p95_ms']) == (
+        3 * MIN_SAMPLES, 100.0, 20.0)
+    assert combined['routes']['/fees']['p95_ms'] == 20.0
+
+
+def test_compare_reports_regressions_only():
+    baseline = results()
+    assert compare(baseline, copy.deepcopy(baseline)) == []
+    # Within the tolerance, or too few samples to judge
+    assert compare(baseline, results(p95=24.0)) == []
+    assert compare(results(requests=10), results(requests=10, p95=100.0)) == []
+    
+    assert compare(baseline, results(p95=40.0)) == ['c=8 /fees: p95 40.0 ms, baseline 20.0 ms']
+    assert compare(baseline, results(queries=6.0)) == [
+        'c=8 /fees: 6.0 queries per request, baseline 4.0']
+    
+    other = results()
+    other['settings']['students'] = 20
+    assert compare(baseline, other) == ["settings differ from the baseline's: students"]
+
+
+def test_check_results_flags_errors_and_the_budget():
+    assert check_results(results()) == []
+    assert check_results(results(errors=2, p95=2500.0)) == [
+        f'c=8 /fees: 2 of {MIN_SAMPLES} requests failed',
+        'c=8 /fees: p95 2500 ms exceeds the 2000 ms budget',
+    ]
@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+
+from flask import Flask, url_for
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from unihub import assets
+from unihub.compression import CompressionMiddleware
+
+
+def wsgi_app(body, mimetype='application/json', etag=None, **headers):
+    """A WSGI app that serves body (bytes, or a list of chunks to stream)"""
+    def application(environ, start_response):
+        if isinstance(body, list):
+            response = Response(iter(body), mimetype=mimetype, headers=headers)
+        else:
+            response = Response(body, mimetype=mimetype, headers=headers)
+        if etag:
+            response.set_etag(etag)
+            response.make_conditional(environ)
+        return response(environ, start_response)
+    return application
+
+
+def get(app, **headers):
+    return Client(CompressionMiddleware(app, min_size=100)).get(
+        '/', headers={'Accept-Encoding': 'gzip', **headers})
+
+
+def test_large_responses_are_gzipped_with_a_suffixed_etag():
+    body = json.dumps({'rows': list(range(200))}).encode()
+    response = get(wsgi_app(body, etag='abc'))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['ETag'] == '"abc-gzip"'
+    assert gzip.decompress(response.get_data()) == body
+    
+    again = get(wsgi_app(body, etag='abc'), **{'If-None-Match': '"abc-gzip"'})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == '"abc-gzip"'
+
+
+def test_streamed_responses_are_compressed_chunk_by_chunk():
+    chunks = [b'row,%d\r\n' % number for number in range(50)]
+    response = get(wsgi_app(chunks, mimetype='text/csv'))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == b''.join(chunks)
+
+
+def test_small_encoded_and_binary_responses_pass_through():
+    small = get(wsgi_app(b'{"ok": true}'))
+    assert 'Content-Encoding' not in small.headers
+    assert small.get_data() == b'{"ok": true}'
+    
+    encoded = get(wsgi_app(gzip.compress(b'x' * 500), **{'Content-Encoding': 'gzip'}))
+    assert gzip.decompress(encoded.get_data()) == b'x' * 500
+    
+    image = get(wsgi_app(b'\x89PNG' * 100, mimetype='image/png'))
+    assert 'Content-Encoding' not in image.headers
+    
+    plain = Client(CompressionMiddleware(wsgi_app(b'x' * 500), min_size=100)).get('/')
+    assert 'Content-Encoding' not in plain.headers
+
+
+def test_built_assets_are_hashed_minified_and_precompressed(tmp_path):
+    static = tmp_path / 'static'
+    os.makedirs(static / 'css')
+    (static / 'css' / 'style.css').write_text(
+        '/* layout */\nbody {\n    margin: 0;\n}\n' + '.row { padding: 1px; }\n' * 50)
+    
+    built = assets.build(str(static))
+    entry = built['css/style.css']
+    assert entry['file'].startswith('css/style.') and entry['file'].endswith('.css')
+    assert 'gzip' in entry['encodings']
+    minified = (static / 'dist' / entry['file']).read_text()
+    assert '/*' not in minified and minified.startswith('body{margin:')
+    
+    app = Flask(__name__, static_folder=str(static))
+    assets.init_app(app)
+    with app.test_request_context():
+        url = url_for('static', filename='css/style.css')
+    assert url == '/static/dist/' + entry['file']
+    
+    response = app.test_client().get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert gzip.decompress(response.get_data()).decode() == minified
+    response.close()
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from unihub.backends import translate_sql
+from unihub.db import ConnectionPool, PoolTimeout
+from unihub.warmup import warm_pool, warm_up
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def ping(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_reuses_released_connections():
+    pool = ConnectionPool(FakeConnection, min_size=0, max_size=2, timeout=0.1)
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    stats = pool.stats()
+    assert (stats['created'], stats['checkouts'], stats['in_use']) == (1, 2, 1)
+
+
+def test_pool_checkout_times_out_when_exhausted():
+    pool = ConnectionPool(FakeConnection, min_size=0, max_size=2, timeout=0.05)
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    stats = pool.stats()
+    assert (stats['waits'], stats['timeouts'], stats['in_use']) == (1, 1, 2)
+    
+    # A release wakes a waiting checkout
+    threading.Timer(0.02, pool.release, (held[0],)).start()
+    pool.timeout = 1.0
+    assert pool.acquire() is held[0]
+
+
+def test_pool_discard_frees_the_slot():
+    pool = ConnectionPool(FakeConnection, min_size=0, max_size=1, timeout=0.05)
+    conn = pool.acquire()
+    pool.release(conn, discard=True)
+    assert conn.closed
+    assert pool.acquire() is not conn
+    assert pool.stats()['size'] == 1
+
+
+def test_pool_sizes_are_validated():
+    with pytest.raises(ValueError):
+        ConnectionPool(FakeConnection, min_size=3, max_size=2)
+
+
+@pytest.mark.parametrize('mysql, sqlite', [
+    ('SELECT * FROM users WHERE user_id = %s', 'SELECT * FROM users WHERE user_id = ?'),
+    ('UPDATE users SET last_login = NOW()', 'UPDATE users SET last_login = CURRENT_TIMESTAMP'),
+    ('INSERT IGNORE INTO fee_ledger (student_id) VALUES (%s)',
+     'INSERT OR IGNORE INTO fee_ledger (student_id) VALUES (?)'),
+    ('SELECT status FROM attendance WHERE student_id = %s FOR UPDATE',
+     'SELECT status FROM attendance WHERE student_id = ?'),
+])
+def test_translate_simple_rewrites(mysql, sqlite):
+    assert translate_sql(mysql) == sqlite
+
+
+def test_translate_upsert_uses_the_table_conflict_key():
+    sql = translate_sql("""
+        INSERT INTO attendance_summary (student_id, subject_id, present_count)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE present_count = present_count + VALUES(present_count)
+    """)
+    assert 'ON CONFLICT (student_id, subject_id) DO UPDATE SET' in sql
+    assert 'present_count + excluded.present_count' in sql
+
+
+def test_translate_insert_select_upsert_gets_a_where():
+    sql = translate_sql("""
+        INSERT INTO student_cgpa (student_id, weighted_points, credits, cgpa)
+        SELECT student_id, 0, 0, 0 FROM students
+        ON DUPLICATE KEY UPDATE cgpa = VALUES(cgpa)
+    """)
+    assert 'FROM students WHERE true ON CONFLICT (student_id)' in ' '.join(sql.split())
+
+
+def test_translate_upsert_into_unknown_table_fails():
+    with pytest.raises(ValueError):
+        translate_sql('INSERT INTO nowhere (a) VALUES (%s) ON DUPLICATE KEY UPDATE a = VALUES(a)')
+
+
+def test_workers_open_min_size_connections_after_warm_up(app):
+    pool = app.extensions['db_pool']
+    warm_up(app)
+    # Nothing is left open to be inherited across a fork
+    assert pool.stats()['size'] == 0
+    
+    assert warm_pool(app) == app.config['DB_POOL_MIN_SIZE'] > 0
+    stats = pool.stats()
+    assert (stats['idle'], stats['in_use']) == (stats['min_size'], 0)
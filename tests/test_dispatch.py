@@ -0,0 +1,82 @@
+import pytest
+
+from unihub import db, dispatch
+from unihub.notifications import post_notification
+from unihub.smtp_sink import SMTPSink
+
+
+@pytest.fixture
+def sink(app, monkeypatch):
+    """Local SMTP sink the app's mailer delivers to, one sender, no retries"""
+    with SMTPSink(port=0, keep=True) as sink:
+        host, port = sink.address
+        for name, value in (('MAIL_SERVER', host), ('MAIL_PORT', port), ('MAIL_POOL_SIZE', 1),
+                            ('MAIL_MAX_ATTEMPTS', 1), ('DISPATCH_CHUNK_SIZE', 1)):
+            monkeypatch.setitem(app.config, name, value)
+        yield sink
+
+
+def queue_notification(cursor, school):
+    notification_id = post_notification(cursor, 'Exams', 'Timetable is out', 'Circular',
+                                        school['admin_user_id'], target_audience='Students')
+    job_id = dispatch.create_job(cursor, 'notification', 'Exams', notification_id,
+                                 school['admin_user_id'])
+    db.commit()
+    return job_id
+
+
+def deliveries(cursor, job_id):
+    cursor.execute("""
+        SELECT address, status, attempts FROM dispatch_deliveries
+        WHERE job_id = %s ORDER BY user_id
+    """, (job_id,))
+    return [(row['address'], row['status'], row['attempts']) for row in cursor.fetchall()]
+
+
+def test_job_reports_progress_per_chunk_and_is_not_resent(cursor, school, sink):
+    job_id = queue_notification(cursor, school)
+    progress = []
+    job = dispatch.run_job(job_id, progress=lambda counters: progress.append(dict(counters)))
+    assert [counters['recipients'] for counters in progress] == [1, 2]
+    assert (job['status'], job['recipients'], job['sent'], job['failed']) == ('Done', 2, 2, 0)
+    assert sink.received == 2
+    assert b'Timetable is out' in sink.messages[0][2]
+    assert deliveries(cursor, job_id) == [('en1@unihub.test', 'Sent', 1),
+                                          ('en2@unihub.test', 'Sent', 1)]
+    
+    # A rerun (e.g. after a restart) skips everyone already Sent
+    job = dispatch.run_job(job_id)
+    assert (job['status'], job['sent']) == ('Done', 2)
+    assert sink.received == 2
+
+
+def test_failed_deliveries_are_retried_on_the_next_run(cursor, school, sink):
+    job_id = queue_notification(cursor, school)
+    sink.fail_every = 2
+    job = dispatch.run_job(job_id)
+    assert (job['status'], job['sent'], job['failed']) == ('Failed', 1, 1)
+    [failed] = [row for row in deliveries(cursor, job_id) if row[1] == 'Failed']
+    assert dispatch.pending_jobs(cursor) == [job_id]
+    
+    sink.fail_every = 0
+    job = dispatch.run_job(job_id)
+    assert (job['status'], job['sent'], job['failed']) == ('Done', 2, 0)
+    assert sink.received == 2
+    assert (failed[0], 'Sent', 2) in deliveries(cursor, job_id)
+    assert dispatch.pending_jobs(cursor) == []
+
+
+def test_a_job_that_breaks_is_marked_failed(cursor, school, sink, monkeypatch):
+    job_id = queue_notification(cursor, school)
+    
+    def broken(cursor, job, after, limit):
+        raise RuntimeError('recipient query failed')
+    
+    monkeypatch.setitem(dispatch.KINDS, 'notification',
+                        (broken,) + dispatch.KINDS['notification'][1:])
+    with pytest.raises(RuntimeError):
+        dispatch.run_job(job_id)
+    assert dispatch.get_job(cursor, job_id)['status'] == 'Failed'
+    
+    with pytest.raises(ValueError):
+        dispatch.create_job(cursor, 'notification', 'Missing', 999)
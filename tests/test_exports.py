@@ -0,0 +1,68 @@
+import csv
+import io
+import re
+
+from conftest import login
+from unihub import db
+from unihub.attendance import mark_attendance
+from unihub.exports import csv_chunks, pdf_pages
+
+COLUMNS = (('Name', 10), ('Value', 6))
+
+
+def rows(count, pulled):
+    """Rows that record how far the consumer has read"""
+    for number in range(count):
+        pulled.append(number)
+        yield {'name': f'row {number}', 'value': number}
+
+
+def test_csv_is_encoded_as_rows_arrive():
+    pulled = []
+    chunks = csv_chunks(['Name', 'Value'], rows(5, pulled), chunk_rows=2)
+    assert next(chunks) == 'Name,Value\r\nrow 0,0\r\nrow 1,1\r\n'
+    assert pulled == [0, 1]
+    rest = list(chunks)
+    assert rest == ['row 2,2\r\nrow 3,3\r\n', 'row 4,4\r\n']
+
+
+def test_pdf_pages_stream_with_a_valid_xref():
+    pulled = []
+    pages = pdf_pages('Report', COLUMNS, rows(5, pulled), rows_per_page=2)
+    next(pages)  # header and font
+    assert b'(row 1' in next(pages)
+    assert pulled == [0, 1]  # a page goes out as soon as it is full
+    
+    pdf = b''.join(pdf_pages('Report', COLUMNS, rows(5, []), rows_per_page=2))
+    assert pdf.count(b'/Type /Page ') == 3
+    startxref = int(re.search(rb'startxref\n(\d+)', pdf).group(1))
+    assert pdf[startxref:].startswith(b'xref')
+    offsets = re.findall(rb'(\d{10}) 00000 n', pdf)
+    for object_id, offset in enumerate(offsets, start=1):
+        assert pdf[int(offset):].startswith(b'%d 0 obj' % object_id)
+
+
+def test_empty_pdf_still_has_a_page():
+    pdf = b''.join(pdf_pages('Report', COLUMNS, iter(())))
+    assert pdf.count(b'/Type /Page ') == 1
+
+
+def test_admin_export_streams_filtered_rows(app, client, school):
+    with app.app_context():
+        for student in (school['student_id'], school['other_student_id']):
+            mark_attendance(db.get_cursor(), student, school['subject_ids'][0], '2024-08-05',
+                            'Present')
+        db.commit()
+    login(client, 'admin')
+    
+    response = client.get(f"/admin/export/attendance.csv?student_id={school['student_id']}")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename="attendance.csv"'
+    lines = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert lines == [['Enrollment', 'Subject', 'Date', 'Status', 'Remarks'],
+                     ['EN1', 'CS101', '2024-08-05', 'Present', '']]
+    
+    assert client.get('/admin/export/attendance.pdf').data.startswith(b'%PDF-1.4')
+    assert client.get('/admin/export/fee_payments.csv?subject_id=1').status_code == 400
+    assert client.get('/admin/export/salaries.csv').status_code == 404
@@ -0,0 +1,115 @@
+import pytest
+
+from conftest import login
+from unihub.fees import (charge_current_fees, get_ledger, ledger_totals, rebuild_ledger,
+                         record_payment, set_payment_status, update_fee_structure, verify_ledger)
+
+
+def test_payments_and_status_changes_keep_ledger(cursor, school):
+    student, structure = school['student_id'], school['fee_structure_id']
+    assert charge_current_fees(cursor) == 2
+    assert verify_ledger(cursor) == []
+    
+    first = record_payment(cursor, student, structure, 20000, '2024-08-10', 'Card', 'R-1')
+    pending = record_payment(cursor, student, structure, 5000, '2024-08-11', 'Online', 'R-2',
+                             status='Pending')
+    assert verify_ledger(cursor) == []
+    assert get_ledger(cursor, student, structure)['balance'] == 25000
+    
+    assert set_payment_status(cursor, pending, 'Completed')
+    assert not set_payment_status(cursor, pending, 'Completed')
+    assert set_payment_status(cursor, first, 'Failed')
+    assert verify_ledger(cursor) == []
+    assert get_ledger(cursor, student, structure)['paid'] == 5000
+    
+    totals = ledger_totals(cursor, student)
+    assert (totals['paid'], totals['outstanding']) == (5000, 40000)
+
+
+def test_rebuild_matches_maintained_ledger(cursor, school):
+    structure = school['fee_structure_id']
+    record_payment(cursor, school['student_id'], structure, 45000, '2024-08-10', 'Cash', 'R-1')
+    record_payment(cursor, school['other_student_id'], structure, 1000, '2024-08-10', 'Cash', 'R-2')
+    charge_current_fees(cursor)
+    cursor.execute('SELECT * FROM fee_ledger ORDER BY student_id, fee_structure_id')
+    maintained = cursor.fetchall()
+    
+    rebuild_ledger(cursor)
+    cursor.execute('SELECT * FROM fee_ledger ORDER BY student_id, fee_structure_id')
+    assert cursor.fetchall() == maintained
+
+
+def test_unknown_fee_structure_is_rejected(cursor, school):
+    with pytest.raises(ValueError):
+        record_payment(cursor, school['student_id'], 999, 100, '2024-08-10', 'Cash', 'R-1')
+
+
+def test_zero_amount_payment_is_recorded(cursor, school):
+    structure = school['fee_structure_id']
+    record_payment(cursor, school['student_id'], structure, 100, '2024-08-10', 'Cash', 'R-1')
+    # Leaves the existing ledger row unchanged (MySQL reports 0 affected rows)
+    waived = record_payment(cursor, school['student_id'], structure, 0, '2024-08-11', 'Cash', 'R-2')
+    assert set_payment_status(cursor, waived, 'Failed')
+    assert verify_ledger(cursor) == []
+
+
+def test_unknown_payment_method_is_rejected(cursor, school):
+    with pytest.raises(ValueError):
+        record_payment(cursor, school['student_id'], school['fee_structure_id'], 100,
+                       '2024-08-10', 'Barter', 'R-1')
+
+
+def test_payment_form_errors_are_reported(client, cursor, school):
+    login(client, 'admin')
+    payment = {'student_id': school['student_id'], 'fee_structure_id': school['fee_structure_id'],
+               'amount_paid': 100, 'payment_date': '2024-08-10', 'payment_method': 'Cash',
+               'receipt_number': 'R-1'}
+    assert client.post('/admin/fees/payments', json=payment).status_code == 201
+    assert get_ledger(cursor, school['student_id'], school['fee_structure_id'])['paid'] == 100
+    
+    duplicate = client.post('/admin/fees/payments', json=payment)
+    assert duplicate.status_code == 409
+    assert 'receipt_number' in duplicate.get_json()['error']
+    
+    response = client.post('/admin/fees/payments',
+                           json={**payment, 'receipt_number': 'R-2', 'payment_method': 'Barter'})
+    assert response.status_code == 400
+    response = client.post('/admin/fees/payments',
+                           json={**payment, 'receipt_number': 'R-3', 'student_id': 999})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('field, value', [
+    ('amount_paid', 'abc'), ('amount_paid', '-5000'), ('amount_paid', '0'),
+    ('amount_paid', 'NaN'), ('amount_paid', '1e12'), ('payment_date', 'not-a-date'),
+    ('payment_date', '2024-02-30'),
+])
+def test_bad_amounts_and_dates_are_rejected(client, cursor, school, field, value):
+    login(client, 'admin')
+    payment = {'student_id': school['student_id'], 'fee_structure_id': school['fee_structure_id'],
+               'amount_paid': '100.50', 'payment_date': '2024-08-10', 'payment_method': 'Cash',
+               'receipt_number': 'R-1', field: value}
+    response = client.post('/admin/fees/payments', json=payment)
+    assert response.status_code == 400
+    assert field in response.get_json()['error']
+    cursor.execute('SELECT COUNT(*) AS n FROM fee_payments')
+    assert cursor.fetchone()['n'] == 0
+    assert get_ledger(cursor, school['student_id'], school['fee_structure_id']) is None
+
+
+def test_fee_structure_edits_retotal_the_ledger(cursor, school):
+    student, structure = school['student_id'], school['fee_structure_id']
+    charge_current_fees(cursor)
+    record_payment(cursor, student, structure, 20000, '2024-08-10', 'Card', 'R-1')
+    cursor.execute('DELETE FROM student_changes')
+    
+    assert update_fee_structure(cursor, structure, 40000, library_fee=5000, lab_fee=5000) == 2
+    assert verify_ledger(cursor) == []
+    ledger = get_ledger(cursor, student, structure)
+    assert (ledger['total_fee'], ledger['paid'], ledger['balance']) == (50000, 20000, 30000)
+    cursor.execute('SELECT student_id FROM student_changes ORDER BY student_id')
+    assert [row['student_id'] for row in cursor.fetchall()] == sorted(
+        [student, school['other_student_id']])
+    
+    with pytest.raises(ValueError):
+        update_fee_structure(cursor, 999, 100)
@@ -0,0 +1,113 @@
+import io
+from decimal import Decimal
+
+import pytest
+
+from unihub import db
+from unihub.grades import (_contribution, delete_grade, get_cgpa, get_gpa, rebuild_rollups, save_grade,
+                           save_grades_batch, verify_rollups)
+from unihub.marks import import_marks_csv
+
+YEAR = '2024-25'
+
+
+def grade(points):
+    """save_grades_batch record for grade points (None while results are pending)"""
+    return (20.0, 50.0, 70.0, None if points is None else 'B', points,
+            'Pending' if points is None else 'Pass')
+
+
+def test_save_update_and_delete_keep_rollups(cursor, school):
+    student = school['student_id']
+    four, three, two = school['subject_ids']  # credits 4, 3 and 2
+    save_grade(cursor, student, four, 1, YEAR, grade_points=9.0)
+    save_grade(cursor, student, three, 1, YEAR, grade_points=7.0)
+    save_grade(cursor, student, two, 1, YEAR, grade_points=None)  # pending
+    assert verify_rollups(cursor) == []
+    assert get_gpa(cursor, student, 1) == round((9 * 4 + 7 * 3) / 7, 2)
+    
+    save_grade(cursor, student, three, 1, YEAR, grade_points=10.0)
+    save_grade(cursor, student, two, 1, YEAR, grade_points=6.0)
+    assert verify_rollups(cursor) == []
+    assert get_gpa(cursor, student, 1) == round((9 * 4 + 10 * 3 + 6 * 2) / 9, 2)
+    
+    assert delete_grade(cursor, student, four, 1, YEAR)
+    assert not delete_grade(cursor, student, four, 1, YEAR)
+    assert verify_rollups(cursor) == []
+    assert get_cgpa(cursor, student) == round((10 * 3 + 6 * 2) / 5, 2)
+
+
+def test_batch_upsert_keeps_rollups(cursor, school):
+    student, other = school['student_id'], school['other_student_id']
+    subject = school['subject_ids'][0]
+    save_grade(cursor, student, subject, 1, YEAR, grade_points=6.0)
+    
+    assert save_grades_batch(cursor, subject, 1, YEAR, {student: grade(8.0), other: grade(None)}) == 2
+    assert verify_rollups(cursor) == []
+    assert get_gpa(cursor, student, 1) == 8.0
+    assert get_gpa(cursor, other, 1) == 0.0
+    
+    save_grades_batch(cursor, subject, 1, YEAR, {student: grade(None), other: grade(7.0)})
+    assert verify_rollups(cursor) == []
+    assert get_gpa(cursor, student, 1) == 0.0
+    assert get_cgpa(cursor, other) == 7.0
+
+
+class DecimalPointsCursor:
+    """Reads grade_points back as Decimal, the way MySQLdb returns DECIMAL columns"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _convert(self, row):
+        if row and row.get('grade_points') is not None:
+            row['grade_points'] = Decimal(str(row['grade_points']))
+        return row
+
+    def fetchone(self):
+        return self._convert(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._cursor.fetchall()]
+
+
+def test_reimport_over_decimal_points_keeps_rollups(monkeypatch, cursor, school):
+    student, other = school['student_id'], school['other_student_id']
+    subject = school['subject_ids'][0]
+    save_grades_batch(cursor, subject, 1, YEAR, {student: grade(6.0), other: grade(7.0)})
+    db.commit()
+    
+    monkeypatch.setattr(db, 'get_cursor', lambda: DecimalPointsCursor(cursor))
+    csv = io.StringIO(f'student_id,internal_marks,external_marks\n'
+                      f'{student},28,65\n{other},15,30\n')
+    report = import_marks_csv(csv, YEAR, subject_id=subject)
+    assert report.rejects == []
+    assert report.rows_written == 2
+    assert verify_rollups(cursor) == []
+    assert get_gpa(cursor, student, 1) == 10.0
+
+
+def test_rebuild_matches_maintained_rollups(cursor, school):
+    student = school['student_id']
+    for subject, points in zip(school['subject_ids'], (8.0, 6.0, 10.0)):
+        save_grade(cursor, student, subject, 1, YEAR, grade_points=points)
+    maintained = get_gpa(cursor, student, 1), get_cgpa(cursor, student)
+    rebuild_rollups(cursor)
+    assert (get_gpa(cursor, student, 1), get_cgpa(cursor, student)) == maintained
+    assert verify_rollups(cursor) == []
+
+
+def test_unknown_subject_is_rejected(cursor, school):
+    with pytest.raises(ValueError):
+        save_grade(cursor, school['student_id'], 999, 1, YEAR, grade_points=8.0)
+
+
+def test_contribution_mixes_decimal_and_float_points():
+    # MySQL returns the stored DECIMAL points; new points arrive as floats
+    old_points, _ = _contribution(Decimal('8.00'), 4)
+    new_points, _ = _contribution(9.0, 4)
+    assert new_points - old_points == 4.0
+    assert _contribution(None, 4) == (0.0, 0)
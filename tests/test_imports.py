@@ -0,0 +1,53 @@
+import io
+
+from conftest import login
+from unihub.attendance import get_summary, summarize, verify_summary
+from unihub.imports import import_attendance_csv
+
+CSV = """enrollment_number,subject_code,attendance_date,status,remarks
+EN1,CS101,2024-08-05,present,
+EN1,CS101,2024-08-06,Absent,sick
+EN2,CS101,2024-08-05,Late,
+EN9,CS101,2024-08-05,Present,
+EN1,CS999,2024-08-05,Present,
+EN1,CS101,05/08/2024,Present,
+EN1,CS101,2024-08-07,Excused,
+EN2,CS102,2024-08-05,Present,
+"""
+
+
+def test_valid_rows_are_written_in_chunks(cursor, school):
+    report = import_attendance_csv(io.StringIO(CSV), chunk_size=2)
+    assert (report.rows_read, report.rows_written, report.rejected) == (8, 4, 4)
+    assert report.chunks == 2
+    # Line numbers count the header as line 1
+    assert [(reject['line'], reject['reason'].split()[0]) for reject in report.rejects] == [
+        (5, 'unknown'), (6, 'unknown'), (7, 'invalid'), (8, 'invalid'),
+    ]
+    assert verify_summary(cursor) == []
+    assert get_summary(cursor, school['student_id'], school['subject_ids'][0]) == summarize(1, 1, 0)
+
+
+def test_reimport_updates_instead_of_duplicating(cursor, school):
+    import_attendance_csv(io.StringIO(CSV))
+    changed = CSV.replace('EN1,CS101,2024-08-06,Absent', 'EN1,CS101,2024-08-06,Present')
+    import_attendance_csv(io.StringIO(changed))
+    assert verify_summary(cursor) == []
+    assert get_summary(cursor, school['student_id'], school['subject_ids'][0]) == summarize(2, 0, 0)
+
+
+def test_missing_columns_reject_the_file(cursor, school):
+    report = import_attendance_csv(io.StringIO('enrollment_number,status\nEN1,Present\n'))
+    assert report.rows_read == 0
+    assert report.rejects == [{'line': 1, 'reason': 'missing column(s): subject, attendance_date'}]
+
+
+def test_admin_upload_returns_the_report(client, school):
+    login(client, 'admin')
+    response = client.post('/admin/attendance/import',
+                           data={'file': (io.BytesIO(CSV.encode()), 'attendance.csv')})
+    assert response.status_code == 200
+    report = response.get_json()
+    assert (report['rows_written'], report['rejected']) == (4, 4)
+    
+    assert client.post('/admin/attendance/import', data={}).status_code == 400
@@ -0,0 +1,87 @@
+import logging
+import os
+import re
+import time
+
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from conftest import login
+from unihub.metrics import Registry, RequestMetricsMiddleware, fingerprint
+
+
+def sample(text, name, **labels):
+    """Value of one sample in a Prometheus exposition, 0 if absent"""
+    wanted = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{re.escape(name)}\{{{re.escape(wanted)}\}} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0
+
+
+def test_fingerprints_ignore_values_and_list_lengths():
+    assert fingerprint("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'x' -- note") == \
+        fingerprint('SELECT *  FROM t\n WHERE id IN (%s) AND name = %s')
+    assert fingerprint('INSERT INTO t (a, b) VALUES (%s, 1), (%s, 2)') == \
+        'INSERT INTO t (a, b) VALUES (...)'
+
+
+def scrape(client):
+    # Requests are recorded when the server closes the body
+    with client.get('/metrics') as response:
+        assert response.content_type.startswith('text/plain')
+        return response.get_data(as_text=True)
+
+
+def test_requests_and_queries_are_exported(app, client, school):
+    before = scrape(client)
+    login(client, 'EN1').close()
+    with client.get('/api/v1/attendance') as response:
+        assert response.status_code == 200
+    
+    text = scrape(client)
+    labels = {'method': 'GET', 'route': '/api/v1/attendance', 'status': '200'}
+    assert sample(text, 'unihub_http_requests_total', **labels) == \
+        sample(before, 'unihub_http_requests_total', **labels) + 1
+    assert 'unihub_db_query_duration_seconds_bucket{fingerprint="SELECT' in text
+    assert 'unihub_db_pool_connections{state="idle"}' in text
+
+
+def test_metrics_need_the_token_when_one_is_set(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'secret')
+    with client.get('/metrics') as response:
+        assert response.status_code == 404
+    with client.get('/metrics', headers={'Authorization': 'Bearer secret'}) as response:
+        assert response.status_code == 200
+
+
+def test_slow_statements_are_logged(caplog):
+    registry = Registry(slow_query_threshold=0.05)
+    request = registry.start_request('GET', '/grades', '/grades')
+    with caplog.at_level(logging.WARNING, logger='unihub.slow_queries'):
+        registry.observe_query('SELECT 1', 0.01)
+        registry.observe_query('SELECT * FROM grades WHERE student_id = 7', 0.2)
+    registry.finish_request(request, 200)
+    assert [record.getMessage() for record in caplog.records] == [
+        '200.0 ms (GET /grades): SELECT * FROM grades WHERE student_id = ?']
+    assert 'unihub_http_request_queries_count{route="/grades"} 1' in registry.render()
+    assert 'unihub_db_slow_queries_total{fingerprint="SELECT * FROM grades WHERE student_id = ?"} 1' \
+        in registry.render()
+
+
+def test_profiled_requests_write_folded_stacks(tmp_path):
+    def slow_view(environ, start_response):
+        time.sleep(0.05)
+        return Response('done')(environ, start_response)
+    
+    registry = Registry()
+    app = RequestMetricsMiddleware(slow_view, registry, profile_dir=str(tmp_path),
+                                   profile_interval=0.001)
+    plain = Client(app).get('/', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    assert 'X-Profile' not in plain.headers
+    
+    response = Client(app).get('/', headers={'X-Profile': '1'},
+                               environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    response.close()
+    with open(os.path.join(tmp_path, response.headers['X-Profile'])) as stream:
+        stacks = stream.read().splitlines()
+    assert stacks and all(re.fullmatch(r'.+ \d+', line) for line in stacks)
+    assert any('slow_view' in line for line in stacks)
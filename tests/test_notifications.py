@@ -0,0 +1,87 @@
+import pytest
+from flask import g
+
+from conftest import login
+from unihub import db, notifications
+from unihub.notifications import (deactivate_notification, get_feed, post_notification,
+                                  update_notification)
+
+
+def post_elsewhere(app, title, created_by, target_audience='All'):
+    """post_notification committed on a connection of its own, as another worker would"""
+    conn = app.extensions['db_backend'].connect()
+    post_notification(conn.cursor(), title, 'Details', 'Circular', created_by, target_audience)
+    conn.commit()
+    conn.close()
+    g.pop('db_on_commit', None)
+
+
+def titles(feed):
+    return [item['title'] for item in feed['items']]
+
+
+def test_feed_is_loaded_once_per_version(cursor, school, monkeypatch):
+    loads = []
+    load_feed = notifications._load_feed
+    
+    def counting_load(audience, limit):
+        loads.append(audience)
+        return load_feed(audience, limit)
+    
+    monkeypatch.setattr(notifications, '_load_feed', counting_load)
+    post_notification(cursor, 'Exams', 'Timetable is out', 'Circular', school['admin_user_id'])
+    db.commit()
+    
+    assert titles(get_feed('Students')) == ['Exams']
+    assert 'Exams' in get_feed('Students')['html']
+    assert len(loads) == 1
+    
+    update_notification(cursor, 1, title='Exam timetable')
+    db.commit()
+    assert titles(get_feed('Students')) == ['Exam timetable']
+    assert len(loads) == 2
+
+
+def test_feeds_follow_their_audience(cursor, school):
+    admin = school['admin_user_id']
+    post_notification(cursor, 'Everyone', 'x', 'Announcement', admin)
+    post_notification(cursor, 'Staff meeting', 'x', 'Alert', admin, target_audience='Faculty')
+    db.commit()
+    assert titles(get_feed('Students')) == ['Everyone']
+    assert sorted(titles(get_feed('Faculty'))) == ['Everyone', 'Staff meeting']
+    
+    deactivate_notification(cursor, 1)
+    db.commit()
+    assert titles(get_feed('Students')) == []
+    with pytest.raises(ValueError):
+        get_feed('Parents')
+
+
+def test_other_workers_posts_appear_after_the_version_ttl(app, cursor, school, monkeypatch):
+    assert titles(get_feed('Students')) == []
+    post_elsewhere(app, 'Holiday', school['admin_user_id'])
+    # Within the TTL this worker still trusts the version it read
+    assert titles(get_feed('Students')) == []
+    
+    monkeypatch.setitem(app.config, 'NOTIFICATIONS_VERSION_TTL', 0)
+    assert titles(get_feed('Students')) == ['Holiday']
+
+
+def test_unknown_columns_are_rejected(cursor, school):
+    with pytest.raises(ValueError):
+        update_notification(cursor, 1, author='someone')
+
+
+def test_api_feed_is_never_older_than_its_etag(app, client, school):
+    login(client, 'EN1')
+    first = client.get('/api/v1/dashboard')
+    assert first.get_json()['notifications'] == []
+    
+    with app.app_context():
+        post_elsewhere(app, 'Holiday', school['admin_user_id'])
+    # This worker's own version check is still within its TTL
+    changed = client.get('/api/v1/dashboard', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200
+    assert [item['title'] for item in changed.get_json()['notifications']] == ['Holiday']
+    again = client.get('/api/v1/dashboard', headers={'If-None-Match': changed.headers['ETag']})
+    assert again.status_code == 304
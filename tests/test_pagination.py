@@ -0,0 +1,40 @@
+import pytest
+
+from conftest import login
+from unihub.fees import payment_history, record_payment
+from unihub.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    token = encode_cursor(['2024-08-10', 42])
+    assert decode_cursor(token, 2) == ['2024-08-10', 42]
+
+
+@pytest.mark.parametrize('token', ['not base64!', encode_cursor([1]), encode_cursor([[1], 2]),
+                                   'bnVsbA'])
+def test_malformed_cursors_are_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, 2)
+
+
+def test_pages_cover_every_row_once_in_order(cursor, school):
+    student = school['student_id']
+    # Two payments share a date, so the payment_id tie-breaker matters
+    for number, day in enumerate(('2024-08-01', '2024-08-02', '2024-08-02', '2024-08-03',
+                                  '2024-08-04'), start=1):
+        record_payment(cursor, student, school['fee_structure_id'], 100, day, 'Cash', f'R-{number}')
+    
+    seen, after = [], None
+    while True:
+        rows, after = payment_history(cursor, student, after, limit=2)
+        seen.extend(row['receipt_number'] for row in rows)
+        if after is None:
+            break
+    assert seen == ['R-5', 'R-4', 'R-3', 'R-2', 'R-1']
+
+
+def test_bad_cursor_is_a_bad_request(app, client, school):
+    login(client, 'EN1')
+    assert client.get('/fees?after=garbage').status_code == 400
+    assert client.get('/api/v1/internships?after=garbage').status_code == 400
+    assert client.get('/fees?after=' + encode_cursor(['2024-08-01', 1])).status_code == 200
@@ -0,0 +1,20 @@
+from conftest import PASSWORD, login
+from unihub.passwords import dummy_hash, get_service, verify_password
+
+
+def test_unknown_account_costs_a_full_verification(app):
+    with app.app_context():
+        service = get_service()
+        before = service.latency.count
+        assert verify_password(PASSWORD, None) == (False, None)
+        assert service.latency.count == before + 1
+        assert dummy_hash(service.method).startswith(service.method)
+
+
+def test_unknown_enrollment_number_runs_the_kdf(app, client, school):
+    service = app.extensions['password_service']
+    before = service.latency.count
+    response = login(client, 'NOBODY')
+    assert response.status_code == 200
+    assert b'Incorrect enrollment number or password' in response.data
+    assert service.latency.count == before + 1
@@ -0,0 +1,45 @@
+from flask import g
+
+from conftest import login
+from unihub import db
+from unihub.profiles import get_profile, update_student
+
+
+def update_elsewhere(app, student_id, **fields):
+    """update_student committed on a connection of its own, as another worker would"""
+    conn = app.extensions['db_backend'].connect()
+    update_student(conn.cursor(), student_id, **fields)
+    conn.commit()
+    conn.close()
+    g.pop('db_on_commit', None)
+
+
+def test_own_writes_are_visible_after_commit(cursor, school):
+    student = school['student_id']
+    assert get_profile(student)['semester'] == 1
+    assert update_student(cursor, student, semester=2) == 1
+    db.commit()
+    assert get_profile(student)['semester'] == 2
+
+
+def test_other_workers_writes_are_visible_after_the_version_ttl(app, cursor, school, monkeypatch):
+    student = school['student_id']
+    assert get_profile(student)['semester'] == 1
+    update_elsewhere(app, student, semester=2)
+    # Within the TTL this worker still trusts the version it read
+    assert get_profile(student)['semester'] == 1
+    
+    monkeypatch.setitem(app.config, 'PROFILE_VERSION_TTL', 0)
+    assert get_profile(student)['semester'] == 2
+
+
+def test_api_body_is_never_older_than_its_etag(app, client, school):
+    login(client, 'EN1')
+    first = client.get('/api/v1/grades')
+    assert first.get_json()['semester'] == 1
+    
+    with app.app_context():
+        update_elsewhere(app, school['student_id'], semester=2)
+    changed = client.get('/api/v1/grades', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200
+    assert changed.get_json()['semester'] == 2
@@ -0,0 +1,51 @@
+from unihub import db
+from unihub.attendance import mark_attendance
+from unihub.risk import at_risk_students, score_students
+
+
+def pending_changes(cursor):
+    cursor.execute('SELECT student_id FROM student_changes ORDER BY student_id')
+    return [row['student_id'] for row in cursor.fetchall()]
+
+
+def flag_absences(cursor, student_id, subject_id, days):
+    for day in days:
+        mark_attendance(cursor, student_id, subject_id, f'2024-08-{day:02d}', 'Absent')
+    # Flagged earlier in the day than the run
+    cursor.execute("UPDATE student_changes SET changed_at = '2024-08-01 00:00:00'")
+    db.commit()
+
+
+def test_incremental_runs_rescore_only_flagged_students(cursor, school):
+    student, other = school['student_id'], school['other_student_id']
+    subject = school['subject_ids'][0]
+    flag_absences(cursor, student, subject, (5, 6, 7))
+    assert pending_changes(cursor) == [student]
+    
+    first = score_students(workers=1)
+    assert (first['mode'], first['students_scored']) == ('full', 2)
+    assert pending_changes(cursor) == []
+    [risky] = at_risk_students(cursor, level='Medium')
+    assert (risky['student_id'], risky['attendance_pct'], risky['score']) == (student, 0.0, 40.0)
+    
+    flag_absences(cursor, other, subject, (5,))
+    second = score_students(workers=1)
+    assert (second['mode'], second['students_scored']) == ('incremental', 1)
+    assert pending_changes(cursor) == []
+    cursor.execute('SELECT student_id, run_id FROM risk_scores ORDER BY student_id')
+    assert [(row['student_id'], row['run_id']) for row in cursor.fetchall()] == [
+        (student, first['run_id']), (other, second['run_id']),
+    ]
+    assert {row['student_id'] for row in at_risk_students(cursor, level='Medium')} == {
+        student, other,
+    }
+
+
+def test_changes_flagged_after_the_run_started_stay_queued(cursor, school):
+    score_students(workers=1)
+    mark_attendance(cursor, school['student_id'], school['subject_ids'][0], '2024-08-05',
+                    'Present')
+    cursor.execute("UPDATE student_changes SET changed_at = '2999-01-01 00:00:00'")
+    db.commit()
+    assert score_students(workers=1)['students_scored'] == 1
+    assert pending_changes(cursor) == [school['student_id']]
@@ -0,0 +1,61 @@
+import json
+
+from conftest import login
+from unihub.sessions import decode_record, encode_record
+
+SESSION_COOKIE = 'session'
+
+
+def session_id(client):
+    cookie = client.get_cookie(SESSION_COOKIE)
+    return cookie.value if cookie else None
+
+
+def test_login_rotates_the_session_id(app, client, school):
+    # A session the visitor had before signing in (e.g. one planted by an attacker)
+    with client.session_transaction() as session:
+        session['theme'] = 'dark'
+    before = session_id(client)
+    store = app.session_interface.store
+    assert store.load(before, 0) is not None
+    
+    response = login(client, 'EN1')
+    assert response.status_code == 302
+    after = session_id(client)
+    assert after and after != before
+    assert store.load(before, 0) is None
+    assert client.get('/dashboard').status_code == 200
+
+
+def test_logout_deletes_the_server_side_record(app, client, school):
+    login(client, 'EN1')
+    signed_in = session_id(client)
+    client.get('/logout')
+    assert app.session_interface.store.load(signed_in, 0) is None
+    assert client.get('/dashboard').status_code == 302
+
+
+def test_wrong_password_starts_no_session(client, school):
+    response = login(client, 'EN1', 'wrong')
+    assert response.status_code == 200
+    assert session_id(client) is None
+
+
+def test_login_record_has_no_extras(app, client, school):
+    for identifier in ('EN1', 'admin'):
+        login(client, identifier)
+        raw, _ = app.session_interface.store.load(session_id(client), 0)
+        record = json.loads(raw)
+        assert not any(isinstance(value, dict) for value in record)
+        assert decode_record(raw)['user_type'] in ('student', 'admin')
+        client.get('/logout')
+
+
+def test_records_round_trip_and_old_records_still_decode():
+    data = {'loggedin': True, 'user_id': 7, 'name': 'A B', 'user_type': 'student', 'theme': 'dark'}
+    assert decode_record(encode_record(data)) == data
+    # Written before user_type was a positional key
+    assert decode_record('[true,7,3,"EN1","A B",{"user_type":"student"}]') == {
+        'loggedin': True, 'user_id': 7, 'student_id': 3, 'enrollment_number': 'EN1',
+        'name': 'A B', 'user_type': 'student',
+    }
@@ -0,0 +1,42 @@
+import importlib.util
+import os
+
+import pytest
+
+from unihub import notifications, profiles
+from unihub.warmup import warm_up
+
+CONF_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'gunicorn.conf.py')
+
+
+def load_gunicorn_conf():
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', CONF_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize('cpus, pool_size, budget, sizing', [
+    (4, 10, None, (4, 5)),
+    (8, 10, 30, (3, 5)),
+    (8, 10, 5, (1, 5)),
+    (0, 1, None, (1, 1)),
+])
+def test_worker_sizing_fits_the_connection_budget(cpus, pool_size, budget, sizing):
+    assert load_gunicorn_conf().worker_sizing(cpus, pool_size, budget) == sizing
+
+
+def test_warm_up_serves_first_requests_from_cache(app, school, monkeypatch):
+    report = warm_up(app)
+    assert report['templates'] > 0
+    assert (report['feeds'], report['students'], report['profiles']) == (
+        len(notifications.AUDIENCES), 2, 2)
+    
+    def not_loaded(*args):
+        raise AssertionError('loaded after warm-up')
+    
+    monkeypatch.setattr(profiles, 'load_profile', not_loaded)
+    monkeypatch.setattr(notifications, '_load_feed', not_loaded)
+    with app.app_context():
+        assert profiles.get_profile(school['student_id'])['enrollment_number'] == 'EN1'
+        assert notifications.get_feed('Students')['items'] == []
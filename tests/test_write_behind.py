@@ -0,0 +1,60 @@
+import threading
+
+from conftest import login
+from unihub import write_behind
+from unihub.write_behind import WriteBehindBuffer
+
+
+def test_latest_value_per_key_is_flushed_once():
+    batches = []
+    buffer = WriteBehindBuffer(batches.append, interval=60)
+    buffer.record(1, 'a')
+    buffer.record(2, 'b')
+    buffer.record(1, 'c')
+    assert buffer.flush() == 2
+    assert buffer.flush() == 0
+    assert batches == [{1: 'c', 2: 'b'}]
+    assert buffer.stats() == {'pending': 0, 'flushes': 1, 'flushed_entries': 2, 'failures': 0}
+    buffer.close()
+
+
+def test_failed_batch_is_kept_and_newer_values_win():
+    batches = []
+    
+    def flaky(batch):
+        if not batches:
+            batches.append(None)
+            # A login recorded while the failing write is in flight
+            buffer.record(1, 'newer')
+            raise RuntimeError('database is away')
+        batches.append(batch)
+    
+    buffer = WriteBehindBuffer(flaky, interval=60)
+    buffer.record(1, 'old')
+    buffer.record(2, 'b')
+    assert buffer.flush() == 0
+    assert buffer.stats()['failures'] == 1
+    assert buffer.flush() == 2
+    assert batches[1] == {1: 'newer', 2: 'b'}
+    buffer.close()
+
+
+def test_a_full_buffer_wakes_the_flusher():
+    flushed = threading.Event()
+    buffer = WriteBehindBuffer(lambda batch: flushed.set(), interval=60, max_entries=2)
+    buffer.record(1, 'a')
+    assert not flushed.wait(0.05)
+    buffer.record(2, 'b')
+    assert flushed.wait(2)
+    buffer.close()
+
+
+def test_login_writes_last_login_in_a_batch(app, client, cursor, school):
+    login(client, 'EN1')
+    login(client, 'EN2')
+    cursor.execute("SELECT COUNT(*) AS n FROM users WHERE last_login IS NOT NULL")
+    assert cursor.fetchone()['n'] == 0
+    
+    assert write_behind.flush_logins() == 2
+    cursor.execute("SELECT username FROM users WHERE last_login IS NOT NULL ORDER BY username")
+    assert [row['username'] for row in cursor.fetchall()] == ['en1', 'en2']
@@ -0,0 +1 @@
+"""UniHub data-access modules used by the Flask application"""
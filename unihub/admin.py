@@ -0,0 +1,239 @@
+"""Admin panel endpoints"""
+
+import io
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from functools import wraps
+
+from flask import Blueprint, abort, current_app, jsonify, request, session
+
+from unihub import analytics, db, dispatch
+from unihub.exports import FORMATS, REPORTS, export_response
+from unihub.fees import (PAYMENT_METHODS, PAYMENT_STATUSES, defaulters, record_payment,
+                         set_payment_status)
+from unihub.imports import import_attendance_csv
+from unihub.marks import import_marks_csv
+from unihub.risk import at_risk_students
+
+admin = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+def admin_required(view):
+    """Allow only signed-in, active admin users"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify(error='Authentication required'), 401
+        cursor = db.get_cursor()
+        cursor.execute('SELECT user_type FROM users WHERE user_id = %s AND is_active = TRUE',
+                       (session['user_id'],))
+        user = cursor.fetchone()
+        if user is None or user['user_type'] != 'admin':
+            return jsonify(error='Admin access required'), 403
+        return view(*args, **kwargs)
+    return wrapped
+
+
+@admin.route('/')
+@admin_required
+def index():
+    """The signed-in admin account; where admin logins land"""
+    return jsonify(user_id=session['user_id'], name=session.get('name'),
+                   user_type=session.get('user_type'))
+
+
+@admin.route('/attendance/import', methods=['POST'])
+@admin_required
+def import_attendance():
+    """Upload attendance records as CSV (streamed, upserted in chunks)"""
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify(error='No CSV file uploaded'), 400
+    
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    report = import_attendance_csv(stream, marked_by=session['user_id'])
+    return jsonify(report.to_dict())
+
+
+@admin.route('/grades/import', methods=['POST'])
+@admin_required
+def import_marks():
+    """Upload one subject's internal/external marks as CSV and grade them"""
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify(error='No CSV file uploaded'), 400
+    academic_year = (request.form.get('academic_year') or '').strip()
+    subject_id = request.form.get('subject_id', type=int)
+    subject_code = (request.form.get('subject_code') or '').strip() or None
+    if not academic_year or (subject_id is None and subject_code is None):
+        return jsonify(error='academic_year and subject_id or subject_code are required'), 400
+    
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    report = import_marks_csv(stream, academic_year, subject_id, subject_code)
+    return jsonify(report.to_dict())
+
+
+@admin.route('/export/<report>.<fmt>')
+@admin_required
+def export(report, fmt):
+    """Stream attendance, grades or fee payments as CSV/PDF
+
+    Optional query filters: student_id, subject_id, course_id, semester.
+    """
+    if report not in REPORTS or fmt not in FORMATS:
+        abort(404)
+    filters = {name: request.args.get(name, type=int)
+               for name in ('student_id', 'subject_id', 'course_id', 'semester')}
+    try:
+        return export_response(report, fmt, filters)
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+
+
+@admin.route('/analytics/<report>')
+@admin_required
+def cohort_report(report):
+    """Attendance or GPA distribution per cohort (?by=course_id,semester)"""
+    if report not in analytics.REPORTS:
+        abort(404)
+    by = request.args.get('by')
+    try:
+        result = analytics.cohort_report(report, by.split(',') if by else None)
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    result['snapshot'] = analytics.get_analytics(refresh=False).stats()
+    return jsonify(result)
+
+
+@admin.route('/risk')
+@admin_required
+def risk_report():
+    """Highest at-risk scores from the nightly run (?level=High&course_id=1&limit=100)"""
+    level = request.args.get('level')
+    if level is not None and level not in ('Low', 'Medium', 'High'):
+        return jsonify(error='level must be Low, Medium or High'), 400
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    students = at_risk_students(db.get_cursor(), level, request.args.get('course_id', type=int), limit)
+    for row in students:
+        for column in ('attendance_pct', 'latest_gpa', 'gpa_trend', 'arrears', 'score'):
+            if row[column] is not None:
+                row[column] = float(row[column])
+    return jsonify(students=students)
+
+
+@admin.route('/fees/payments', methods=['POST'])
+@admin_required
+def create_payment():
+    """Record a fee payment and credit the ledger if it is Completed"""
+    data = request.get_json(silent=True) or request.form
+    required = ('student_id', 'fee_structure_id', 'amount_paid', 'payment_date',
+                'payment_method', 'receipt_number')
+    missing = [name for name in required if not data.get(name)]
+    if missing:
+        return jsonify(error=f"missing field(s): {', '.join(missing)}"), 400
+    if data['payment_method'] not in PAYMENT_METHODS:
+        return jsonify(error=f"payment_method must be one of {', '.join(PAYMENT_METHODS)}"), 400
+    try:
+        amount = Decimal(str(data['amount_paid'])).quantize(Decimal('0.01'))
+        valid_amount = 0 < amount < 10 ** 8  # amount_paid is DECIMAL(10,2)
+    except InvalidOperation:
+        valid_amount = False
+    if not valid_amount:
+        return jsonify(error='amount_paid must be a positive amount'), 400
+    try:
+        payment_date = date.fromisoformat(str(data['payment_date']))
+    except ValueError:
+        return jsonify(error='payment_date must be a date (YYYY-MM-DD)'), 400
+    
+    cursor = db.get_cursor()
+    try:
+        payment_id = record_payment(
+            cursor, int(data['student_id']), int(data['fee_structure_id']),
+            str(amount), payment_date.isoformat(), data['payment_method'],
+            data['receipt_number'], data.get('transaction_id') or None,
+            data.get('status', 'Completed'),
+        )
+    except ValueError as exc:
+        db.rollback()
+        return jsonify(error=str(exc)), 400
+    except db.get_backend().integrity_error:
+        db.rollback()
+        return jsonify(error='receipt_number or transaction_id is already recorded'), 409
+    db.commit()
+    return jsonify(payment_id=payment_id), 201
+
+
+@admin.route('/fees/payments/<int:payment_id>/status', methods=['POST'])
+@admin_required
+def update_payment_status(payment_id):
+    """Mark a payment Pending, Completed or Failed; the ledger follows"""
+    data = request.get_json(silent=True) or request.form
+    status = data.get('status')
+    if status not in PAYMENT_STATUSES:
+        return jsonify(error=f"status must be one of {', '.join(PAYMENT_STATUSES)}"), 400
+    try:
+        changed = set_payment_status(db.get_cursor(), payment_id, status)
+    except ValueError as exc:
+        db.rollback()
+        return jsonify(error=str(exc)), 404
+    db.commit()
+    return jsonify(payment_id=payment_id, status=status, changed=changed)
+
+
+@admin.route('/fees/defaulters')
+@admin_required
+def fee_defaulters():
+    """Students with outstanding balances (?academic_year=&course_id=&min_balance=)"""
+    rows = defaulters(db.get_cursor(), request.args.get('academic_year'),
+                      request.args.get('course_id', type=int),
+                      request.args.get('min_balance', 0, type=float))
+    for row in rows:
+        for column in ('total_fee', 'paid', 'outstanding'):
+            row[column] = float(row[column])
+    return jsonify(defaulters=rows)
+
+
+@admin.route('/dispatch', methods=['POST'])
+@admin_required
+def create_dispatch():
+    """Queue an email dispatch and start it in the background
+
+    Send notification_id to mail an admin notification to its target
+    audience, or kind=fee_reminder to remind every student with a balance.
+    """
+    data = request.get_json(silent=True) or request.form
+    notification_id = data.get('notification_id')
+    kind = 'notification' if notification_id else data.get('kind')
+    subject = data.get('subject')
+    cursor = db.get_cursor()
+    if kind == 'notification' and not subject:
+        cursor.execute('SELECT title FROM admin_notifications WHERE notification_id = %s',
+                       (notification_id,))
+        row = cursor.fetchone()
+        subject = row['title'] if row else None
+    elif kind == 'fee_reminder' and not subject:
+        subject = 'Outstanding fee balance'
+    try:
+        job_id = dispatch.create_job(cursor, kind, subject,
+                                     int(notification_id) if notification_id else None,
+                                     session.get('user_id'))
+    except ValueError as exc:
+        db.rollback()
+        return jsonify(error=str(exc)), 400
+    db.commit()
+    dispatch.start_job(current_app._get_current_object(), job_id)
+    return jsonify(job_id=job_id, status='Queued'), 202
+
+
+@admin.route('/dispatch/<int:job_id>')
+@admin_required
+def dispatch_status(job_id):
+    """Progress counters of a dispatch job"""
+    job = dispatch.get_job(db.get_cursor(), job_id)
+    if job is None:
+        abort(404)
+    for column in ('created_at', 'finished_at'):
+        if job[column] is not None:
+            job[column] = str(job[column])
+    return jsonify(job)
+
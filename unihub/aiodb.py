@@ -0,0 +1,194 @@
+"""Async database access for the ASGI deployment (see unihub.asgi)
+
+The same MySQL-syntax statements the sync helpers run, executed through an
+async driver: aiomysql against MySQL, aiosqlite against the SQLite file
+used locally and in benchmarks (statements are rewritten by
+backends.translate_sql as on the sync side). Connections are autocommit
+and read-only in practice; writes stay on the sync application.
+
+fetchone() and fetchall() check out a connection per statement, so
+independent queries of one request run concurrently when gathered. The
+pool bounds how many run at once across all requests of the worker.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from unihub import backends
+from unihub.db import PoolTimeout
+
+
+class AioMySQLBackend:
+    """aiomysql connections with dict rows"""
+
+    name = 'mysql'
+
+    def __init__(self, host, user, password, database):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+
+    async def connect(self):
+        import aiomysql
+        
+        return await aiomysql.connect(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            db=self.database,
+            charset='utf8mb4',
+            cursorclass=aiomysql.DictCursor,
+            autocommit=True,
+        )
+
+    async def fetch(self, conn, sql, params, one):
+        async with conn.cursor() as cursor:
+            await cursor.execute(sql, params)
+            return await (cursor.fetchone() if one else cursor.fetchall())
+
+    async def close(self, conn):
+        conn.close()
+
+
+class AioSQLiteBackend:
+    """aiosqlite connections to the WAL-mode database file"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    async def connect(self):
+        import aiosqlite
+        
+        conn = await aiosqlite.connect(self.path, timeout=self.busy_timeout,
+                                       isolation_level=None)
+        conn.row_factory = backends.dict_row
+        await conn.execute('PRAGMA journal_mode = WAL')
+        await conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    async def fetch(self, conn, sql, params, one):
+        async with conn.execute(backends.translate_sql(sql), tuple(params)) as cursor:
+            return await (cursor.fetchone() if one else cursor.fetchall())
+
+    async def close(self, conn):
+        await conn.close()
+
+
+def from_config(config):
+    """Async backend for the DATABASE_BACKEND selected in a Flask config"""
+    backend = config.get('DATABASE_BACKEND', 'mysql')
+    if backend == 'mysql':
+        return AioMySQLBackend(
+            config['MYSQL_HOST'],
+            config['MYSQL_USER'],
+            config['MYSQL_PASSWORD'],
+            config['MYSQL_DB'],
+        )
+    if backend == 'sqlite':
+        return AioSQLiteBackend(config['SQLITE_PATH'])
+    raise ValueError(f'Unknown DATABASE_BACKEND: {backend!r}')
+
+
+class AsyncConnectionPool:
+    """Bounded pool of async connections for one event loop
+
+    Mirrors db.ConnectionPool: at most max_size connections, checkouts wait
+    up to timeout seconds (then PoolTimeout), and connections idle longer
+    than idle_timeout are closed instead of reused.
+    """
+
+    def __init__(self, backend, max_size=10, timeout=5.0, idle_timeout=300.0, metrics=None):
+        self.backend = backend
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.metrics = metrics  # unihub.metrics.Registry timing each statement, if any
+        
+        self._idle = deque()  # (connection, returned_at), most recently used on the right
+        self._slots = asyncio.Semaphore(max_size)
+        self._size = 0
+        self._counters = {'checkouts': 0, 'waits': 0, 'timeouts': 0, 'created': 0, 'closed': 0}
+
+    async def acquire(self):
+        """Check out a connection, opening one if none is idle"""
+        if self._slots.locked():
+            self._counters['waits'] += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._counters['timeouts'] += 1
+            raise PoolTimeout(f'No database connection free within {self.timeout}s') from None
+        self._counters['checkouts'] += 1
+        
+        now = time.monotonic()
+        while self._idle:
+            conn, returned_at = self._idle.pop()
+            if now - returned_at <= self.idle_timeout:
+                return conn
+            await self._close(conn)
+        try:
+            conn = await self.backend.connect()
+        except BaseException:
+            self._slots.release()
+            raise
+        self._size += 1
+        self._counters['created'] += 1
+        return conn
+
+    async def release(self, conn, discard=False):
+        """Return a connection; discard=True closes it instead (e.g. after an error)"""
+        try:
+            if discard:
+                await self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    async def _close(self, conn):
+        self._size -= 1
+        self._counters['closed'] += 1
+        try:
+            await self.backend.close(conn)
+        except Exception:
+            pass
+
+    async def close(self):
+        """Close every idle connection (at shutdown)"""
+        while self._idle:
+            await self._close(self._idle.pop()[0])
+
+    def stats(self):
+        stats = dict(self._counters)
+        stats['size'] = self._size
+        stats['in_use'] = self._size - len(self._idle)
+        stats['max_size'] = self.max_size
+        return stats
+
+    async def fetch(self, sql, params, one):
+        conn = await self.acquire()
+        started = time.perf_counter()
+        try:
+            result = await self.backend.fetch(conn, sql, params, one)
+        except BaseException:
+            await self.release(conn, discard=True)
+            raise
+        elapsed = time.perf_counter() - started
+        await self.release(conn)
+        if self.metrics is not None:
+            statement = self.metrics.observe_query(sql, elapsed)
+            self.metrics.observe_rows(statement, (result is not None) if one else len(result))
+        return result
+
+    async def fetchone(self, sql, params=()):
+        """First row of a statement, on a connection of its own"""
+        return await self.fetch(sql, params, one=True)
+
+    async def fetchall(self, sql, params=()):
+        """All rows of a statement, on a connection of its own"""
+        return await self.fetch(sql, params, one=False)
@@ -0,0 +1,254 @@
+"""Columnar cohort analytics for department-level reports
+
+attendance and grades are held per worker as pandas frames with compact
+dtypes (int32 IDs, int8 status codes and semesters, float32 marks), loaded
+through db.stream_rows so the load itself does not buffer whole result
+sets. Later refreshes only read rows whose created_at is at or after the
+last watermark; rows changed in place (an attendance status corrected by
+an upsert, a regraded subject) keep their created_at, so a full reload
+also happens every ANALYTICS_FULL_RELOAD seconds. subjects and students
+are small and reloaded on every refresh.
+
+Reports group per-student figures by cohort columns (course_id, semester,
+subject_id) and compute counts, means, percentiles and fixed-bin
+histograms in vectorized group-bys.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+
+from unihub import db
+from unihub.attendance import STATUS_COLUMNS
+
+STATUS_CODES = {status: code for code, status in enumerate(STATUS_COLUMNS)}
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class Snapshot:
+    """Columnar copy of one table, refreshed incrementally by created_at
+
+    columns maps each selected column to its dtype; id_column identifies a
+    row so re-read rows replace their earlier copy.
+    """
+
+    def __init__(self, table, id_column, columns, converters=None, batch_rows=50000):
+        self.table = table
+        self.id_column = id_column
+        self.columns = columns
+        self.converters = converters or {}
+        self.batch_rows = batch_rows
+        self.frame = self._empty()
+        self.watermark = None
+        self.loaded_at = 0.0
+
+    def _empty(self):
+        return pd.DataFrame({
+            column: pd.Series(dtype=dtype) for column, dtype in self.columns.items()
+        })
+
+    def _to_frame(self, rows):
+        frame = pd.DataFrame.from_records(rows, columns=list(self.columns) + ['created_at'])
+        for column, convert in self.converters.items():
+            frame[column] = convert(frame[column])
+        watermark = frame['created_at'].max()
+        return frame.drop(columns='created_at').astype(self.columns), watermark
+
+    def _load(self, since=None):
+        """Frame of rows created at or after since (all rows when None)"""
+        select = ', '.join(list(self.columns) + ['created_at'])
+        if since is None:
+            rows = db.stream_rows(f'SELECT {select} FROM {self.table}')
+        else:
+            rows = db.stream_rows(f'SELECT {select} FROM {self.table} WHERE created_at >= %s',
+                                  (since,))
+        frames, watermark, batch = [], since, []
+        for row in rows:
+            batch.append(tuple(row.values()))
+            if len(batch) >= self.batch_rows:
+                frame, latest = self._to_frame(batch)
+                frames.append(frame)
+                watermark = latest if watermark is None else max(watermark, latest)
+                batch = []
+        if batch:
+            frame, latest = self._to_frame(batch)
+            frames.append(frame)
+            watermark = latest if watermark is None else max(watermark, latest)
+        return frames, watermark
+
+    def refresh(self, full=False):
+        """Load new rows since the watermark (or everything); returns rows read"""
+        since = None if full or self.watermark is None else self.watermark
+        frames, watermark = self._load(since)
+        rows_read = sum(len(frame) for frame in frames)
+        if since is None:
+            self.frame = pd.concat(frames, ignore_index=True) if frames else self._empty()
+            self.loaded_at = time.time()
+        elif frames:
+            # Rows at exactly the old watermark are read again; keep the newest copy
+            combined = pd.concat([self.frame] + frames, ignore_index=True)
+            self.frame = combined.drop_duplicates(self.id_column, keep='last').reset_index(drop=True)
+        self.watermark = watermark
+        return rows_read
+
+    def memory_bytes(self):
+        return int(self.frame.memory_usage(deep=True).sum())
+
+
+class CohortAnalytics:
+    """Per-worker snapshots of the tables the cohort reports read"""
+
+    def __init__(self, full_reload=3600.0):
+        self.full_reload = full_reload
+        self._lock = threading.Lock()
+        self.attendance = Snapshot('attendance', 'attendance_id', {
+            'attendance_id': 'int32', 'student_id': 'int32', 'subject_id': 'int32',
+            'status': 'int8',
+        }, converters={'status': lambda column: column.map(STATUS_CODES)})
+        self.grades = Snapshot('grades', 'grade_id', {
+            'grade_id': 'int32', 'student_id': 'int32', 'subject_id': 'int32',
+            'semester': 'int8', 'total_marks': 'float32', 'grade_points': 'float32',
+        })
+        self.subjects = None
+        self.students = None
+        self.refreshed_at = 0.0
+
+    def _load_small(self, sql, dtypes):
+        frame = pd.DataFrame.from_records(list(db.stream_rows(sql)), columns=list(dtypes))
+        return frame.astype(dtypes)
+
+    def refresh(self, full=False):
+        """Bring every snapshot up to date; returns {table: rows read}"""
+        with self._lock:
+            if time.time() - self.attendance.loaded_at > self.full_reload:
+                full = True
+            counts = {
+                'attendance': self.attendance.refresh(full),
+                'grades': self.grades.refresh(full),
+            }
+            self.subjects = self._load_small(
+                'SELECT subject_id, subject_code, course_id, semester, credits FROM subjects',
+                {'subject_id': 'int32', 'subject_code': 'category', 'course_id': 'int32',
+                 'semester': 'int8', 'credits': 'int8'},
+            )
+            self.students = self._load_small(
+                'SELECT student_id, course_id, semester, status FROM students',
+                {'student_id': 'int32', 'course_id': 'int32', 'semester': 'int8',
+                 'status': 'category'},
+            )
+            counts['subjects'], counts['students'] = len(self.subjects), len(self.students)
+            self.refreshed_at = time.time()
+            return counts
+
+    def stats(self):
+        return {
+            'attendance_rows': len(self.attendance.frame),
+            'grade_rows': len(self.grades.frame),
+            'memory_bytes': self.attendance.memory_bytes() + self.grades.memory_bytes(),
+            'attendance_watermark': str(self.attendance.watermark),
+            'grades_watermark': str(self.grades.watermark),
+        }
+
+    def attendance_percentages(self):
+        """One row per (student, subject): percentage plus the subject's cohort columns"""
+        frame = self.attendance.frame
+        present = (frame['status'] == STATUS_CODES['Present']).astype('int32')
+        grouped = present.groupby([frame['student_id'], frame['subject_id']], observed=True)
+        per_pair = pd.DataFrame({'present': grouped.sum(), 'total': grouped.size()}).reset_index()
+        per_pair['value'] = (per_pair['present'] / per_pair['total'] * 100).astype('float32')
+        subjects = self.subjects[['subject_id', 'subject_code', 'course_id', 'semester']]
+        return per_pair.merge(subjects, on='subject_id', how='inner')
+
+    def semester_gpas(self):
+        """One row per (student, semester): GPA over graded subjects plus course_id"""
+        frame = self.grades.frame.dropna(subset=['grade_points'])
+        frame = frame.merge(self.subjects[['subject_id', 'credits']], on='subject_id')
+        weighted = frame['grade_points'] * frame['credits']
+        grouped = pd.DataFrame({
+            'points': weighted, 'credits': frame['credits'].astype('int32'),
+            'student_id': frame['student_id'], 'semester': frame['semester'],
+        }).groupby(['student_id', 'semester'], observed=True).sum().reset_index()
+        grouped['value'] = (grouped['points'] / grouped['credits']).round(2).astype('float32')
+        return grouped.merge(self.students[['student_id', 'course_id']], on='student_id')
+
+
+def cohort_summary(frame, by, bins):
+    """Count, mean, percentiles and histogram of frame['value'] per cohort
+
+    bins are the histogram edges; values outside them are clipped into the
+    first or last bin.
+    """
+    by = list(by)
+    if frame.empty:
+        return []
+    frame = frame.assign(value=frame['value'].astype('float64'))
+    groups = frame.groupby(by, observed=True)['value']
+    summary = groups.agg(['count', 'mean'])
+    for percentile in PERCENTILES:
+        summary[f'p{percentile}'] = groups.quantile(percentile / 100)
+    
+    bins = np.asarray(bins, dtype=float)
+    index = np.clip(np.searchsorted(bins, frame['value'].to_numpy(), side='right') - 1,
+                    0, len(bins) - 2)
+    histogram = (frame.assign(bin=index).groupby(by + ['bin'], observed=True).size()
+                 .unstack(fill_value=0).reindex(columns=range(len(bins) - 1), fill_value=0))
+    
+    result = []
+    for key, row in summary.round(2).iterrows():
+        key = key if isinstance(key, tuple) else (key,)
+        record = {column: int(value) for column, value in zip(by, key)}
+        record.update(count=int(row['count']), mean=float(row['mean']))
+        record.update({f'p{p}': float(row[f'p{p}']) for p in PERCENTILES})
+        record['histogram'] = [int(count) for count in histogram.loc[key if len(by) > 1 else key[0]]]
+        result.append(record)
+    return result
+
+
+REPORTS = {
+    'attendance': {
+        'frame': CohortAnalytics.attendance_percentages,
+        'by': ('course_id', 'semester', 'subject_id'),
+        'bins': tuple(range(0, 101, 10)),
+    },
+    'gpa': {
+        'frame': CohortAnalytics.semester_gpas,
+        'by': ('course_id', 'semester'),
+        'bins': tuple(range(0, 11)),
+    },
+}
+
+
+def init_app(app):
+    """Create the application's analytics snapshots (loaded on first use)"""
+    app.config.setdefault('ANALYTICS_REFRESH_INTERVAL', 300.0)
+    app.config.setdefault('ANALYTICS_FULL_RELOAD', 3600.0)
+    app.extensions['analytics'] = CohortAnalytics(app.config['ANALYTICS_FULL_RELOAD'])
+
+
+def get_analytics(refresh=None):
+    """The current application's snapshots, refreshed when older than the interval"""
+    analytics = current_app.extensions['analytics']
+    interval = current_app.config['ANALYTICS_REFRESH_INTERVAL']
+    stale = time.time() - analytics.refreshed_at > interval
+    if refresh or (refresh is None and stale):
+        analytics.refresh()
+    return analytics
+
+
+def cohort_report(name, by=None):
+    """Distribution of a report's per-student values grouped by the cohort columns"""
+    spec = REPORTS[name]
+    by = tuple(by or spec['by'])
+    frame = spec['frame'](get_analytics())
+    unknown = [column for column in by if column not in frame.columns or column == 'value']
+    if unknown:
+        raise ValueError(f"{name} cannot be grouped by {', '.join(unknown)}")
+    return {
+        'report': name,
+        'by': list(by),
+        'bins': list(spec['bins']),
+        'cohorts': cohort_summary(frame, by, spec['bins']),
+    }
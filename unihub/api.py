@@ -0,0 +1,226 @@
+"""JSON API (/api/v1) mirroring the student views, with conditional GET
+
+Every endpoint names the data it reads: scopes of the student's versions in
+student_versions (see unihub.changes) and global rows of cache_versions.
+Before any of the view's own queries run, those versions are fetched in one
+indexed query and hashed with the endpoint and query string into a strong
+ETag. A request whose If-None-Match matches gets a 304 and nothing else is
+read.
+
+Versions are read before the view's queries, so a write committing in
+between can only leave the ETag older than the body; the client pays one
+extra 200 on its next revalidation but is never told stale data is fresh.
+Cached profiles and notification feeds are looked up at the version the
+ETag was computed from, not at this worker's periodically refreshed one,
+for the same reason.
+"""
+
+import hashlib
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+
+from flask import Blueprint, current_app, g, jsonify, request, session
+
+from unihub import db
+from unihub.attendance import (attendance_history, attendance_totals, get_month_calendar,
+                               get_subject_summaries)
+from unihub.changes import SCOPES, STUDENT_DATA_VERSION
+from unihub.fees import (FEE_STRUCTURE_VERSION, current_fee_structure, get_ledger, ledger_totals,
+                         payment_history)
+from unihub.grades import get_cgpa, get_gpa, get_semester_grades
+from unihub.internships import internship_history, internship_totals
+from unihub.notifications import VERSION_KEY as NOTIFICATIONS_VERSION, get_feed
+from unihub.profiles import VERSION_KEY as PROFILES_VERSION, get_profile
+
+# Bump when a response's shape changes so clients drop ETags of the old shape
+API_REVISION = 2
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def _jsonable(value):
+    """Decimals as floats and dates as ISO strings, recursively"""
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _versions(cursor, student_id, names):
+    """{name: version} for student scopes and global cache_versions rows"""
+    global_names = [name for name in names if name not in SCOPES] + [STUDENT_DATA_VERSION]
+    placeholders = ', '.join(['%s'] * len(global_names))
+    cursor.execute(f"""
+        SELECT scope AS name, version FROM student_versions WHERE student_id = %s
+        UNION ALL
+        SELECT name, version FROM cache_versions WHERE name IN ({placeholders})
+    """, (student_id,) + tuple(global_names))
+    versions = {row['name']: row['version'] for row in cursor.fetchall()}
+    return {name: versions.get(name, 0) for name in sorted(set(names) | {STUDENT_DATA_VERSION})}
+
+
+def compute_etag(student_id, names):
+    """Strong ETag for the current request from the versions it depends on
+
+    The versions are kept on g.api_versions for the view (see _profile).
+    """
+    versions = g.api_versions = _versions(db.get_cursor(), student_id, names)
+    key = '|'.join([
+        str(API_REVISION), request.endpoint, str(student_id),
+        '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True))),
+        ','.join(f'{name}:{version}' for name, version in versions.items()),
+    ])
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def versioned(*names):
+    """Serve a student's view as JSON with an ETag over the named versions
+
+    The view returns a JSON-able value; If-None-Match short-circuits it.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if 'loggedin' not in session or 'student_id' not in session:
+                return jsonify(error='Login required'), 401
+            etag = compute_etag(session['student_id'], names)
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                result = view(*args, **kwargs)
+                if isinstance(result, tuple):
+                    return jsonify(error=result[0]), result[1]
+                response = jsonify(_jsonable(result))
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def _page_size():
+    return current_app.config.get('HISTORY_PAGE_SIZE', 20)
+
+
+def _profile():
+    """The student's cached profile at the version in the ETag, never an older one
+
+    None if the student has no profile row; views answer 404.
+    """
+    return get_profile(session['student_id'], g.api_versions[PROFILES_VERSION])
+
+
+@api.route('/dashboard')
+@versioned('profile', PROFILES_VERSION, 'grades', NOTIFICATIONS_VERSION)
+def dashboard():
+    """Profile, current GPA and CGPA, and the latest notifications"""
+    student = _profile()
+    if student is None:
+        return 'Student profile not found', 404
+    feed = get_feed('Students', version=g.api_versions[NOTIFICATIONS_VERSION])
+    cursor = db.get_cursor()
+    return {
+        'student': student,
+        'gpa': get_gpa(cursor, session['student_id'], student['semester']),
+        'cgpa': get_cgpa(cursor, session['student_id']),
+        'notifications': feed['items'],
+    }
+
+
+@api.route('/attendance')
+@versioned('attendance')
+def attendance():
+    """Attendance totals and percentage per subject"""
+    cursor = db.get_cursor()
+    return {
+        'subjects': get_subject_summaries(cursor, session['student_id']),
+        'totals': attendance_totals(cursor, session['student_id']),
+    }
+
+
+@api.route('/attendance/calendar')
+@versioned('attendance')
+def attendance_calendar():
+    """One month of day-by-day status per subject (?month=YYYY-MM)"""
+    month = request.args.get('month') or datetime.now().strftime('%Y-%m')
+    try:
+        month = datetime.strptime(month, '%Y-%m').strftime('%Y-%m')
+    except ValueError:
+        return 'month must be YYYY-MM', 400
+    return {'month': month,
+            'subjects': get_month_calendar(db.get_cursor(), session['student_id'], month)}
+
+
+@api.route('/attendance/history')
+@versioned('attendance')
+def attendance_history_page():
+    """Keyset page of daily attendance (?subject_id=&after=)"""
+    subject_id = request.args.get('subject_id', type=int)
+    cursor = db.get_cursor()
+    try:
+        records, next_cursor = attendance_history(cursor, session['student_id'], subject_id,
+                                                  request.args.get('after'), _page_size())
+    except ValueError as exc:
+        return str(exc), 400
+    return {'records': records, 'next': next_cursor,
+            'totals': attendance_totals(cursor, session['student_id'], subject_id)}
+
+
+@api.route('/grades')
+@versioned('profile', PROFILES_VERSION, 'grades')
+def grades():
+    """Current semester's grades with GPA and CGPA"""
+    student = _profile()
+    if student is None:
+        return 'Student profile not found', 404
+    semester = student['semester']
+    cursor = db.get_cursor()
+    return {
+        'semester': semester,
+        'grades': get_semester_grades(cursor, session['student_id'], semester),
+        'gpa': get_gpa(cursor, session['student_id'], semester),
+        'cgpa': get_cgpa(cursor, session['student_id']),
+    }
+
+
+@api.route('/internships')
+@versioned('internships')
+def internships():
+    """Keyset page of internships (?after=) with credit totals"""
+    cursor = db.get_cursor()
+    try:
+        records, next_cursor = internship_history(cursor, session['student_id'],
+                                                  request.args.get('after'), _page_size())
+    except ValueError as exc:
+        return str(exc), 400
+    return {'internships': records, 'next': next_cursor,
+            'totals': internship_totals(cursor, session['student_id'])}
+
+
+@api.route('/fees')
+@versioned('profile', PROFILES_VERSION, 'fees', FEE_STRUCTURE_VERSION)
+def fees():
+    """Current fee structure, ledger totals and a keyset page of payments (?after=)"""
+    student = _profile()
+    if student is None:
+        return 'Student profile not found', 404
+    cursor = db.get_cursor()
+    try:
+        payments, next_cursor = payment_history(cursor, session['student_id'],
+                                                request.args.get('after'), _page_size())
+    except ValueError as exc:
+        return str(exc), 400
+    fee_structure = current_fee_structure(cursor, student['course_id'], student['semester'])
+    balance = 0
+    if fee_structure:
+        ledger = get_ledger(cursor, session['student_id'], fee_structure['fee_structure_id'])
+        balance = ledger['balance'] if ledger else fee_structure['total_fee']
+    return {'fee_structure': fee_structure, 'balance': balance,
+            'totals': ledger_totals(cursor, session['student_id']),
+            'payments': payments, 'next': next_cursor}
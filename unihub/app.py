@@ -0,0 +1,747 @@
+from flask import Flask, render_template, request, redirect, url_for, session, flash, abort
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from werkzeug.utils import secure_filename
+import click
+from unihub import (analytics, assets, cache, compression, db, dispatch, mailer, metrics, passwords,
+                    sessions, warmup, write_behind)
+from unihub.admin import admin
+from unihub.api import api
+from unihub.attendance import (attendance_history, attendance_totals, get_month_calendar,
+                               get_subject_summaries, get_summary, rebuild_calendar,
+                               rebuild_summary, verify_calendar, verify_summary)
+from unihub.exports import FORMATS, REPORTS, export_response
+from unihub.fees import (charge_current_fees, current_fee_structure, defaulters, get_ledger,
+                         ledger_totals, payment_history, rebuild_ledger, verify_ledger)
+from unihub.grades import get_cgpa, get_gpa, rebuild_rollups, verify_rollups
+from unihub.imports import import_attendance_csv
+from unihub.internships import internship_history, internship_totals
+from unihub.marks import import_marks_csv
+from unihub.notifications import get_feed
+from unihub.passwords import PasswordServiceBusy, verify_password
+from unihub.profiles import get_profile
+from unihub.risk import score_students
+
+app = Flask(__name__, template_folder='../templates', static_folder='../static')
+
+# Configuration
+app.secret_key = 'your-secret-key-here-change-in-production'
+app.config['DATABASE_BACKEND'] = os.environ.get('UNIHUB_DATABASE_BACKEND', 'mysql')  # or 'sqlite'
+app.config['SQLITE_PATH'] = os.environ.get('UNIHUB_SQLITE_PATH', 'unihub.db')
+app.config['MYSQL_HOST'] = 'localhost'
+app.config['MYSQL_USER'] = 'root'
+app.config['MYSQL_PASSWORD'] = 'your-password'
+app.config['MYSQL_DB'] = 'unihub'
+app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+
+app.config['DB_POOL_MIN_SIZE'] = 2
+app.config['DB_POOL_MAX_SIZE'] = 10
+app.config['DB_POOL_TIMEOUT'] = 5.0  # seconds to wait for a free connection
+app.config['DB_POOL_IDLE_TIMEOUT'] = 300.0  # recycle connections idle this long
+
+app.config['CACHE_REDIS_URL'] = os.environ.get('UNIHUB_CACHE_REDIS_URL')  # shared tier, optional
+app.config['PROFILE_CACHE_SIZE'] = 10000
+app.config['PROFILE_CACHE_TTL'] = 3600
+app.config['PROFILE_VERSION_TTL'] = 1.0  # seconds between profile version checks per worker
+app.config['NOTIFICATIONS_VERSION_TTL'] = 1.0  # seconds between version checks per worker
+app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+app.config['PASSWORD_POOL_KIND'] = 'thread'  # KDF releases the GIL; 'process' also works
+app.config['PASSWORD_QUEUE_TIMEOUT'] = 0.5  # seconds to wait for a queue slot before 503
+app.config['WRITE_BEHIND_INTERVAL'] = 5.0  # seconds between last_login flushes
+app.config['WRITE_BEHIND_MAX_ENTRIES'] = 500  # flush early once this many logins are pending
+app.config['SESSION_BACKEND'] = os.environ.get('UNIHUB_SESSION_BACKEND', 'sql')  # 'memory', 'cookie'
+app.config['SESSION_IDLE_TIMEOUT'] = 1800  # sliding expiry in seconds
+app.config['SESSION_COOKIE_HTTPONLY'] = True
+app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+app.config['IMPORT_CHUNK_SIZE'] = 1000  # rows per multi-row upsert / transaction
+app.config['REFERENCE_CACHE_TTL'] = 300  # seconds to cache student/subject IDs for imports
+app.config['EXPORT_FETCH_SIZE'] = 1000  # rows per fetch from the unbuffered export cursor
+app.config['EXPORT_CSV_CHUNK_ROWS'] = 500  # rows per streamed CSV chunk
+app.config['EXPORT_PDF_ROWS_PER_PAGE'] = 50
+app.config['ANALYTICS_REFRESH_INTERVAL'] = 300.0  # seconds between incremental snapshot refreshes
+app.config['ANALYTICS_FULL_RELOAD'] = 3600.0  # full reload picks up rows updated in place
+app.config['RISK_WORKERS'] = None  # scoring processes; defaults to the CPU count
+app.config['MAIL_SERVER'] = os.environ.get('UNIHUB_MAIL_SERVER', 'localhost')
+app.config['MAIL_PORT'] = int(os.environ.get('UNIHUB_MAIL_PORT', 25))  # 1025 for `flask smtp-sink`
+app.config['MAIL_SENDER'] = 'UniHub <noreply@unihub.local>'
+app.config['MAIL_POOL_SIZE'] = 4  # open SMTP sessions, and concurrent senders per dispatch job
+app.config['MAIL_MAX_ATTEMPTS'] = 3  # per message, with exponential backoff between tries
+app.config['DISPATCH_CHUNK_SIZE'] = 500  # recipients per audience page / delivery-status upsert
+app.config['HISTORY_PAGE_SIZE'] = 20  # rows per keyset page of payment/internship/attendance history
+app.config['ASSET_BUILD_DIR'] = 'dist'  # under static/; output of `flask build-assets`
+app.config['COMPRESS_MIN_SIZE'] = 1024  # gzip HTML/JSON responses at least this large (streams always)
+app.config['COMPRESS_LEVEL'] = 6
+app.config['ASGI_DB_POOL_SIZE'] = 10  # async connections per worker under unihub.asgi
+app.config['ASGI_WSGI_THREADS'] = 8  # threads running the sync routes under unihub.asgi
+app.config['ASGI_BODY_MEMORY_SIZE'] = 1024 * 1024  # request bytes held in memory before spooling to disk
+app.config['WARMUP_ANALYTICS'] = False  # also load cohort snapshots during warm-up
+app.config['METRICS_TOKEN'] = os.environ.get('UNIHUB_METRICS_TOKEN')  # else /metrics is loopback-only
+app.config['METRICS_QUERY_HEADER'] = os.environ.get('UNIHUB_QUERY_COUNT_HEADER') == '1'  # for benchmarks
+app.config['SLOW_QUERY_THRESHOLD'] = 0.1  # seconds; slower statements go to the slow-query log
+app.config['SLOW_QUERY_LOG'] = os.environ.get('UNIHUB_SLOW_QUERY_LOG')  # file, besides the logger
+app.config['PROFILER_ENABLED'] = os.environ.get('UNIHUB_PROFILER') == '1'  # sample 'X-Profile: 1' requests
+app.config['PROFILER_DIR'] = 'profiles'  # folded stacks of profiled requests
+
+# Initialize request/query metrics (ahead of the pool, whose connections it
+# wraps), the database backend, connection pool, caches, password pool,
+# the last_login write-behind buffer, server-side sessions, analytics, mail,
+# fingerprinted static assets, response compression and warm-up settings
+metrics.init_app(app)
+db.init_app(app)
+cache.init_app(app)
+passwords.init_app(app)
+write_behind.init_app(app)
+sessions.init_app(app)
+analytics.init_app(app)
+mailer.init_app(app)
+assets.init_app(app)
+compression.init_app(app)
+warmup.init_app(app)
+app.register_blueprint(admin)
+app.register_blueprint(api)
+
+# Helper Functions
+def hash_password(password):
+    """Hash password with the configured salted KDF"""
+    return passwords.hash_password(password, app.config['PASSWORD_HASH_METHOD'])
+
+def calculate_attendance_percentage(student_id, subject_id):
+    """Calculate attendance percentage for a student in a subject"""
+    cursor = db.get_cursor()
+    return get_summary(cursor, student_id, subject_id)['percentage']
+
+def calculate_gpa(student_id, semester):
+    """GPA for a student in a specific semester from the semester_gpa rollup"""
+    cursor = db.get_cursor()
+    return get_gpa(cursor, student_id, semester)
+
+def calculate_cgpa(student_id):
+    """Cumulative GPA for a student from the student_cgpa rollup"""
+    cursor = db.get_cursor()
+    return get_cgpa(cursor, student_id)
+
+# CLI Commands
+
+@app.cli.command('import-attendance')
+@click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--marked-by', type=int, default=None, help='user_id recorded as marked_by')
+@click.option('--chunk-size', type=int, default=None, help='Rows per batched upsert')
+def import_attendance_command(csv_path, marked_by, chunk_size):
+    """Stream an attendance CSV into the database"""
+    def progress(report):
+        click.echo(f'{report.rows_read} rows read, {report.rows_written} written, '
+                   f'{report.rejected} rejected', err=True)
+    
+    with open(csv_path, newline='', encoding='utf-8-sig') as stream:
+        report = import_attendance_csv(stream, marked_by, chunk_size, progress)
+    
+    for reject in report.rejects:
+        click.echo(f"line {reject['line']}: {reject['reason']}")
+    click.echo(f'{report.rows_written} rows written, {report.rejected} rejected '
+               f'in {report.elapsed:.2f}s ({report.rows_per_second} rows/s)')
+
+@app.cli.command('import-marks')
+@click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--subject', required=True, help='subject_code (or numeric subject_id) the marks belong to')
+@click.option('--academic-year', required=True, help='Academic year, e.g. 2024-25')
+@click.option('--chunk-size', type=int, default=None, help='Rows per batched upsert')
+def import_marks_command(csv_path, subject, academic_year, chunk_size):
+    """Grade a subject's marks CSV and upsert it with the GPA rollups"""
+    subject_id, subject_code = (int(subject), None) if subject.isdigit() else (None, subject)
+    with open(csv_path, newline='', encoding='utf-8-sig') as stream:
+        report = import_marks_csv(stream, academic_year, subject_id, subject_code, chunk_size)
+    
+    for reject in report.rejects:
+        click.echo(f"line {reject['line']}: {reject['reason']}")
+    click.echo(f'{report.rows_written} rows written, {report.rejected} rejected '
+               f'in {report.elapsed:.2f}s ({report.rows_per_second} rows/s)')
+
+@app.cli.command('cohort-report')
+@click.argument('report', type=click.Choice(sorted(analytics.REPORTS)))
+@click.option('--by', default=None, help='Comma-separated cohort columns, e.g. course_id,semester')
+def cohort_report_command(report, by):
+    """Print attendance or GPA distributions per cohort"""
+    started = time.perf_counter()
+    try:
+        result = analytics.cohort_report(report, by.split(',') if by else None)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    for cohort in result['cohorts']:
+        key = ' '.join(f'{column}={cohort[column]}' for column in result['by'])
+        click.echo(f"{key}: n={cohort['count']} mean={cohort['mean']} "
+                   f"p10={cohort['p10']} p50={cohort['p50']} p90={cohort['p90']} "
+                   f"histogram={cohort['histogram']}")
+    stats = analytics.get_analytics(refresh=False).stats()
+    click.echo(f"{stats['attendance_rows']} attendance and {stats['grade_rows']} grade rows "
+               f"({stats['memory_bytes'] / 1e6:.1f} MB) in {time.perf_counter() - started:.2f}s")
+
+@app.cli.command('score-risk')
+@click.option('--full', is_flag=True, help='Re-score every active student, not only changed ones')
+@click.option('--workers', type=int, default=None, help='Scoring processes (one course per task)')
+def score_risk_command(full, workers):
+    """Score at-risk students (run nightly)"""
+    result = score_students(full=full, workers=workers)
+    levels = ', '.join(f'{count} {level}' for level, count in sorted(result['levels'].items()))
+    click.echo(f"Run {result['run_id']} ({result['mode']}): {result['students_scored']} students "
+               f"in {result['courses']} courses scored in {result['elapsed_seconds']}s"
+               + (f' [{levels}]' if levels else ''))
+
+@app.cli.command('sweep-sessions')
+def sweep_sessions_command():
+    """Delete every expired server-side session"""
+    interface = app.session_interface
+    if not isinstance(interface, sessions.ServerSessionInterface):
+        raise click.ClickException('SESSION_BACKEND is cookie; nothing to sweep')
+    click.echo(f'Removed {interface.store.sweep(int(time.time()))} expired sessions')
+
+@app.cli.command('session-benchmark')
+@click.option('--requests', 'count', default=2000, help='Simulated requests per interface')
+def session_benchmark_command(count):
+    """Compare per-request session overhead of signed cookies and the server store"""
+    from flask.sessions import SecureCookieSessionInterface
+    
+    payload = {'loggedin': True, 'user_id': 1, 'student_id': 1,
+               'enrollment_number': 'EN2024000001', 'name': 'Benchmark Student',
+               'user_type': 'student'}
+    interfaces = {'cookie': SecureCookieSessionInterface(), app.config['SESSION_BACKEND']: app.session_interface}
+    
+    for label, interface in interfaces.items():
+        # Log in once to obtain the cookie a returning client would send
+        with app.test_request_context('/'):
+            new_session = interface.open_session(app, request)
+            new_session.update(payload)
+            response = app.response_class()
+            interface.save_session(app, new_session, response)
+            cookie = response.headers['Set-Cookie'].split(';', 1)[0]
+        
+        started = time.perf_counter()
+        for _ in range(count):
+            with app.test_request_context('/', headers={'Cookie': cookie}):
+                current = interface.open_session(app, request)
+                interface.save_session(app, current, app.response_class())
+        elapsed = time.perf_counter() - started
+        click.echo(f'{label:>7}: {elapsed / count * 1e6:8.1f} us/request, cookie header {len(cookie)} bytes')
+
+@app.cli.command('flush-logins')
+def flush_logins_command():
+    """Write buffered last_login timestamps now"""
+    click.echo(f'Flushed {write_behind.flush_logins()} last_login updates')
+
+@app.cli.command('password-benchmark')
+@click.option('--logins', default=200, help='Number of verifications to run')
+@click.option('--concurrency', default=32, help='Simultaneous login threads')
+def password_benchmark_command(logins, concurrency):
+    """Measure KDF verification throughput and latency on the configured pool"""
+    service = passwords.get_service()
+    stored_hash = hash_password('benchmark-password')
+    
+    def attempt(_):
+        try:
+            return service.verify('benchmark-password', stored_hash)[0]
+        except PasswordServiceBusy:
+            return None
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as clients:
+        results = list(clients.map(attempt, range(logins)))
+    elapsed = time.perf_counter() - started
+    
+    completed = sum(1 for result in results if result is not None)
+    stats = service.stats()
+    click.echo(f"{stats['kind']} pool, {stats['workers']} workers, queue depth {stats['queue_depth']}")
+    click.echo(f'{completed} verifications in {elapsed:.2f}s = {completed / elapsed:.1f} logins/s')
+    click.echo(f"latency ms {stats['latency_ms']}  kdf ms {stats['hash_ms']}  rejected {stats['rejected']}")
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create all tables on the configured database backend"""
+    backend = db.get_backend()
+    backend.create_schema(db.get_connection())
+    click.echo(f'Created UniHub schema on {backend.name}')
+
+@app.cli.command('attendance-summary')
+@click.argument('action', type=click.Choice(['rebuild', 'verify']))
+def attendance_summary_command(action):
+    """Rebuild or verify the attendance_summary counters"""
+    cursor = db.get_cursor()
+    
+    if action == 'rebuild':
+        rows = rebuild_summary(cursor)
+        db.commit()
+        click.echo(f'Rebuilt {rows} attendance summary rows')
+        return
+    
+    mismatches = verify_summary(cursor)
+    for student_id, subject_id, stored, actual in mismatches:
+        click.echo(f'student {student_id} subject {subject_id}: stored {stored} actual {actual}')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} attendance summary rows out of date')
+    click.echo('Attendance summary is consistent')
+
+@app.cli.command('attendance-calendar')
+@click.argument('action', type=click.Choice(['rebuild', 'verify']))
+def attendance_calendar_command(action):
+    """Rebuild or verify the monthly attendance_calendar bitmaps"""
+    cursor = db.get_cursor()
+    
+    if action == 'rebuild':
+        rows = rebuild_calendar(cursor)
+        db.commit()
+        click.echo(f'Rebuilt {rows} attendance calendar rows')
+        return
+    
+    mismatches = verify_calendar(cursor)
+    for student_id, subject_id, month, stored, actual in mismatches:
+        click.echo(f'student {student_id} subject {subject_id} {month}: stored {stored} actual {actual}')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} attendance calendar rows out of date')
+    click.echo('Attendance calendar is consistent')
+
+@app.cli.command('gpa-rollups')
+@click.argument('action', type=click.Choice(['rebuild', 'verify']))
+def gpa_rollups_command(action):
+    """Rebuild or verify the semester_gpa and student_cgpa rollups"""
+    cursor = db.get_cursor()
+    
+    if action == 'rebuild':
+        rows = rebuild_rollups(cursor)
+        db.commit()
+        click.echo(f'Rebuilt {rows} semester GPA rows')
+        return
+    
+    mismatches = verify_rollups(cursor)
+    for student_id, semester, stored, actual in mismatches:
+        scope = 'cgpa' if semester == -1 else f'semester {semester}'
+        click.echo(f'student {student_id} {scope}: stored {stored} actual {actual}')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} GPA rollup rows out of date')
+    click.echo('GPA rollups are consistent')
+
+@app.cli.command('fee-ledger')
+@click.argument('action', type=click.Choice(['rebuild', 'verify', 'charge']))
+def fee_ledger_command(action):
+    """Rebuild or verify fee_ledger, or charge current semester fees"""
+    cursor = db.get_cursor()
+    
+    if action == 'charge':
+        rows = charge_current_fees(cursor)
+        db.commit()
+        click.echo(f'Opened {rows} ledger rows')
+        return
+    if action == 'rebuild':
+        rows = rebuild_ledger(cursor)
+        db.commit()
+        click.echo(f'Rebuilt {rows} ledger rows')
+        return
+    
+    mismatches = verify_ledger(cursor)
+    for student_id, fee_structure_id, stored, actual in mismatches:
+        click.echo(f'student {student_id} fee structure {fee_structure_id}: '
+                   f'stored {stored} actual {actual}')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} ledger rows out of date')
+    click.echo('Fee ledger is consistent')
+
+@app.cli.command('defaulters')
+@click.option('--academic-year', default=None, help='Only fees of this academic year')
+@click.option('--course-id', type=int, default=None)
+@click.option('--min-balance', type=float, default=0.0, help='Ignore balances at or below this')
+def defaulters_command(academic_year, course_id, min_balance):
+    """Print every student with an outstanding fee balance"""
+    rows = defaulters(db.get_cursor(), academic_year, course_id, min_balance)
+    for row in rows:
+        click.echo(f"{row['enrollment_number']}\t{row['first_name']} {row['last_name']}\t"
+                   f"{row['open_items']} open\t{row['outstanding']}")
+    click.echo(f'{len(rows)} defaulters')
+
+@app.cli.command('dispatch')
+@click.argument('job_id', type=int, required=False)
+def dispatch_command(job_id):
+    """Run a dispatch job, or resume every queued, interrupted or failed one"""
+    job_ids = [job_id] if job_id else dispatch.pending_jobs(db.get_cursor())
+    for current in job_ids:
+        job = dispatch.run_job(current, progress=lambda counters: click.echo(
+            f"  {counters['recipients']} recipients, {counters['sent']} sent, "
+            f"{counters['failed']} failed, {counters['skipped']} already sent"))
+        click.echo(f"Job {job['job_id']} {job['status']}: {job['sent']}/{job['recipients']} sent, "
+                   f"{job['failed']} failed")
+    if not job_ids:
+        click.echo('No pending dispatch jobs')
+
+@app.cli.command('smtp-sink')
+@click.option('--host', default='127.0.0.1')
+@click.option('--port', default=1025)
+@click.option('--mbox', default=None, help='Append received messages to this file')
+@click.option('--fail-every', default=0, help='Answer every Nth message with a 451 to test retries')
+def smtp_sink_command(host, port, mbox, fail_every):
+    """Run a local SMTP server that accepts and discards outbound mail"""
+    from unihub.smtp_sink import SMTPSink
+    
+    sink = SMTPSink(host, port, mbox_path=mbox, fail_every=fail_every)
+    click.echo(f'SMTP sink listening on {host}:{port}; Ctrl+C to stop')
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    click.echo(f'{sink.received} messages received over {sink.connections} connections, '
+               f'{sink.rejected} rejected')
+
+@app.cli.command('mail-benchmark')
+@click.option('--messages', default=2000)
+def mail_benchmark_command(messages):
+    """Measure pooled SMTP throughput against an in-process sink"""
+    rate, connections = dispatch.benchmark(messages)
+    click.echo(f'{messages} messages at {rate:.0f}/s over {connections} SMTP connections')
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Fingerprint, minify and precompress static/ into the build directory"""
+    built = assets.build(app.static_folder, app.config['ASSET_BUILD_DIR'])
+    assets.load_manifest(app)
+    total = sum(entry['size'] for entry in built.values())
+    compressed = sum(1 for entry in built.values() if entry['encodings'])
+    click.echo(f"Built {len(built)} assets ({total} bytes, {compressed} precompressed) "
+               f"into static/{app.config['ASSET_BUILD_DIR']}")
+
+@app.cli.command('warm-up')
+def warm_up_command():
+    """Run the production cache warm-up and report what it loaded"""
+    report = warmup.warm_up(app)
+    click.echo(', '.join(f'{name} {value}' for name, value in report.items()))
+
+@app.cli.command('asgi-benchmark')
+@click.option('--enrollment', required=True, help='Student to sign in as')
+@click.option('--password', required=True)
+@click.option('--requests', 'count', default=2000, help='Requests per deployment')
+@click.option('--concurrency', default=64, help='Simultaneous client connections')
+@click.option('--workers', default=2, help='Worker processes for both deployments')
+@click.option('--port', default=8901)
+def asgi_benchmark_command(enrollment, password, count, concurrency, workers, port):
+    """Compare gunicorn sync workers with unihub.asgi on the student pages"""
+    from unihub import loadtest
+    
+    paths = ['/dashboard', '/attendance', '/grades', '/internships', '/fees']
+    deployments = [
+        ('sync', [sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+                  '--bind', f'127.0.0.1:{port}', 'unihub.app:app']),
+        ('async', [sys.executable, '-m', 'uvicorn', '--workers', str(workers),
+                   '--port', str(port), '--log-level', 'warning', 'unihub.asgi:application']),
+    ]
+    for label, command in deployments:
+        try:
+            with loadtest.serve(command, port) as server:
+                cookie = loadtest.login_cookie('127.0.0.1', port, enrollment, password)
+                # Warm caches and pools on every worker before measuring
+                loadtest.run_load('127.0.0.1', port, paths, cookie, min(count, 500), concurrency)
+                result = loadtest.run_load('127.0.0.1', port, paths, cookie, count, concurrency)
+                rss = loadtest.process_tree_rss(server.pid)
+        except loadtest.ServerFailed as exc:
+            raise click.ClickException(f'{label}: {exc}')
+        click.echo(f"{label:>5}: {result['rps']:7.1f} req/s  p50 {result['p50_ms']:6.1f} ms  "
+                   f"p95 {result['p95_ms']:6.1f} ms  p99 {result['p99_ms']:6.1f} ms  "
+                   f"errors {result['errors']}  RSS {rss / 2 ** 20:.0f} MB")
+
+@app.cli.command('benchmark')
+@click.option('--students', default=500, help='Students in the seeded database')
+@click.option('--stages', default='1,8,32,64', help='Client concurrency of each stage')
+@click.option('--requests', 'count', default=500, help='Requests per run of a stage')
+@click.option('--repeat', default=3, help='Runs per stage; figures are their medians')
+@click.option('--workers', default=2, help='gunicorn worker processes')
+@click.option('--seed', default=1, help='Seed for the generated data and the visit mix')
+@click.option('--port', default=8902)
+@click.option('--save', 'save_path', type=click.Path(dir_okay=False),
+              help='Write the results to this baseline file')
+@click.option('--compare', 'baseline_path', type=click.Path(exists=True, dir_okay=False),
+              help='Fail on regressions against this baseline file')
+@click.option('--tolerance', default=0.25, help='Slowdown allowed against the baseline (fraction)')
+@click.option('--budget-ms', default=2000.0, help="Fail if a page's p95 latency exceeds this")
+def benchmark_command(students, stages, count, repeat, workers, seed, port, save_path,
+                      baseline_path, tolerance, budget_ms):
+    """Load-test the student pages on gunicorn against a seeded SQLite database"""
+    from unihub import benchmark, loadtest
+    
+    baseline = benchmark.load_results(baseline_path) if baseline_path else None
+    
+    def progress(stage):
+        for line in benchmark.format_stage(stage):
+            click.echo(line)
+    
+    try:
+        results = benchmark.run_suite(students, [int(value) for value in stages.split(',')], count,
+                                      repeat, workers, seed, port,
+                                      password_method=app.config['PASSWORD_HASH_METHOD'],
+                                      progress=progress)
+    except loadtest.ServerFailed as exc:
+        raise click.ClickException(str(exc))
+    if save_path:
+        benchmark.save_results(save_path, results)
+        click.echo(f'Results saved to {save_path}')
+    
+    problems = benchmark.check_results(results, budget_ms)
+    if baseline is not None:
+        problems += benchmark.compare(baseline, results, tolerance)
+    for problem in problems:
+        click.echo(f'FAIL {problem}', err=True)
+    if problems:
+        raise click.ClickException(f'{len(problems)} checks failed')
+    click.echo('All checks passed')
+
+# Routes
+
+@app.route('/')
+def index():
+    """Redirect to login page"""
+    return redirect(url_for('login'))
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    """Handle student and admin login"""
+    msg = ''
+    
+    if request.method == 'POST' and 'enrollment_number' in request.form and 'password' in request.form:
+        enrollment_number = request.form['enrollment_number']
+        password = request.form['password']
+        
+        cursor = db.get_cursor()
+        cursor.execute("""
+            SELECT s.*, u.user_id, u.email, u.password_hash, c.course_name 
+            FROM students s
+            JOIN users u ON s.user_id = u.user_id
+            JOIN courses c ON s.course_id = c.course_id
+            WHERE s.enrollment_number = %s AND u.is_active = TRUE
+        """, (enrollment_number,))
+        
+        student = cursor.fetchone()
+        account = student
+        if student is None:
+            # Admins sign in with their username in the same field
+            cursor.execute("""
+                SELECT user_id, username, password_hash, user_type FROM users
+                WHERE username = %s AND user_type = 'admin' AND is_active = TRUE
+            """, (enrollment_number,))
+            account = cursor.fetchone()
+        
+        # Verify on the password pool rather than in the request thread; unknown
+        # accounts are checked against a dummy hash so they take as long
+        try:
+            verified, upgraded_hash = verify_password(
+                password, account['password_hash'] if account else None)
+        except PasswordServiceBusy:
+            msg = 'Too many sign-ins right now, please try again in a moment.'
+            return render_template('login.html', msg=msg), 503, {'Retry-After': '1'}
+        
+        if verified:
+            # Create session under a fresh ID
+            sessions.rotate_session(session)
+            session['user_id'] = account['user_id']
+            if student:
+                session['loggedin'] = True
+                session['user_type'] = 'student'
+                session['student_id'] = student['student_id']
+                session['enrollment_number'] = student['enrollment_number']
+                session['name'] = f"{student['first_name']} {student['last_name']}"
+            else:
+                # No 'loggedin': the student pages need a student_id
+                session['user_type'] = account['user_type']
+                session['name'] = account['username']
+            
+            # Replace a legacy SHA-256 hash now that the password is known
+            if upgraded_hash:
+                cursor.execute('UPDATE users SET password_hash = %s WHERE user_id = %s',
+                             (upgraded_hash, account['user_id']))
+                db.commit()
+            
+            # Update last login through the write-behind buffer
+            write_behind.record_login(account['user_id'])
+            
+            return redirect(url_for('dashboard') if student else url_for('admin.index'))
+        else:
+            msg = 'Incorrect enrollment number or password!'
+    
+    return render_template('login.html', msg=msg)
+
+@app.route('/dashboard')
+def dashboard():
+    """Student dashboard"""
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    # Get student details
+    student = get_profile(session['student_id'])
+    if student is None:
+        abort(404)
+    
+    # Get recent notifications from the versioned feed cache
+    feed = get_feed('Students')
+    
+    # Precomputed GPA and CGPA
+    gpa = calculate_gpa(session['student_id'], student['semester'])
+    cgpa = calculate_cgpa(session['student_id'])
+    
+    return render_template('dashboard.html', student=student,
+                         notifications=feed['items'], notifications_html=feed['html'],
+                         gpa=gpa, cgpa=cgpa)
+
+@app.route('/attendance')
+def attendance():
+    """View attendance records"""
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    # Get subjects with attendance totals and percentage in one query
+    subjects = get_subject_summaries(db.get_cursor(), session['student_id'])
+    
+    return render_template('attendance.html', subjects=subjects)
+
+@app.route('/attendance/calendar')
+def attendance_calendar():
+    """Monthly attendance calendar per subject (?month=YYYY-MM)"""
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    month = request.args.get('month') or datetime.now().strftime('%Y-%m')
+    try:
+        first = datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        abort(400)
+    previous_month = f'{first.year - 1}-12' if first.month == 1 else f'{first.year}-{first.month - 1:02d}'
+    next_month = f'{first.year + 1}-01' if first.month == 12 else f'{first.year}-{first.month + 1:02d}'
+    
+    # Three bitmaps per subject; counts and percentages are popcounts
+    subjects = get_month_calendar(db.get_cursor(), session['student_id'], first.strftime('%Y-%m'))
+    
+    return render_template('attendance_calendar.html', subjects=subjects,
+                         month=first, previous_month=previous_month, next_month=next_month)
+
+@app.route('/attendance/history')
+def attendance_history_view():
+    """Day-by-day attendance, newest first, one keyset page at a time"""
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    subject_id = request.args.get('subject_id', type=int)
+    cursor = db.get_cursor()
+    try:
+        records, next_cursor = attendance_history(cursor, session['student_id'], subject_id,
+                                                  request.args.get('after'),
+                                                  app.config['HISTORY_PAGE_SIZE'])
+    except ValueError:
+        abort(400)
+    
+    return render_template('attendance_history.html', records=records, next_cursor=next_cursor,
+                         subject_id=subject_id,
+                         totals=attendance_totals(cursor, session['student_id'], subject_id))
+
+@app.route('/grades')
+def grades():
+    """View grades and GPA"""
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    # Get current semester
+    student = get_profile(session['student_id'])
+    if student is None:
+        abort(404)
+    current_semester = student['semester']
+    
+    cursor = db.get_cursor()
+    
+    # Get grades for current semester
+    cursor.execute("""
+        SELECT g.*, s.subject_name, s.subject_code, s.credits 
+        FROM grades g
+        JOIN subjects s ON g.subject_id = s.subject_id
+        WHERE g.student_id = %s AND g.semester = %s
+    """, (session['student_id'], current_semester))
+    grades = cursor.fetchall()
+    
+    # Precomputed GPA and CGPA
+    gpa = calculate_gpa(session['student_id'], current_semester)
+    cgpa = calculate_cgpa(session['student_id'])
+    
+    return render_template('grades.html', grades=grades, gpa=gpa, cgpa=cgpa,
+                         semester=current_semester)
+
+@app.route('/internships')
+def internships():
+    """View internship credits"""
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    cursor = db.get_cursor()
+    
+    # One keyset page; totals come from an aggregate, not the page
+    try:
+        internship_records, next_cursor = internship_history(
+            cursor, session['student_id'], request.args.get('after'),
+            app.config['HISTORY_PAGE_SIZE'])
+    except ValueError:
+        abort(400)
+    totals = internship_totals(cursor, session['student_id'])
+    
+    return render_template('internships.html', 
+                         internships=internship_records, 
+                         total_credits=totals['total_credits'],
+                         next_cursor=next_cursor)
+
+@app.route('/fees')
+def fees():
+    """View fee details"""
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    
+    student = get_profile(session['student_id'])
+    if student is None:
+        abort(404)
+    cursor = db.get_cursor()
+    
+    # Get the latest fee structure for the current course and semester
+    fee_structure = current_fee_structure(cursor, student['course_id'], student['semester'])
+    
+    # One keyset page of payment history
+    try:
+        payments, next_cursor = payment_history(cursor, session['student_id'],
+                                                request.args.get('after'),
+                                                app.config['HISTORY_PAGE_SIZE'])
+    except ValueError:
+        abort(400)
+    
+    # Balance and totals from the ledger: only Completed payments count as paid
+    balance = 0
+    if fee_structure:
+        ledger = get_ledger(cursor, session['student_id'], fee_structure['fee_structure_id'])
+        balance = ledger['balance'] if ledger else fee_structure['total_fee']
+    totals = ledger_totals(cursor, session['student_id'])
+    
+    return render_template('fees.html', 
+                         fee_structure=fee_structure, 
+                         payments=payments, 
+                         balance=balance,
+                         outstanding=totals['outstanding'],
+                         total_paid=totals['paid'],
+                         next_cursor=next_cursor)
+
+@app.route('/export/<report>.<fmt>')
+def export(report, fmt):
+    """Download the student's own attendance, grades or fee payments as CSV/PDF"""
+    if 'loggedin' not in session:
+        return redirect(url_for('login'))
+    if report not in REPORTS or fmt not in FORMATS:
+        abort(404)
+    
+    # Streamed from a server-side cursor; nothing is buffered per request
+    return export_response(report, fmt, {'student_id': session['student_id']})
+
+@app.route('/logout')
+def logout():
+    """Logout user"""
+    # Clearing deletes the server-side record, so the session ID is dead
+    session.clear()
+    return redirect(url_for('login'))
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,398 @@
+"""ASGI deployment of the portal
+
+    uvicorn unihub.asgi:application --workers 2
+
+(needs uvicorn, plus aiomysql for MySQL or aiosqlite for SQLite). The
+student pages that are read on every visit (dashboard, attendance, grades,
+internships and fees) run as coroutines on unihub.aiodb. Queries that do
+not depend on each other are gathered, so a page costs its longest chain
+of queries rather than their sum, and a worker is not held while they run.
+
+Every other route is the unchanged Flask app, called on a thread pool of
+ASGI_WSGI_THREADS threads, so logins, admin, the JSON API, exports and
+static files behave exactly as under gunicorn. Request bodies beyond
+ASGI_BODY_MEMORY_SIZE bytes are spooled to a temporary file. The async views
+use Flask's request context for sessions, templates and url_for, their
+responses go through the same compression middleware, and they and their
+queries are recorded in the same metrics registry (unihub.metrics). Session
+loads and saves touch the sync pool and run off the event loop. Each worker
+warms its caches and opens its sync pool's minimum connections
+(unihub.warmup) before the server lets it take requests.
+"""
+
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import abort, redirect, render_template, request, session, url_for
+from flask.ctx import RequestContext
+from markupsafe import Markup
+from werkzeug.exceptions import HTTPException, MethodNotAllowed, NotFound
+
+from unihub import aiodb, fees, internships
+from unihub.app import app as flask_app
+from unihub.attendance import SUBJECT_SUMMARIES_QUERY, summaries_from_rows
+from unihub.compression import CompressionMiddleware
+from unihub.grades import CGPA_QUERY, GPA_QUERY, SEMESTER_GRADES_QUERY
+from unihub.notifications import (AUDIENCES, FEED_QUERY, VERSION_KEY as NOTIFICATIONS_VERSION,
+                                  VERSION_QUERY, feed_cache, feed_entry)
+from unihub.pagination import seek_query, seek_result
+from unihub.profiles import (PROFILE_QUERY, VERSION_KEY as PROFILES_VERSION, profile_cache,
+                             with_display_name)
+from unihub.warmup import warm_pool, warm_up
+
+
+# Reads shared by the views; each takes the worker's AsyncConnectionPool
+
+async def get_profile(pool, student_id):
+    """profiles.get_profile on the async pool, through the same cache
+
+    As in get_feed, the version is read on every call.
+    """
+    row = await pool.fetchone(VERSION_QUERY, (PROFILES_VERSION,))
+    key = (student_id, row['version'] if row else 0)
+    cache = profile_cache()
+    profile = cache.get(key)
+    if profile is None:
+        profile = with_display_name(await pool.fetchone(PROFILE_QUERY, (student_id,)))
+        if profile is not None:
+            cache.set(key, profile)
+    return profile
+
+
+async def get_gpa(pool, student_id, semester):
+    """grades.get_gpa on the async pool"""
+    row = await pool.fetchone(GPA_QUERY, (student_id, semester))
+    return float(row['gpa']) if row else 0.0
+
+
+async def get_cgpa(pool, student_id):
+    """grades.get_cgpa on the async pool"""
+    row = await pool.fetchone(CGPA_QUERY, (student_id,))
+    return float(row['cgpa']) if row else 0.0
+
+
+async def get_feed(pool, audience='Students', limit=5):
+    """notifications.get_feed on the async pool
+
+    The version is read on every call (one primary-key lookup, gathered
+    with the page's other queries) rather than every NOTIFICATIONS_VERSION_TTL.
+    """
+    row = await pool.fetchone(VERSION_QUERY, (NOTIFICATIONS_VERSION,))
+    key = (audience, limit, row['version'] if row else 0)
+    feeds = feed_cache()
+    feed = feeds.get(key)
+    if feed is None:
+        feed = feed_entry(await pool.fetchall(FEED_QUERY, AUDIENCES[audience] + (limit,)))
+        feeds.set(key, feed)
+    return {'items': feed['items'], 'html': Markup(feed['html'])}
+
+
+def _page_size():
+    return flask_app.config['HISTORY_PAGE_SIZE']
+
+
+# Views: async counterparts of the routes of the same name in unihub.app.
+# Login is checked by PortalASGI before a view runs.
+
+async def dashboard(pool):
+    """Student dashboard: profile then GPA, alongside CGPA and notifications"""
+    student_id = session['student_id']
+    
+    async def profile_and_gpa():
+        student = await get_profile(pool, student_id)
+        if student is None:
+            abort(404)
+        return student, await get_gpa(pool, student_id, student['semester'])
+    
+    (student, gpa), cgpa, feed = await asyncio.gather(
+        profile_and_gpa(), get_cgpa(pool, student_id), get_feed(pool, 'Students'))
+    
+    return render_template('dashboard.html', student=student,
+                           notifications=feed['items'], notifications_html=feed['html'],
+                           gpa=gpa, cgpa=cgpa)
+
+
+async def attendance(pool):
+    """Attendance totals per subject"""
+    rows = await pool.fetchall(SUBJECT_SUMMARIES_QUERY, (session['student_id'],))
+    subjects = summaries_from_rows(rows)
+    return render_template('attendance.html', subjects=subjects)
+
+
+async def grades(pool):
+    """Current semester's grades: profile then grades and GPA, alongside CGPA"""
+    student_id = session['student_id']
+    
+    async def semester_grades():
+        student = await get_profile(pool, student_id)
+        if student is None:
+            abort(404)
+        semester = student['semester']
+        rows, gpa = await asyncio.gather(
+            pool.fetchall(SEMESTER_GRADES_QUERY, (student_id, semester)),
+            get_gpa(pool, student_id, semester))
+        return semester, rows, gpa
+    
+    (semester, rows, gpa), cgpa = await asyncio.gather(semester_grades(),
+                                                       get_cgpa(pool, student_id))
+    return render_template('grades.html', grades=rows, gpa=gpa, cgpa=cgpa, semester=semester)
+
+
+async def internships_view(pool):
+    """One page of internships alongside the credit totals"""
+    student_id = session['student_id']
+    try:
+        sql, params = seek_query(internships.INTERNSHIP_HISTORY_SELECT, ['student_id = %s'],
+                                 [student_id], internships.INTERNSHIP_HISTORY_KEY,
+                                 request.args.get('after'), _page_size())
+    except ValueError:
+        abort(400)
+    
+    rows, totals = await asyncio.gather(
+        pool.fetchall(sql, params),
+        pool.fetchone(internships.INTERNSHIP_TOTALS_QUERY, (student_id,)))
+    records, next_cursor = seek_result(rows, internships.INTERNSHIP_HISTORY_KEY, _page_size())
+    
+    return render_template('internships.html', internships=records,
+                           total_credits=internships.totals_from_row(totals)['total_credits'],
+                           next_cursor=next_cursor)
+
+
+async def fees_view(pool):
+    """Fee structure and balance alongside a page of payments and ledger totals"""
+    student_id = session['student_id']
+    try:
+        sql, params = seek_query(fees.PAYMENT_HISTORY_SELECT, ['student_id = %s'], [student_id],
+                                 fees.PAYMENT_HISTORY_KEY, request.args.get('after'),
+                                 _page_size())
+    except ValueError:
+        abort(400)
+    
+    # Fee structure and ledger depend on the profile; history and totals do not
+    async def structure_and_balance():
+        student = await get_profile(pool, student_id)
+        if student is None:
+            abort(404)
+        fee_structure = await pool.fetchone(fees.FEE_STRUCTURE_QUERY,
+                                            (student['course_id'], student['semester']))
+        balance = 0
+        if fee_structure:
+            ledger = await pool.fetchone(fees.LEDGER_QUERY,
+                                         (student_id, fee_structure['fee_structure_id']))
+            balance = ledger['balance'] if ledger else fee_structure['total_fee']
+        return fee_structure, balance
+    
+    (fee_structure, balance), rows, totals = await asyncio.gather(
+        structure_and_balance(),
+        pool.fetchall(sql, params),
+        pool.fetchone(fees.LEDGER_TOTALS_QUERY, (student_id,)))
+    payments, next_cursor = seek_result(rows, fees.PAYMENT_HISTORY_KEY, _page_size())
+    totals = fees.totals_from_row(totals)
+    
+    return render_template('fees.html',
+                           fee_structure=fee_structure,
+                           payments=payments,
+                           balance=balance,
+                           outstanding=totals['outstanding'],
+                           total_paid=totals['paid'],
+                           next_cursor=next_cursor)
+
+
+# Flask endpoint -> async view; GETs of these endpoints never reach the thread pool
+ASYNC_VIEWS = {
+    'dashboard': dashboard,
+    'attendance': attendance,
+    'grades': grades,
+    'internships': internships_view,
+    'fees': fees_view,
+}
+
+
+def _environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope; body is the file _read_body returns"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        value = value.decode('latin-1')
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ', ') + value
+        environ[key] = value
+    return environ
+
+
+async def _read_body(receive, max_memory):
+    """The request body in a file: in memory up to max_memory bytes, on disk beyond"""
+    body = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body.write(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body.seek(0)
+    return body
+
+
+class PortalASGI:
+    """ASGI application serving ASYNC_VIEWS natively and the rest through Flask"""
+
+    def __init__(self, app):
+        app.config.setdefault('ASGI_DB_POOL_SIZE', 10)
+        app.config.setdefault('ASGI_WSGI_THREADS', 8)
+        app.config.setdefault('ASGI_BODY_MEMORY_SIZE', 1024 * 1024)
+        self.app = app
+        self.executor = ThreadPoolExecutor(app.config['ASGI_WSGI_THREADS'],
+                                           thread_name_prefix='asgi-wsgi')
+        self.pool = None
+
+    def get_pool(self):
+        """The worker's async pool, created inside its event loop on first use"""
+        if self.pool is None:
+            config = self.app.config
+            self.pool = aiodb.AsyncConnectionPool(
+                aiodb.from_config(config),
+                max_size=config['ASGI_DB_POOL_SIZE'],
+                timeout=config['DB_POOL_TIMEOUT'],
+                idle_timeout=config['DB_POOL_IDLE_TIMEOUT'],
+                metrics=self.app.extensions.get('metrics'),
+            )
+        return self.pool
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        
+        body = await _read_body(receive, self.app.config['ASGI_BODY_MEMORY_SIZE'])
+        try:
+            environ = _environ(scope, body)
+            view = None
+            if scope['method'] == 'GET':
+                try:
+                    rule, _ = self.app.url_map.bind_to_environ(environ).match(return_rule=True)
+                    view = ASYNC_VIEWS.get(rule.endpoint)
+                except (NotFound, MethodNotAllowed):
+                    pass
+            if view is None:
+                await self._send_wsgi(self.app, environ, send, in_thread=True)
+            else:
+                await self._call_view(view, rule.rule, environ, send)
+        finally:
+            body.close()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Servers start taking requests only once startup completes
+                await asyncio.to_thread(warm_up, self.app)
+                await asyncio.to_thread(warm_pool, self.app)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.pool is not None:
+                    await self.pool.close()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _call_view(self, view, route, environ, send):
+        """Run an async view inside a Flask request context"""
+        app = self.app
+        interface = app.session_interface
+        registry = app.extensions.get('metrics')
+        record = None
+        if registry is not None:
+            # Current for this task, and for the gathered queries and threads it starts
+            record = registry.start_request('GET', environ['PATH_INFO'], route)
+        
+        incoming = app.request_class(environ)
+        opened = await asyncio.to_thread(interface.open_session, app, incoming)
+        if opened is None:
+            opened = interface.make_null_session(app)
+        ctx = RequestContext(app, environ, incoming, opened)
+        ctx.push()
+        try:
+            try:
+                if 'loggedin' not in opened:
+                    result = redirect(url_for('login'))
+                else:
+                    result = await view(self.get_pool())
+            except HTTPException as exc:
+                result = app.handle_http_exception(exc)
+            except Exception as exc:
+                result = app.handle_exception(exc)
+            response = app.make_response(result)
+            # Saves the session (a touch of user_sessions) with the context copied over
+            response = await asyncio.to_thread(app.process_response, response)
+        finally:
+            ctx.pop()
+        
+        compressed = CompressionMiddleware(response, app.config['COMPRESS_MIN_SIZE'],
+                                           app.config['COMPRESS_LEVEL'])
+        await self._send_wsgi(compressed, environ, send, in_thread=False)
+        if record is not None:
+            registry.finish_request(record, response.status_code)
+
+    async def _send_wsgi(self, wsgi_app, environ, send, in_thread):
+        """Call a WSGI app and stream its response; blocking apps run on the executor"""
+        loop = asyncio.get_running_loop()
+        
+        async def call(function, *args):
+            if in_thread:
+                return await loop.run_in_executor(self.executor, function, *args)
+            return function(*args)
+        
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [int(status.split(' ', 1)[0]), headers]
+            
+        body = await call(wsgi_app, environ, start_response)
+        try:
+            # start_response may be deferred to the first chunk of a generator
+            chunks = iter(body)
+            chunk = await call(next, chunks, None)
+            status, headers = started
+            await send({
+                'type': 'http.response.start',
+                'status': status,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in headers],
+            })
+            while chunk is not None:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await call(next, chunks, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(body, 'close'):
+                await call(body.close)
+
+
+application = PortalASGI(flask_app)
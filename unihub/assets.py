@@ -0,0 +1,192 @@
+"""Fingerprinted, precompressed static assets
+
+`flask build-assets` copies every file under static/ (except the build
+directory) into static/dist/ under a content-hashed name such as
+css/style.3f2a9c1b7e.css, minifying CSS and JS on the way and writing .gz
+and .br (when the brotli package is installed) siblings for text assets.
+A manifest maps logical names to hashed ones.
+
+When a manifest is present, url_for('static', filename='css/style.css')
+resolves to the hashed file, which is served with a year-long immutable
+Cache-Control and, if the client accepts it, the precompressed variant. A
+changed file gets a new name, so browsers never revalidate assets. Without
+a build, static files are served as before.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import current_app, request, send_from_directory
+
+MANIFEST_NAME = 'manifest.json'
+
+# Already-compressed formats are fingerprinted but not precompressed
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map'}
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _minify_css(text):
+    try:
+        import rcssmin
+    except ImportError:
+        text = re.sub(r'/\*.*?\*/', '', text, flags=re.DOTALL)
+        text = re.sub(r'\s+', ' ', text)
+        text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+        return text.replace(';}', '}').strip()
+    return rcssmin.cssmin(text)
+
+
+def _minify_js(text):
+    """rjsmin if installed, else only whole-line comments and indentation go
+
+    The fallback never touches code inside a line, so string and regex
+    literals that look like comments are safe.
+    """
+    try:
+        import rjsmin
+    except ImportError:
+        text = re.sub(r'^\s*/\*.*?\*/[ \t]*$', '', text, flags=re.DOTALL | re.MULTILINE)
+        lines = (line.strip() for line in text.splitlines())
+        return '\n'.join(line for line in lines if line and not line.startswith('//'))
+    return rjsmin.jsmin(text)
+
+
+MINIFIERS = {'.css': _minify_css, '.js': _minify_js}
+
+
+def _brotli_compress(data):
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def _hashed_name(path, data):
+    root, extension = os.path.splitext(path)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:10]}{extension}'
+
+
+def build(static_folder, build_dir='dist'):
+    """Write fingerprinted, minified and precompressed copies; returns the manifest
+
+    The previous build directory is replaced, so pages rendered before the
+    build must not outlive it; deploy the new build with the new code.
+    """
+    output = os.path.join(static_folder, build_dir)
+    staging = output + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    
+    assets = {}
+    for directory, subdirectories, files in os.walk(static_folder):
+        relative_dir = os.path.relpath(directory, static_folder)
+        if relative_dir == '.':
+            subdirectories[:] = [name for name in subdirectories
+                                 if name not in (build_dir, build_dir + '.tmp')]
+        for name in sorted(files):
+            source = os.path.join(directory, name)
+            logical = os.path.normpath(os.path.join(relative_dir, name)).replace(os.sep, '/')
+            extension = os.path.splitext(name)[1].lower()
+            with open(source, 'rb') as stream:
+                data = stream.read()
+            if extension in MINIFIERS:
+                data = MINIFIERS[extension](data.decode('utf-8')).encode('utf-8')
+    
+            hashed = _hashed_name(logical, data)
+            target = os.path.join(staging, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as stream:
+                stream.write(data)
+    
+            encodings = []
+            if extension in COMPRESSIBLE_EXTENSIONS:
+                variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0),
+                            'br': _brotli_compress(data)}
+                for encoding, suffix in ENCODINGS:
+                    compressed = variants[encoding]
+                    # Tiny files can grow; only keep variants that save bytes
+                    if compressed is not None and len(compressed) < len(data):
+                        with open(target + suffix, 'wb') as stream:
+                            stream.write(compressed)
+                        encodings.append(encoding)
+            assets[logical] = {'file': hashed, 'size': len(data), 'encodings': encodings}
+    
+    with open(os.path.join(staging, MANIFEST_NAME), 'w') as stream:
+        json.dump({'build_dir': build_dir, 'assets': assets}, stream, indent=1, sort_keys=True)
+    shutil.rmtree(output, ignore_errors=True)
+    os.replace(staging, output)
+    return assets
+
+
+def load_manifest(app):
+    """Read the build manifest into app.extensions; False if there is none"""
+    path = os.path.join(app.static_folder, app.config['ASSET_BUILD_DIR'], MANIFEST_NAME)
+    try:
+        with open(path) as stream:
+            manifest = json.load(stream)
+    except FileNotFoundError:
+        app.extensions['assets'] = None
+        return False
+    build_dir = manifest['build_dir']
+    app.extensions['assets'] = {
+        'urls': {logical: f"{build_dir}/{entry['file']}"
+                 for logical, entry in manifest['assets'].items()},
+        'files': {f"{build_dir}/{entry['file']}": (logical, entry['encodings'])
+                  for logical, entry in manifest['assets'].items()},
+    }
+    return True
+
+
+def _hashed_url(endpoint, values):
+    """url_defaults hook: point static URLs at the hashed build output"""
+    if endpoint != 'static' or 'filename' not in values:
+        return
+    assets = current_app.extensions.get('assets')
+    if assets:
+        values['filename'] = assets['urls'].get(values['filename'], values['filename'])
+
+
+def _accepted(encoding):
+    return request.accept_encodings[encoding] > 0
+
+
+def serve_static(filename):
+    """Static view: hashed files immutably and precompressed, others as before"""
+    app = current_app
+    assets = app.extensions.get('assets')
+    entry = assets['files'].get(filename) if assets else None
+    if entry is None:
+        return app.send_static_file(filename)
+    
+    logical, encodings = entry
+    mimetype = mimetypes.guess_type(logical)[0] or 'application/octet-stream'
+    for encoding, suffix in ENCODINGS:
+        if encoding in encodings and _accepted(encoding):
+            response = send_from_directory(app.static_folder, filename + suffix,
+                                           mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(app.static_folder, filename,
+                                       mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    if encodings:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    """Load the manifest (if built) and route static URLs through it"""
+    app.config.setdefault('ASSET_BUILD_DIR', 'dist')
+    load_manifest(app)
+    app.url_defaults(_hashed_url)
+    app.view_functions['static'] = serve_static
@@ -0,0 +1,526 @@
+"""Attendance writes and the attendance_summary counters they maintain
+
+Every function takes the caller's DictCursor and never commits, so the
+counter update lands in the same transaction as the attendance row it
+describes.
+
+Writes also maintain attendance_calendar: one row per (student, subject,
+month) with a bitmap per status, bit day - 1 set for each day marked with
+that status. A monthly calendar is three integers instead of ~30 rows, and
+monthly counts are popcounts.
+"""
+
+import calendar
+
+from unihub.changes import bump_student_data, bump_versions, mark_changed
+from unihub.pagination import seek_page
+
+STATUS_COLUMNS = {
+    'Present': 'present_count',
+    'Absent': 'absent_count',
+    'Late': 'late_count',
+}
+
+CREATE_SUMMARY_TABLE = """
+    CREATE TABLE IF NOT EXISTS attendance_summary (
+        student_id INT NOT NULL,
+        subject_id INT NOT NULL,
+        present_count INT NOT NULL DEFAULT 0,
+        absent_count INT NOT NULL DEFAULT 0,
+        late_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (student_id, subject_id)
+    )
+"""
+
+CREATE_CALENDAR_TABLE = """
+    CREATE TABLE IF NOT EXISTS attendance_calendar (
+        student_id INT NOT NULL,
+        subject_id INT NOT NULL,
+        month CHAR(7) NOT NULL,
+        present_days INT NOT NULL DEFAULT 0,
+        absent_days INT NOT NULL DEFAULT 0,
+        late_days INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (student_id, subject_id, month)
+    )
+"""
+
+CALENDAR_COLUMNS = {
+    'Present': 'present_days',
+    'Absent': 'absent_days',
+    'Late': 'late_days',
+}
+
+
+def _status_column(status):
+    """Counter column for an attendance status"""
+    if status not in STATUS_COLUMNS:
+        raise ValueError(f"Unknown attendance status: {status!r}")
+    return STATUS_COLUMNS[status]
+
+
+def _adjust_counter(cursor, student_id, subject_id, status, delta):
+    """Add delta to the counter for status, creating the summary row if needed"""
+    column = _status_column(status)
+    cursor.execute(f"""
+        INSERT INTO attendance_summary (student_id, subject_id, {column})
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE {column} = {column} + VALUES({column})
+    """, (student_id, subject_id, delta))
+
+
+def _current_status(cursor, student_id, subject_id, attendance_date):
+    """Locked read of the stored status for one attendance key"""
+    cursor.execute("""
+        SELECT status FROM attendance
+        WHERE student_id = %s AND subject_id = %s AND attendance_date = %s
+        FOR UPDATE
+    """, (student_id, subject_id, attendance_date))
+    row = cursor.fetchone()
+    return row['status'] if row else None
+
+
+def _month_and_bit(attendance_date):
+    """('YYYY-MM', day bit) for a date or ISO date string"""
+    iso = str(attendance_date)
+    return iso[:7], 1 << (int(iso[8:10]) - 1)
+
+
+def _set_calendar_days(cursor, days):
+    """Record (student_id, subject_id, attendance_date, status) days in the bitmaps
+
+    Each touched day's bit is cleared from all three bitmaps before the new
+    status's bit is set, so a changed status moves rather than duplicates.
+    """
+    masks = {}
+    for student_id, subject_id, attendance_date, status in days:
+        month, bit = _month_and_bit(attendance_date)
+        row = masks.setdefault((student_id, subject_id, month), [0, 0, 0])
+        row[list(CALENDAR_COLUMNS).index(status)] |= bit
+    if not masks:
+        return
+    
+    touched = 'VALUES(present_days) | VALUES(absent_days) | VALUES(late_days)'
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(masks))
+    cursor.execute(f"""
+        INSERT INTO attendance_calendar
+            (student_id, subject_id, month, present_days, absent_days, late_days)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            present_days = (present_days & ~({touched})) | VALUES(present_days),
+            absent_days = (absent_days & ~({touched})) | VALUES(absent_days),
+            late_days = (late_days & ~({touched})) | VALUES(late_days)
+    """, tuple(value for key, row in masks.items() for value in key + tuple(row)))
+
+
+def _clear_calendar_day(cursor, student_id, subject_id, attendance_date):
+    month, bit = _month_and_bit(attendance_date)
+    cursor.execute("""
+        UPDATE attendance_calendar
+        SET present_days = present_days & ~%s, absent_days = absent_days & ~%s,
+            late_days = late_days & ~%s
+        WHERE student_id = %s AND subject_id = %s AND month = %s
+    """, (bit, bit, bit, student_id, subject_id, month))
+
+
+def mark_attendance(cursor, student_id, subject_id, attendance_date, status,
+                    marked_by=None, remarks=None):
+    """Insert or update one attendance row and keep the counters in step"""
+    _status_column(status)
+    previous = _current_status(cursor, student_id, subject_id, attendance_date)
+    
+    if previous is None:
+        cursor.execute("""
+            INSERT INTO attendance
+                (student_id, subject_id, attendance_date, status, marked_by, remarks)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (student_id, subject_id, attendance_date, status, marked_by, remarks))
+        _adjust_counter(cursor, student_id, subject_id, status, 1)
+        _set_calendar_days(cursor, [(student_id, subject_id, attendance_date, status)])
+        mark_changed(cursor, [student_id], 'attendance')
+        return
+    
+    cursor.execute("""
+        UPDATE attendance SET status = %s, marked_by = %s, remarks = %s
+        WHERE student_id = %s AND subject_id = %s AND attendance_date = %s
+    """, (status, marked_by, remarks, student_id, subject_id, attendance_date))
+    if previous != status:
+        _adjust_counter(cursor, student_id, subject_id, previous, -1)
+        _adjust_counter(cursor, student_id, subject_id, status, 1)
+        _set_calendar_days(cursor, [(student_id, subject_id, attendance_date, status)])
+        mark_changed(cursor, [student_id], 'attendance')
+    else:
+        bump_versions(cursor, [student_id], 'attendance')
+
+
+def delete_attendance(cursor, student_id, subject_id, attendance_date):
+    """Delete one attendance row and decrement its counter
+
+    Returns True if a row was deleted.
+    """
+    previous = _current_status(cursor, student_id, subject_id, attendance_date)
+    if previous is None:
+        return False
+    
+    cursor.execute("""
+        DELETE FROM attendance
+        WHERE student_id = %s AND subject_id = %s AND attendance_date = %s
+    """, (student_id, subject_id, attendance_date))
+    _adjust_counter(cursor, student_id, subject_id, previous, -1)
+    _clear_calendar_day(cursor, student_id, subject_id, attendance_date)
+    mark_changed(cursor, [student_id], 'attendance')
+    return True
+
+
+def mark_attendance_batch(cursor, records):
+    """Upsert many attendance rows with multi-row statements, adjusting counters
+
+    records is an iterable of (student_id, subject_id, attendance_date, status,
+    marked_by, remarks) tuples with ISO date strings; when a key repeats, the
+    last record wins. Returns the number of distinct rows written.
+    """
+    latest = {}
+    for student_id, subject_id, attendance_date, status, marked_by, remarks in records:
+        _status_column(status)
+        key = (student_id, subject_id, str(attendance_date))
+        latest[key] = key + (status, marked_by, remarks)
+    if not latest:
+        return 0
+    keys = list(latest)
+    
+    # Statuses these rows had before, read under lock in one statement
+    placeholders = ', '.join(['(%s, %s, %s)'] * len(keys))
+    cursor.execute(f"""
+        SELECT student_id, subject_id, attendance_date, status FROM attendance
+        WHERE (student_id, subject_id, attendance_date) IN ({placeholders})
+        FOR UPDATE
+    """, tuple(value for key in keys for value in key))
+    previous = {
+        (row['student_id'], row['subject_id'], str(row['attendance_date'])): row['status']
+        for row in cursor.fetchall()
+    }
+    
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(keys))
+    cursor.execute(f"""
+        INSERT INTO attendance
+            (student_id, subject_id, attendance_date, status, marked_by, remarks)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            status = VALUES(status), marked_by = VALUES(marked_by), remarks = VALUES(remarks)
+    """, tuple(value for key in keys for value in latest[key]))
+    
+    columns = list(STATUS_COLUMNS)
+    deltas = {}
+    changed = []
+    for key in keys:
+        old, new = previous.get(key), latest[key][3]
+        if old == new:
+            continue
+        delta = deltas.setdefault(key[:2], [0, 0, 0])
+        if old is not None:
+            delta[columns.index(old)] -= 1
+        delta[columns.index(new)] += 1
+        changed.append(key + (new,))
+    _set_calendar_days(cursor, changed)
+    
+    if deltas:
+        placeholders = ', '.join(['(%s, %s, %s, %s, %s)'] * len(deltas))
+        cursor.execute(f"""
+            INSERT INTO attendance_summary
+                (student_id, subject_id, present_count, absent_count, late_count)
+            VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE
+                present_count = present_count + VALUES(present_count),
+                absent_count = absent_count + VALUES(absent_count),
+                late_count = late_count + VALUES(late_count)
+        """, tuple(value for pair, delta in deltas.items() for value in pair + tuple(delta)))
+        mark_changed(cursor, [student_id for student_id, _ in deltas], 'attendance')
+    # Rows rewritten with the same status still change marked_by/remarks
+    unchanged = {key[0] for key in keys} - {student_id for student_id, _ in deltas}
+    bump_versions(cursor, unchanged, 'attendance')
+    return len(keys)
+
+
+def summarize(present, absent, late):
+    """Build a summary record with total and percentage from the three counters"""
+    total = present + absent + late
+    return {
+        'total': total,
+        'present': present,
+        'absent': absent,
+        'late': late,
+        'percentage': (present / total * 100) if total > 0 else 0,
+    }
+
+
+def get_summary(cursor, student_id, subject_id):
+    """Primary-key lookup of the counters for one student and subject"""
+    cursor.execute("""
+        SELECT present_count, absent_count, late_count
+        FROM attendance_summary
+        WHERE student_id = %s AND subject_id = %s
+    """, (student_id, subject_id))
+    row = cursor.fetchone()
+    if row is None:
+        return summarize(0, 0, 0)
+    return summarize(row['present_count'], row['absent_count'], row['late_count'])
+
+
+# Shared with the async views in unihub.asgi
+SUBJECT_SUMMARIES_QUERY = """
+    SELECT s.subject_id, s.subject_code, s.subject_name,
+           a.present_count, a.absent_count, a.late_count
+    FROM attendance_summary a
+    JOIN subjects s ON a.subject_id = s.subject_id
+    WHERE a.student_id = %s
+    ORDER BY s.subject_code
+"""
+
+
+def get_subject_summaries(cursor, student_id):
+    """Summary record per subject for one student, from the counters"""
+    cursor.execute(SUBJECT_SUMMARIES_QUERY, (student_id,))
+    return summaries_from_rows(cursor.fetchall())
+
+
+def summaries_from_rows(rows):
+    """Summary records from rows of SUBJECT_SUMMARIES_QUERY
+
+    Subjects whose counters are all zero (every record since deleted) are
+    left out, as they were when the totals came from the attendance rows.
+    """
+    subjects = []
+    for row in rows:
+        record = summarize(row['present_count'], row['absent_count'], row['late_count'])
+        if record['total'] == 0:
+            continue
+        record.update(subject_id=row['subject_id'], subject_code=row['subject_code'],
+                      subject_name=row['subject_name'])
+        subjects.append(record)
+    return subjects
+
+
+def get_attendance_summary(cursor, student_ids, subject_id=None):
+    """Summary records per subject for many students in one query
+
+    Returns a dict mapping each student_id to its list of summary records,
+    optionally limited to one subject.
+    """
+    student_ids = list(student_ids)
+    if not student_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(student_ids))
+    subject_filter, params = '', tuple(student_ids)
+    if subject_id is not None:
+        subject_filter, params = ' AND a.subject_id = %s', params + (subject_id,)
+    cursor.execute(f"""
+        SELECT a.student_id, s.subject_id, s.subject_code, s.subject_name,
+               a.present_count, a.absent_count, a.late_count
+        FROM attendance_summary a
+        JOIN subjects s ON a.subject_id = s.subject_id
+        WHERE a.student_id IN ({placeholders}){subject_filter}
+        ORDER BY a.student_id, s.subject_code
+    """, params)
+    rows = {student_id: [] for student_id in student_ids}
+    for row in cursor.fetchall():
+        rows[row['student_id']].append(row)
+    return {student_id: summaries_from_rows(student_rows)
+            for student_id, student_rows in rows.items()}
+
+
+def attendance_totals(cursor, student_id, subject_id=None):
+    """Summary record over all of a student's subjects, or one subject"""
+    subject_filter, params = '', (student_id,)
+    if subject_id is not None:
+        subject_filter, params = ' AND subject_id = %s', (student_id, subject_id)
+    cursor.execute(f"""
+        SELECT SUM(present_count) AS present_count, SUM(absent_count) AS absent_count,
+               SUM(late_count) AS late_count
+        FROM attendance_summary
+        WHERE student_id = %s{subject_filter}
+    """, params)
+    row = cursor.fetchone()
+    return summarize(int(row['present_count'] or 0), int(row['absent_count'] or 0),
+                     int(row['late_count'] or 0))
+
+
+def attendance_history(cursor, student_id, subject_id=None, after=None, limit=20):
+    """One page of a student's daily attendance, newest first, and the next cursor
+
+    Seeks on idx_attendance_student_date, or on the (student_id, subject_id,
+    attendance_date) unique key when filtered to one subject.
+    """
+    conditions, params = ['a.student_id = %s'], [student_id]
+    if subject_id is not None:
+        conditions.append('a.subject_id = %s')
+        params.append(subject_id)
+    return seek_page(cursor, """
+        SELECT a.attendance_id, a.attendance_date, a.status, a.remarks,
+               s.subject_code, s.subject_name
+        FROM attendance a
+        JOIN subjects s ON a.subject_id = s.subject_id
+    """, conditions, params, ['a.attendance_date', 'a.attendance_id'], after, limit)
+
+
+def days_in(mask):
+    """Day numbers whose bits are set in a calendar bitmap"""
+    return [day for day in range(1, 32) if mask >> (day - 1) & 1]
+
+
+def get_month_calendar(cursor, student_id, month):
+    """A student's calendar for one 'YYYY-MM' month, one entry per subject
+
+    Each entry has the subject, weeks (lists of (day, status or None), day 0
+    padding the first and last week) and the month's summary record from
+    popcounts of the bitmaps.
+    """
+    cursor.execute("""
+        SELECT c.subject_id, s.subject_code, s.subject_name,
+               c.present_days, c.absent_days, c.late_days
+        FROM attendance_calendar c
+        JOIN subjects s ON c.subject_id = s.subject_id
+        WHERE c.student_id = %s AND c.month = %s
+        ORDER BY s.subject_code
+    """, (student_id, month))
+    year, number = int(month[:4]), int(month[5:7])
+    weeks = calendar.Calendar().monthdayscalendar(year, number)
+    
+    subjects = []
+    for row in cursor.fetchall():
+        masks = {status: row[column] for status, column in CALENDAR_COLUMNS.items()}
+        if not any(masks.values()):
+            continue
+        
+        def status_on(day):
+            bit = 1 << (day - 1)
+            for status, mask in masks.items():
+                if mask & bit:
+                    return status
+            return None
+        
+        subjects.append({
+            'subject_id': row['subject_id'],
+            'subject_code': row['subject_code'],
+            'subject_name': row['subject_name'],
+            'weeks': [[(day, status_on(day) if day else None) for day in week] for week in weeks],
+            'summary': summarize(masks['Present'].bit_count(), masks['Absent'].bit_count(),
+                                 masks['Late'].bit_count()),
+        })
+    return subjects
+
+
+_CALENDAR_FROM_ATTENDANCE = """
+    SELECT student_id, subject_id, SUBSTR(attendance_date, 1, 7) AS month,
+           SUM(CASE WHEN status = 'Present' THEN 1 << (SUBSTR(attendance_date, 9, 2) - 1) ELSE 0 END)
+               AS present_days,
+           SUM(CASE WHEN status = 'Absent' THEN 1 << (SUBSTR(attendance_date, 9, 2) - 1) ELSE 0 END)
+               AS absent_days,
+           SUM(CASE WHEN status = 'Late' THEN 1 << (SUBSTR(attendance_date, 9, 2) - 1) ELSE 0 END)
+               AS late_days
+    FROM attendance
+    GROUP BY student_id, subject_id, SUBSTR(attendance_date, 1, 7)
+"""
+
+
+def rebuild_calendar(cursor):
+    """Recompute every calendar bitmap from the attendance table
+
+    Each day has at most one row per student and subject, so summing the
+    day bits is the same as OR-ing them. Returns the number of rows written.
+    """
+    cursor.execute('DELETE FROM attendance_calendar')
+    bump_student_data(cursor)
+    cursor.execute(f"""
+        INSERT INTO attendance_calendar
+            (student_id, subject_id, month, present_days, absent_days, late_days)
+        {_CALENDAR_FROM_ATTENDANCE}
+    """)
+    return cursor.rowcount
+
+
+def verify_calendar(cursor):
+    """Compare the bitmaps against a fresh aggregate of the attendance table
+
+    Returns a list of (student_id, subject_id, month, stored, actual) tuples
+    of (present, absent, late) bitmaps that disagree. Empty bitmaps left by
+    deleted days count as missing rows.
+    """
+    def bitmaps(rows):
+        result = {}
+        for row in rows:
+            masks = tuple(int(row[column] or 0) for column in CALENDAR_COLUMNS.values())
+            if any(masks):
+                result[(row['student_id'], row['subject_id'], row['month'])] = masks
+        return result
+    
+    cursor.execute(_CALENDAR_FROM_ATTENDANCE)
+    actual = bitmaps(cursor.fetchall())
+    cursor.execute("""
+        SELECT student_id, subject_id, month, present_days, absent_days, late_days
+        FROM attendance_calendar
+    """)
+    stored = bitmaps(cursor.fetchall())
+    
+    return [
+        key + (stored.get(key), actual.get(key))
+        for key in sorted(set(actual) | set(stored))
+        if stored.get(key) != actual.get(key)
+    ]
+
+
+def rebuild_summary(cursor):
+    """Recompute every counter from the attendance table
+
+    Returns the number of summary rows written.
+    """
+    cursor.execute(CREATE_SUMMARY_TABLE)
+    cursor.execute('DELETE FROM attendance_summary')
+    bump_student_data(cursor)
+    cursor.execute("""
+        INSERT INTO attendance_summary
+            (student_id, subject_id, present_count, absent_count, late_count)
+        SELECT student_id, subject_id,
+               SUM(CASE WHEN status = 'Present' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Absent' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Late' THEN 1 ELSE 0 END)
+        FROM attendance
+        GROUP BY student_id, subject_id
+    """)
+    return cursor.rowcount
+
+
+def verify_summary(cursor):
+    """Compare the counters against a fresh aggregate of the attendance table
+
+    Returns a list of (student_id, subject_id, stored, actual) tuples for every
+    key whose counters disagree; an empty list means the store is consistent.
+    """
+    def counters(rows):
+        result = {}
+        for row in rows:
+            result[(row['student_id'], row['subject_id'])] = tuple(
+                int(row[column] or 0) for column in STATUS_COLUMNS.values()
+            )
+        return result
+    
+    cursor.execute("""
+        SELECT student_id, subject_id,
+               SUM(CASE WHEN status = 'Present' THEN 1 ELSE 0 END) AS present_count,
+               SUM(CASE WHEN status = 'Absent' THEN 1 ELSE 0 END) AS absent_count,
+               SUM(CASE WHEN status = 'Late' THEN 1 ELSE 0 END) AS late_count
+        FROM attendance
+        GROUP BY student_id, subject_id
+    """)
+    actual = counters(cursor.fetchall())
+    
+    cursor.execute("""
+        SELECT student_id, subject_id, present_count, absent_count, late_count
+        FROM attendance_summary
+    """)
+    stored = counters(cursor.fetchall())
+    
+    empty = (0, 0, 0)
+    mismatches = []
+    for key in sorted(set(actual) | set(stored)):
+        if stored.get(key, empty) != actual.get(key, empty):
+            mismatches.append((key[0], key[1], stored.get(key, empty), actual.get(key, empty)))
+    return mismatches
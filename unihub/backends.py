@@ -0,0 +1,223 @@
+"""Database backends: MySQL in production, SQLite for local runs and benchmarks
+
+Application SQL is written once, in MySQL syntax with %s placeholders. The
+SQLite backend rewrites each statement on the way in (placeholders, NOW(),
+ON DUPLICATE KEY UPDATE, FOR UPDATE) and caches the result, so routes and
+helpers run unchanged on either engine.
+"""
+
+import re
+import sqlite3
+from functools import lru_cache
+
+from unihub import schema
+
+
+class MySQLBackend:
+    """mysqlclient connections with dict rows"""
+
+    name = 'mysql'
+
+    def __init__(self, host, user, password, database):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+
+    @property
+    def integrity_error(self):
+        """Exception for duplicate keys and foreign key violations"""
+        import MySQLdb
+        
+        return MySQLdb.IntegrityError
+
+    def connect(self):
+        """Open a connection whose cursors return dict rows"""
+        import MySQLdb
+        import MySQLdb.cursors
+        
+        return MySQLdb.connect(
+            host=self.host,
+            user=self.user,
+            passwd=self.password,
+            db=self.database,
+            charset='utf8mb4',
+            cursorclass=MySQLdb.cursors.DictCursor,
+        )
+
+    def streaming_cursor(self, conn):
+        """Unbuffered dict cursor: rows stay on the server until fetched"""
+        import MySQLdb.cursors
+        
+        return conn.cursor(MySQLdb.cursors.SSDictCursor)
+
+    def create_schema(self, conn):
+        """Create every table that does not exist yet"""
+        cursor = conn.cursor()
+        for statement in schema.TABLES:
+            cursor.execute(statement)
+        conn.commit()
+
+
+@lru_cache(maxsize=512)
+def translate_sql(sql):
+    """Rewrite a MySQL-syntax statement for SQLite"""
+    sql = sql.replace('%s', '?')
+    sql = re.sub(r'\bNOW\(\)', 'CURRENT_TIMESTAMP', sql)
+    sql = re.sub(r'\bINSERT IGNORE\b', 'INSERT OR IGNORE', sql)
+    sql = re.sub(r'\s+FOR UPDATE\b', '', sql)
+    
+    if 'ON DUPLICATE KEY UPDATE' in sql:
+        table = re.search(r'INSERT INTO (\w+)', sql).group(1)
+        key = schema.CONFLICT_KEYS.get(table)
+        if key is None:
+            raise ValueError(f'No conflict key known for upserts into {table}')
+        head, _, tail = sql.partition('ON DUPLICATE KEY UPDATE')
+        tail = re.sub(r'\bVALUES\((\w+)\)', r'excluded.\1', tail)
+        # SQLite needs a WHERE to disambiguate INSERT ... SELECT from the upsert clause
+        select = re.search(r'\bSELECT\b(.*)', head, re.IGNORECASE | re.DOTALL)
+        if select and not re.search(r'\bWHERE\b', select.group(1), re.IGNORECASE):
+            head = head.rstrip() + ' WHERE true '
+        sql = f'{head}ON CONFLICT ({key}) DO UPDATE SET{tail}'
+    return sql
+
+
+def translate_ddl(statement):
+    """Rewrite a MySQL CREATE TABLE statement into SQLite statements
+
+    Returns a list: the CREATE TABLE followed by one CREATE INDEX per inline
+    INDEX declaration.
+    """
+    table = schema.table_name(statement)
+    indexes = []
+    
+    def pull_index(match):
+        indexes.append(
+            f'CREATE INDEX IF NOT EXISTS {match.group(1)} ON {table} ({match.group(2)})'
+        )
+        return ''
+    
+    statement = re.sub(r',\s*INDEX (\w+) \(([^)]*)\)', pull_index, statement)
+    statement = re.sub(r'\bINT PRIMARY KEY AUTO_INCREMENT\b', 'INTEGER PRIMARY KEY AUTOINCREMENT', statement)
+    statement = re.sub(r"\bENUM\([^)]*\)", 'TEXT', statement)
+    statement = re.sub(r'\bUNIQUE KEY \(', 'UNIQUE (', statement)
+    statement = re.sub(r'\s+ON UPDATE CURRENT_TIMESTAMP\b', '', statement)
+    return [statement] + indexes
+
+
+def dict_row(cursor, row):
+    """sqlite3 row factory matching MySQLdb's DictCursor"""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """sqlite3 cursor that accepts MySQL-syntax statements"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection.raw.cursor()
+
+    def execute(self, sql, params=()):
+        # FOR UPDATE reads take the write lock up front so the following
+        # write cannot fail with SQLITE_BUSY on lock upgrade
+        if 'FOR UPDATE' in sql and not self.connection.raw.in_transaction:
+            self._cursor.execute('BEGIN IMMEDIATE')
+        self._cursor.execute(translate_sql(sql), tuple(params))
+        return self._cursor.rowcount
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(translate_sql(sql), [tuple(p) for p in seq_of_params])
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+
+class SQLiteConnection:
+    """sqlite3 connection exposing the DB-API surface the app relies on"""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def cursor(self):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        self.raw.close()
+
+
+class SQLiteBackend:
+    """SQLite database file in WAL mode"""
+
+    name = 'sqlite'
+    integrity_error = sqlite3.IntegrityError
+
+    def __init__(self, path, busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    def connect(self):
+        """Open a WAL-mode connection that may be handed between threads"""
+        raw = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        raw.row_factory = dict_row
+        raw.execute('PRAGMA journal_mode = WAL')
+        raw.execute('PRAGMA synchronous = NORMAL')
+        raw.execute('PRAGMA foreign_keys = ON')
+        return SQLiteConnection(raw)
+
+    def streaming_cursor(self, conn):
+        """sqlite3 cursors already step through results lazily"""
+        return conn.cursor()
+
+    def create_schema(self, conn):
+        """Create every table and index that does not exist yet"""
+        cursor = conn.raw.cursor()
+        for statement in schema.TABLES:
+            for translated in translate_ddl(statement):
+                cursor.execute(translated)
+        conn.commit()
+
+
+def from_config(config):
+    """Backend selected by DATABASE_BACKEND in a Flask config"""
+    backend = config.get('DATABASE_BACKEND', 'mysql')
+    if backend == 'mysql':
+        return MySQLBackend(
+            config['MYSQL_HOST'],
+            config['MYSQL_USER'],
+            config['MYSQL_PASSWORD'],
+            config['MYSQL_DB'],
+        )
+    if backend == 'sqlite':
+        return SQLiteBackend(config['SQLITE_PATH'])
+    raise ValueError(f'Unknown DATABASE_BACKEND: {backend!r}')
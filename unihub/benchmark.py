@@ -0,0 +1,412 @@
+"""Route-level load benchmark of the student portal
+
+run_suite() builds a throwaway SQLite database, seeds it with a
+deterministic cohort (seed_database), starts the production server
+(gunicorn.conf.py, with preload and warm-up) on it and plays student
+visits at rising concurrency: each client signs in, then reads pages in
+the proportions of MIX. Each stage reports throughput and p50/p95/p99
+latency overall and per route, and queries per request from the
+X-Query-Count header the server is told to send. A stage is run repeat
+times and each figure is the median of the runs, which steadies the
+percentiles on a busy machine.
+
+Results are plain JSON. save_results() writes them as a baseline;
+compare() lists what got worse in a later run with the same settings, and
+check_results() what misses the page-load budget on its own.
+"""
+
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from unihub import backends, loadtest
+from unihub.attendance import rebuild_calendar, rebuild_summary
+from unihub.fees import rebuild_ledger
+from unihub.grades import rebuild_rollups
+from unihub.marks import convert_marks
+from unihub.passwords import hash_password
+
+RESULTS_VERSION = 1
+
+BENCH_PASSWORD = 'benchmark-password'
+
+# Share of page views per student page, after signing in
+MIX = {
+    '/dashboard': 35,
+    '/attendance': 20,
+    '/grades': 15,
+    '/fees': 15,
+    '/internships': 15,
+}
+PAGES_PER_SESSION = (4, 12)
+
+COURSES = (
+    ('BCS', 'Computer Science', 'Engineering'),
+    ('BEE', 'Electrical Engineering', 'Engineering'),
+    ('BBA', 'Business Administration', 'Management'),
+    ('BSM', 'Mathematics', 'Science'),
+)
+SEMESTERS = 8
+SUBJECTS_PER_SEMESTER = 5
+ACADEMIC_YEAR = '2024-25'
+TERM_START = date(2024, 8, 1)
+
+# Seeded subjects keep the schema's default mark limits
+MAX_INTERNAL, MAX_EXTERNAL = 30, 70
+
+# A change is a regression only if it exceeds the tolerance and these floors;
+# latency percentiles of routes with fewer samples are not compared
+LATENCY_SLACK_MS = 2.0
+QUERY_SLACK = 0.5
+MIN_SAMPLES = 50
+
+
+def school_days(count):
+    """The first count weekdays of the term, as ISO dates"""
+    days, day = [], TERM_START
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def seed_database(cursor, students=500, days=60, seed=1, password_hash=None):
+    """Fill an empty schema with a reproducible cohort; returns row counts
+
+    Every student can sign in with BENCH_PASSWORD. Attendance covers the
+    first days school days of the current semester, grades every earlier
+    semester. Derived tables (attendance counters and calendar, GPA
+    rollups, fee ledger) are rebuilt at the end. Nothing is committed.
+    """
+    rng = random.Random(seed)
+    password_hash = password_hash or hash_password(BENCH_PASSWORD)
+    counts = dict.fromkeys(('students', 'attendance', 'grades', 'payments', 'internships'), 0)
+    
+    cursor.execute("""
+        INSERT INTO users (username, email, password_hash, user_type)
+        VALUES ('bench-admin', 'admin@bench.local', %s, 'admin')
+    """, (password_hash,))
+    admin_id = cursor.lastrowid
+    
+    subjects, fee_structures = {}, {}  # (course_id, semester) -> ids / fee structure
+    for code, name, department in COURSES:
+        cursor.execute("""
+            INSERT INTO courses (course_code, course_name, department, duration_years, total_semesters)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (code, name, department, SEMESTERS // 2, SEMESTERS))
+        course_id = cursor.lastrowid
+        for semester in range(1, SEMESTERS + 1):
+            ids = []
+            for number in range(1, SUBJECTS_PER_SEMESTER + 1):
+                cursor.execute("""
+                    INSERT INTO subjects (subject_code, subject_name, course_id, semester, credits)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (f'{code}{semester}{number:02d}', f'{name} {semester}.{number}', course_id,
+                      semester, rng.choice((2, 3, 4))))
+                ids.append((cursor.lastrowid, number))
+            subjects[course_id, semester] = ids
+            tuition = rng.choice((40000, 45000, 50000))
+            cursor.execute("""
+                INSERT INTO fee_structure
+                    (course_id, semester, tuition_fee, library_fee, lab_fee, total_fee, academic_year)
+                VALUES (%s, %s, %s, 2000, 3000, %s, %s)
+            """, (course_id, semester, tuition, tuition + 5000, ACADEMIC_YEAR))
+            fee_structures[course_id, semester] = (cursor.lastrowid, tuition + 5000)
+    
+    course_ids = sorted({course_id for course_id, _ in subjects})
+    term = school_days(days)
+    attendance, grades, payments, internships = [], [], [], []
+    for index in range(1, students + 1):
+        enrollment = f'BN{index:05d}'
+        cursor.execute("""
+            INSERT INTO users (username, email, password_hash, user_type)
+            VALUES (%s, %s, %s, 'student')
+        """, (enrollment.lower(), f'{enrollment.lower()}@bench.local', password_hash))
+        course_id, semester = rng.choice(course_ids), rng.randint(1, SEMESTERS)
+        cursor.execute("""
+            INSERT INTO students
+                (user_id, enrollment_number, first_name, last_name, date_of_birth, gender,
+                 course_id, semester, admission_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (cursor.lastrowid, enrollment, f'Student{index}', 'Bench',
+              f'{2006 - semester // 2}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}',
+              rng.choice(('Male', 'Female', 'Other')), course_id, semester,
+              f'{2024 - (semester - 1) // 2}-08-01'))
+        student_id = cursor.lastrowid
+        
+        presence, ability = rng.uniform(0.6, 0.98), rng.uniform(45, 95)
+        for subject_id, _ in subjects[course_id, semester]:
+            for day in term:
+                draw = rng.random()
+                status = 'Present' if draw < presence else ('Late' if draw < presence + 0.05 else 'Absent')
+                attendance.append((student_id, subject_id, day, status, admin_id))
+        marks = []
+        for past in range(1, semester):
+            for subject_id, _ in subjects[course_id, past]:
+                total = max(0.0, min(100.0, rng.gauss(ability, 10)))
+                marks.append((subject_id, past, round(total * 0.3, 2), round(total * 0.7, 2)))
+        # Graded by the same bands as a marks import
+        converted = convert_marks([mark[2] for mark in marks], [mark[3] for mark in marks],
+                                  MAX_INTERNAL, MAX_EXTERNAL)
+        for (subject_id, past, internal, external), total, grade, points, status in zip(
+                marks, *converted):
+            grades.append((student_id, subject_id, internal, external, float(total), str(grade),
+                           float(points), past, ACADEMIC_YEAR, str(status)))
+        for past in range(1, semester + 1):
+            fee_structure_id, total_fee = fee_structures[course_id, past]
+            instalments = 2 if past < semester else rng.randint(0, 2)
+            for number in range(instalments):
+                payments.append((student_id, fee_structure_id, round(total_fee / 2, 2),
+                                 f'{2024 - (semester - past) // 2}-0{number + 7}-15',
+                                 rng.choice(('Cash', 'Card', 'Online', 'Cheque')),
+                                 f'BR{student_id:05d}{past}{number}'))
+        for number in range(rng.randint(0, 2) if semester >= 5 else 0):
+            start = TERM_START - timedelta(days=120 * (number + 1))
+            internships.append((student_id, rng.choice(('Acme', 'Globex', 'Initech', 'Umbrella')),
+                                'Intern', start.isoformat(), (start + timedelta(days=60)).isoformat(),
+                                2, rng.choice(('Ongoing', 'Completed', 'Verified')),
+                                rng.choice((0, 2, 3))))
+        counts['students'] += 1
+    
+    cursor.executemany("""
+        INSERT INTO attendance (student_id, subject_id, attendance_date, status, marked_by)
+        VALUES (%s, %s, %s, %s, %s)
+    """, attendance)
+    cursor.executemany("""
+        INSERT INTO grades
+            (student_id, subject_id, internal_marks, external_marks, total_marks, grade,
+             grade_points, semester, academic_year, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, grades)
+    cursor.executemany("""
+        INSERT INTO fee_payments
+            (student_id, fee_structure_id, amount_paid, payment_date, payment_method, receipt_number)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, payments)
+    cursor.executemany("""
+        INSERT INTO internships
+            (student_id, company_name, position, start_date, end_date, duration_months,
+             status, credits_earned)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, internships)
+    for number in range(12):
+        cursor.execute("""
+            INSERT INTO admin_notifications (title, content, type, target_audience, created_by)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (f'Notice {number + 1}', 'Benchmark announcement. ' * 8,
+              ('Circular', 'Announcement', 'Alert')[number % 3],
+              ('All', 'Students', 'Faculty')[number % 3], admin_id))
+    
+    rebuild_summary(cursor)
+    rebuild_calendar(cursor)
+    rebuild_rollups(cursor)
+    rebuild_ledger(cursor)
+    counts.update(attendance=len(attendance), grades=len(grades), payments=len(payments),
+                  internships=len(internships))
+    return counts
+
+
+def prepare_database(path, students, days, seed, password_method='scrypt'):
+    """Create the schema in a new SQLite file and seed it; returns row counts"""
+    backend = backends.SQLiteBackend(path)
+    conn = backend.connect()
+    try:
+        backend.create_schema(conn)
+        counts = seed_database(conn.cursor(), students, days, seed,
+                               hash_password(BENCH_PASSWORD, password_method))
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+
+def server_command():
+    """argv of the production gunicorn server, from the repository root"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return root, [sys.executable, '-m', 'gunicorn', '-c', os.path.join(root, 'gunicorn.conf.py'),
+                  '--chdir', root]
+
+
+def _rounded(figures):
+    return {key: round(value, 3) if isinstance(value, float) else value
+            for key, value in figures.items()}
+
+
+def combine_runs(runs):
+    """One result from repeated run_sessions() results
+
+    Requests, errors and seconds are summed; every other figure is the
+    median over the runs, per route too.
+    """
+    combined = {}
+    for key in runs[0]:
+        if key == 'routes':
+            continue
+        values = [run[key] for run in runs if key in run]
+        if key in ('requests', 'errors', 'seconds'):
+            combined[key] = sum(values)
+        else:
+            combined[key] = statistics.median(values)
+    if 'routes' in runs[0]:
+        paths = sorted({path for run in runs for path in run['routes']})
+        combined['routes'] = {
+            path: _rounded(combine_runs([run['routes'][path] for run in runs
+                                         if path in run['routes']]))
+            for path in paths
+        }
+    return _rounded(combined)
+
+
+def run_suite(students=500, stages=(1, 8, 32, 64), requests=500, repeat=3, workers=2, seed=1,
+              port=8902, days=60, password_method='scrypt', progress=None):
+    """Seed a database, serve it and load it stage by stage; returns the results
+
+    progress, if given, is called with each stage's results as it finishes.
+    """
+    settings = {
+        'students': students,
+        'days': days,
+        'stages': list(stages),
+        'requests': requests,
+        'repeat': repeat,
+        'workers': workers,
+        'seed': seed,
+        'mix': MIX,
+        'pages_per_session': list(PAGES_PER_SESSION),
+    }
+    results = {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'settings': settings,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'stages': [],
+    }
+    accounts = [(f'BN{index:05d}', BENCH_PASSWORD) for index in range(1, students + 1)]
+    
+    with tempfile.TemporaryDirectory(prefix='unihub-bench-') as directory:
+        path = os.path.join(directory, 'bench.db')
+        results['seeded'] = prepare_database(path, students, days, seed, password_method)
+        root, command = server_command()
+        env = {
+            'PYTHONPATH': os.pathsep.join(filter(None, (root, os.environ.get('PYTHONPATH')))),
+            'UNIHUB_DATABASE_BACKEND': 'sqlite',
+            'UNIHUB_SQLITE_PATH': path,
+            'UNIHUB_SESSION_BACKEND': 'sql',
+            'UNIHUB_CACHE_REDIS_URL': '',
+            'UNIHUB_BIND': f'127.0.0.1:{port}',
+            'UNIHUB_WORKERS': str(workers),
+            'UNIHUB_PIDFILE': os.path.join(directory, 'gunicorn.pid'),
+            'UNIHUB_QUERY_COUNT_HEADER': '1',
+            'UNIHUB_PROFILER': '0',
+        }
+        with loadtest.serve(command, port, timeout=60.0, env=env):
+            # Let every worker open its pool and fill its caches first
+            loadtest.run_sessions('127.0.0.1', port, accounts, MIX, min(requests, 500),
+                                  max(stages), PAGES_PER_SESSION, seed)
+            for concurrency in stages:
+                runs = [loadtest.run_sessions('127.0.0.1', port, accounts, MIX, requests,
+                                              concurrency, PAGES_PER_SESSION,
+                                              seed + 1000 * concurrency + run)
+                        for run in range(repeat)]
+                stage = dict(combine_runs(runs), concurrency=concurrency)
+                results['stages'].append(stage)
+                if progress is not None:
+                    progress(stage)
+    return results
+
+
+def save_results(path, results):
+    with open(path, 'w') as stream:
+        json.dump(results, stream, indent=2, sort_keys=True)
+        stream.write('\n')
+
+
+def load_results(path):
+    with open(path) as stream:
+        results = json.load(stream)
+    if results.get('version') != RESULTS_VERSION:
+        raise ValueError(f'{path}: unsupported results version {results.get("version")!r}')
+    return results
+
+
+def check_results(results, budget_ms=2000.0):
+    """Failures of a run on its own: errors, and pages whose p95 exceeds budget_ms"""
+    problems = []
+    for stage in results['stages']:
+        for path, figures in stage['routes'].items():
+            label = f"c={stage['concurrency']} {path}"
+            if figures['errors']:
+                problems.append(f"{label}: {figures['errors']} of {figures['requests']} requests failed")
+            if figures['p95_ms'] > budget_ms:
+                problems.append(f"{label}: p95 {figures['p95_ms']:.0f} ms exceeds the "
+                                f'{budget_ms:.0f} ms budget')
+    return problems
+
+
+def compare(baseline, results, tolerance=0.25):
+    """What got worse in results than in baseline, as messages (empty if nothing)
+
+    Throughput per stage may drop, and p50/p95 latency per route grow, by
+    the tolerance fraction (latency also by at least LATENCY_SLACK_MS, and
+    only routes with MIN_SAMPLES requests in both runs are compared).
+    Queries per request are deterministic: more than QUERY_SLACK extra on
+    any route fails. Runs with different settings, or on a machine with a
+    different number of CPUs, are not comparable.
+    """
+    if baseline['settings'] != results['settings']:
+        changed = sorted(key for key in set(baseline['settings']) | set(results['settings'])
+                         if baseline['settings'].get(key) != results['settings'].get(key))
+        return [f"settings differ from the baseline's: {', '.join(changed)}"]
+    if baseline['environment']['cpus'] != results['environment']['cpus']:
+        return [f"baseline was measured with {baseline['environment']['cpus']} CPUs, "
+                f"this run with {results['environment']['cpus']}"]
+    
+    problems = []
+    earlier = {stage['concurrency']: stage for stage in baseline['stages']}
+    for stage in results['stages']:
+        before = earlier.get(stage['concurrency'])
+        if before is None:
+            continue
+        label = f"c={stage['concurrency']}"
+        if stage['rps'] < before['rps'] * (1 - tolerance):
+            problems.append(f"{label}: {stage['rps']:.1f} req/s, baseline {before['rps']:.1f}")
+        for path, figures in stage['routes'].items():
+            old = before['routes'].get(path)
+            if old is None:
+                continue
+            sampled = min(figures['requests'], old['requests']) >= MIN_SAMPLES
+            for key in ('p50_ms', 'p95_ms'):
+                if (sampled and figures[key] > old[key] * (1 + tolerance)
+                        and figures[key] - old[key] > LATENCY_SLACK_MS):
+                    problems.append(f'{label} {path}: {key[:3]} {figures[key]:.1f} ms, '
+                                    f'baseline {old[key]:.1f} ms')
+            queries, old_queries = figures.get('queries_per_request'), old.get('queries_per_request')
+            if queries is not None and old_queries is not None and queries > old_queries + QUERY_SLACK:
+                problems.append(f'{label} {path}: {queries:.1f} queries per request, '
+                                f'baseline {old_queries:.1f}')
+    return problems
+
+
+def format_stage(stage):
+    """Text table of one stage: the routes, then the total"""
+    lines = [f"concurrency {stage['concurrency']}: {stage['requests']} requests in "
+             f"{stage['seconds']:.1f}s (medians of the runs)"]
+    rows = list(stage['routes'].items()) + [('all', stage)]
+    for path, figures in rows:
+        queries = figures.get('queries_per_request')
+        lines.append(f"  {path:<13} {figures['rps']:8.1f} req/s  p50 {figures['p50_ms']:7.1f}  "
+                     f"p95 {figures['p95_ms']:7.1f}  p99 {figures['p99_ms']:7.1f} ms  "
+                     f"{'-' if queries is None else f'{queries:.1f}':>5} q/req  "
+                     f"errors {figures['errors']}")
+    return lines
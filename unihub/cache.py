@@ -0,0 +1,171 @@
+"""In-process LRU caches with an optional shared (Redis) tier
+
+Each named cache is a TieredCache: a bounded per-process LRU in front of an
+optional shared backend configured with CACHE_REDIS_URL. Without Redis the
+LRU alone is used. With Redis, local entries live at most CACHE_LOCAL_TTL
+seconds so an invalidation in one worker reaches the others quickly.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    """Shared cache tier in Redis; values are pickled under a key prefix"""
+
+    def __init__(self, url, prefix='unihub:'):
+        import redis
+        
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key, default=None):
+        raw = self._client.get(self.prefix + key)
+        return default if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self._client.incr(self.prefix + key)
+
+    def get_int(self, key):
+        raw = self._client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+
+class TieredCache:
+    """Local LRU in front of an optional shared backend"""
+
+    def __init__(self, name, maxsize=1024, ttl=None, shared=None, local_ttl=None):
+        self.name = name
+        self.ttl = ttl
+        self.shared = shared
+        if shared is not None and local_ttl:
+            local_ttl = min(local_ttl, ttl) if ttl else local_ttl
+        else:
+            local_ttl = ttl
+        self.local = LRUCache(maxsize, local_ttl)
+
+    def _key(self, key):
+        return f'{self.name}:{key}'
+
+    def get(self, key, default=None):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.shared is not None:
+            value = self.shared.get(self._key(key), _MISSING)
+            if value is not _MISSING:
+                self.local.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(self._key(key), value, self.ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(self._key(key))
+
+    def get_or_load(self, key, loader):
+        """Cached value for key, calling loader() and storing its result on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def stats(self):
+        return {'hits': self.local.hits, 'misses': self.local.misses, 'size': len(self.local)}
+
+
+def init_app(app):
+    """Set up the shared cache tier (if configured) and the cache registry"""
+    app.config.setdefault('CACHE_REDIS_URL', None)
+    app.config.setdefault('CACHE_LOCAL_TTL', 10)
+    
+    url = app.config['CACHE_REDIS_URL']
+    app.extensions['cache_shared'] = RedisCache(url) if url else None
+    app.extensions['caches'] = {}
+
+
+def get_shared():
+    """The shared cache backend, or None when running process-local only"""
+    return current_app.extensions['cache_shared']
+
+
+def get_cache(name, maxsize=1024, ttl=None):
+    """Named TieredCache for the current application, created on first use"""
+    caches = current_app.extensions['caches']
+    cache = caches.get(name)
+    if cache is None:
+        cache = caches.setdefault(name, TieredCache(
+            name, maxsize, ttl,
+            shared=current_app.extensions['cache_shared'],
+            local_ttl=current_app.config['CACHE_LOCAL_TTL'],
+        ))
+    return cache
+
+
+def cache_stats():
+    """Hit/miss counters for every named cache"""
+    return {name: cache.stats() for name, cache in current_app.extensions['caches'].items()}
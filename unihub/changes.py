@@ -0,0 +1,71 @@
+"""Per-student change tracking: the re-scoring queue and data versions
+
+Writers call mark_changed in their own transaction, next to the counters
+and rollups they maintain, so the set is exact; unihub.risk re-scores these
+students and clears the rows it consumed. Like the other write helpers,
+nothing here commits.
+
+mark_changed also bumps the student's version for the scope that changed
+(attendance, grades, fees); bump_versions does that alone for writes that
+do not affect risk (profile, internships). Versions only ever grow, and API
+ETags are derived from them (see unihub.api). Bulk rewrites such as
+rebuilds and fee charging bump the global STUDENT_DATA_VERSION instead of
+every student's row.
+"""
+
+SCOPES = ('attendance', 'grades', 'fees', 'internships', 'profile')
+
+STUDENT_DATA_VERSION = 'student_data'
+
+CREATE_CHANGES_TABLE = """
+    CREATE TABLE IF NOT EXISTS student_changes (
+        student_id INT NOT NULL PRIMARY KEY,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+CREATE_VERSIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS student_versions (
+        student_id INT NOT NULL,
+        scope VARCHAR(20) NOT NULL,
+        version BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (student_id, scope)
+    )
+"""
+
+
+def bump_versions(cursor, student_ids, scope):
+    """Increment the students' version of one scope with one multi-row upsert"""
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown version scope: {scope!r}")
+    student_ids = sorted(set(student_ids))
+    if not student_ids:
+        return
+    placeholders = ', '.join(['(%s, %s, 1)'] * len(student_ids))
+    cursor.execute(f"""
+        INSERT INTO student_versions (student_id, scope, version)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, tuple(value for student_id in student_ids for value in (student_id, scope)))
+
+
+def bump_student_data(cursor):
+    """Increment the global version that every student's ETags include"""
+    cursor.execute("""
+        INSERT INTO cache_versions (name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, (STUDENT_DATA_VERSION,))
+
+
+def mark_changed(cursor, student_ids, scope):
+    """Flag students for re-scoring and bump their version of scope"""
+    student_ids = sorted(set(student_ids))
+    if not student_ids:
+        return
+    placeholders = ', '.join(['(%s, NOW())'] * len(student_ids))
+    cursor.execute(f"""
+        INSERT INTO student_changes (student_id, changed_at)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE changed_at = VALUES(changed_at)
+    """, tuple(student_ids))
+    bump_versions(cursor, student_ids, scope)
@@ -0,0 +1,100 @@
+"""Streaming gzip for dynamic responses
+
+CompressionMiddleware wraps the WSGI app and gzips text responses (HTML,
+JSON, CSV, CSS, JS) for clients that accept it. Responses with a known
+Content-Length below COMPRESS_MIN_SIZE are left alone; streamed responses
+(no length, e.g. exports) are always compressed, chunk by chunk, so they
+stay streamed. Responses already encoded, such as the precompressed static
+assets, pass through untouched.
+
+A compressed response is a different representation, so a strong ETag gets
+a '-gzip' suffix. The suffix is stripped from If-None-Match before the app
+sees it and put back on the 304, so conditional GETs keep working.
+"""
+
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+COMPRESSIBLE_TYPES = (
+    'text/html', 'text/plain', 'text/csv', 'text/css', 'application/json',
+    'application/javascript', 'text/javascript', 'image/svg+xml',
+)
+
+ETAG_SUFFIX = '-gzip'
+
+
+def _accepts_gzip(environ):
+    return parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))['gzip'] > 0
+
+
+def _gzip_stream(body, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in body:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+
+
+class CompressionMiddleware:
+
+    def __init__(self, app, min_size=1024, level=6):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+
+    def _compressible(self, status, headers):
+        if not status.startswith('200') or 'Content-Encoding' in headers:
+            return False
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        length = headers.get('Content-Length')
+        return length is None or int(length) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or not _accepts_gzip(environ):
+            return self.app(environ, start_response)
+        
+        # Let the app compare If-None-Match against its own, unsuffixed ETags
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and ETAG_SUFFIX in if_none_match:
+            environ['HTTP_IF_NONE_MATCH'] = if_none_match.replace(ETAG_SUFFIX + '"', '"')
+        compress = []
+        
+        def _start_response(status, header_list, exc_info=None):
+            headers = Headers(header_list)
+            etag = headers.get('ETag')
+            strong = etag is not None and not etag.startswith('W/')
+            mimetype = headers.get('Content-Type', '').split(';', 1)[0].strip()
+            if mimetype in COMPRESSIBLE_TYPES or status.startswith('304'):
+                if 'Accept-Encoding' not in headers.get('Vary', ''):
+                    headers.add('Vary', 'Accept-Encoding')
+            if mimetype in COMPRESSIBLE_TYPES and self._compressible(status, headers):
+                compress.append(True)
+                headers.remove('Content-Length')
+                headers['Content-Encoding'] = 'gzip'
+                if strong:
+                    headers['ETag'] = etag[:-1] + ETAG_SUFFIX + '"'
+            elif status.startswith('304') and strong and if_none_match \
+                    and etag[:-1] + ETAG_SUFFIX + '"' in if_none_match:
+                headers['ETag'] = etag[:-1] + ETAG_SUFFIX + '"'
+            return start_response(status, headers.to_wsgi_list(), exc_info)
+        
+        body = self.app(environ, _start_response)
+        if not compress:
+            return body
+        return _gzip_stream(body, self.level)
+
+
+def init_app(app):
+    """Wrap app.wsgi_app in the compression middleware"""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, app.config['COMPRESS_MIN_SIZE'],
+                                         app.config['COMPRESS_LEVEL'])
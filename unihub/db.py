@@ -0,0 +1,315 @@
+"""Pooled database connections for the Flask application
+
+The pool hands out one connection per request (stored on flask.g) and takes
+it back at app-context teardown, rolling back anything left uncommitted.
+Counters for checkouts, waits, timeouts and connections in use are
+available from pool_stats().
+"""
+
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, has_app_context
+
+from unihub import backends
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections with a bounded size
+
+    connect is a zero-argument callable returning a new connection.
+    Connections idle longer than idle_timeout are closed instead of reused,
+    and connections idle longer than ping_interval are health-checked
+    before being handed out.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=5.0,
+                 idle_timeout=300.0, ping_interval=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError('Pool sizes must satisfy 0 <= min_size <= max_size, max_size >= 1')
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        
+        self._idle = deque()  # (connection, returned_at), most recently used on the right
+        self._size = 0
+        self._cond = threading.Condition()
+        self._counters = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'created': 0,
+            'closed': 0,
+            'recycled': 0,
+            'failed_health_checks': 0,
+        }
+
+    def _open(self):
+        """Open a connection for a slot that has already been reserved"""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._counters['created'] += 1
+        return conn
+
+    def _close(self, conn):
+        """Close a connection without touching the slot count"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._counters['closed'] += 1
+
+    @staticmethod
+    def _healthy(conn):
+        """Ping the server; drivers without ping() get a trivial query"""
+        try:
+            if hasattr(conn, 'ping'):
+                conn.ping()
+            else:
+                conn.cursor().execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    def fill(self):
+        """Open connections until min_size are available"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn = self._open()
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self):
+        """Check out a connection, waiting up to timeout seconds for one"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, returned_at = None, None
+                    break
+                if not waited:
+                    self._counters['waits'] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'No database connection available after {self.timeout}s '
+                        f'({self.max_size} in use)'
+                    )
+                self._cond.wait(remaining)
+        
+        if conn is not None:
+            idle_for = time.monotonic() - returned_at
+            if idle_for > self.idle_timeout:
+                self._close(conn)
+                with self._cond:
+                    self._counters['recycled'] += 1
+                conn = None
+            elif idle_for > self.ping_interval and not self._healthy(conn):
+                self._close(conn)
+                with self._cond:
+                    self._counters['failed_health_checks'] += 1
+                conn = None
+        
+        if conn is None:
+            conn = self._open()
+        
+        with self._cond:
+            self._counters['checkouts'] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, or close it when discard is set"""
+        if discard:
+            self._close(conn)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            self._idle.append((conn, now))
+            # Trim connections that have sat unused past idle_timeout
+            while (self._size > self.min_size and self._idle
+                   and now - self._idle[0][1] > self.idle_timeout):
+                expired.append(self._idle.popleft()[0])
+                self._size -= 1
+                self._counters['recycled'] += 1
+            self._cond.notify()
+        for stale in expired:
+            self._close(stale)
+
+    def close(self):
+        """Close every idle connection; checked-out ones close on release"""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Snapshot of pool counters and current occupancy"""
+        with self._cond:
+            stats = dict(self._counters)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['min_size'] = self.min_size
+            stats['max_size'] = self.max_size
+        return stats
+
+
+def init_app(app):
+    """Create the application's backend and connection pool from app.config"""
+    app.config.setdefault('DATABASE_BACKEND', 'mysql')
+    app.config.setdefault('DB_POOL_MIN_SIZE', 2)
+    app.config.setdefault('DB_POOL_MAX_SIZE', 10)
+    app.config.setdefault('DB_POOL_TIMEOUT', 5.0)
+    app.config.setdefault('DB_POOL_IDLE_TIMEOUT', 300.0)
+    app.config.setdefault('DB_POOL_PING_INTERVAL', 30.0)
+    
+    config = app.config
+    backend = backends.from_config(config)
+    connect = backend.connect
+    if 'metrics' in app.extensions:
+        # Cursors of every pooled connection time their statements (unihub.metrics)
+        connect = app.extensions['metrics'].instrument(connect)
+    app.extensions['db_backend'] = backend
+    app.extensions['db_pool'] = ConnectionPool(
+        connect,
+        min_size=config['DB_POOL_MIN_SIZE'],
+        max_size=config['DB_POOL_MAX_SIZE'],
+        timeout=config['DB_POOL_TIMEOUT'],
+        idle_timeout=config['DB_POOL_IDLE_TIMEOUT'],
+        ping_interval=config['DB_POOL_PING_INTERVAL'],
+    )
+    app.teardown_appcontext(_return_connection)
+
+
+def get_backend():
+    """The current application's database backend"""
+    return current_app.extensions['db_backend']
+
+
+def get_pool():
+    """The current application's connection pool"""
+    return current_app.extensions['db_pool']
+
+
+def get_connection():
+    """Connection checked out for the current app context"""
+    if 'db_connection' not in g:
+        g.db_connection = get_pool().acquire()
+    return g.db_connection
+
+
+def get_cursor():
+    """New dict cursor on the current app context's connection"""
+    return get_connection().cursor()
+
+
+def commit():
+    """Commit the current app context's transaction, then run on_commit callbacks"""
+    get_connection().commit()
+    callbacks = g.pop('db_on_commit', [])
+    for callback in callbacks:
+        callback()
+
+
+def rollback():
+    """Roll back the current app context's transaction and drop its on_commit callbacks"""
+    get_connection().rollback()
+    g.pop('db_on_commit', None)
+
+
+def on_commit(callback):
+    """Run callback after the current transaction commits; dropped on rollback
+
+    Outside an app context there is no pending transaction to wait for, so the
+    callback runs immediately.
+    """
+    if not has_app_context():
+        callback()
+        return
+    g.setdefault('db_on_commit', []).append(callback)
+
+
+def stream_rows(sql, params=(), fetch_size=None):
+    """Iterate over a query's rows in constant memory
+
+    The query runs on a connection of its own, checked out when iteration
+    starts and returned when it ends, through the backend's unbuffered
+    cursor; rows are fetched fetch_size at a time. The pool and backend are
+    bound now, so the generator may outlive the request that created it.
+    """
+    pool, backend = get_pool(), get_backend()
+    fetch_size = fetch_size or current_app.config.get('EXPORT_FETCH_SIZE', 1000)
+    
+    def rows():
+        conn = pool.acquire()
+        finished = False
+        try:
+            cursor = backend.streaming_cursor(conn)
+            cursor.execute(sql, params)
+            while True:
+                batch = cursor.fetchmany(fetch_size)
+                if not batch:
+                    break
+                yield from batch
+            cursor.close()
+            conn.rollback()
+            finished = True
+        finally:
+            # An abandoned unbuffered result would have to be drained first;
+            # dropping the connection is cheaper
+            pool.release(conn, discard=not finished)
+    
+    return rows()
+
+
+def pool_stats():
+    """Pool counters for the current application"""
+    return get_pool().stats()
+
+
+def _return_connection(exception=None):
+    """Roll back and hand the context's connection back to the pool"""
+    g.pop('db_on_commit', None)
+    conn = g.pop('db_connection', None)
+    if conn is None:
+        return
+    try:
+        conn.rollback()
+    except Exception:
+        get_pool().release(conn, discard=True)
+        return
+    get_pool().release(conn)
@@ -0,0 +1,260 @@
+"""Batched outbound notifications (email) for large audiences
+
+A dispatch job names an audience: the target_audience of an
+admin_notifications row, or every student with an outstanding fee
+balance. Running a job walks the audience in keyset-paginated chunks of
+DISPATCH_CHUNK_SIZE recipients, renders from templates loaded once per job
+(a notification body is rendered once and shared), and hands each chunk
+to a thread pool of MAIL_POOL_SIZE senders sharing pooled SMTP sessions.
+Per-recipient results go to dispatch_deliveries with one multi-row upsert
+per chunk, and the job's counters are committed with them, so an
+interrupted job resumes where it stopped and never resends a Sent row.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+from flask import current_app
+
+from unihub import db
+from unihub.mailer import create_mailer
+
+USER_TYPES = {
+    'All': ('student', 'faculty'),
+    'Students': ('student',),
+    'Faculty': ('faculty',),
+}
+
+
+def _notification_recipients(cursor, job, after, limit):
+    cursor.execute('SELECT target_audience FROM admin_notifications WHERE notification_id = %s',
+                   (job['reference_id'],))
+    user_types = USER_TYPES[cursor.fetchone()['target_audience']]
+    placeholders = ', '.join(['%s'] * len(user_types))
+    cursor.execute(f"""
+        SELECT u.user_id, u.email, COALESCE(st.first_name, u.username) AS name
+        FROM users u
+        LEFT JOIN students st ON st.user_id = u.user_id
+        WHERE u.is_active = TRUE AND u.user_type IN ({placeholders}) AND u.user_id > %s
+        ORDER BY u.user_id
+        LIMIT %s
+    """, user_types + (after, limit))
+    return cursor.fetchall()
+
+
+def _fee_reminder_recipients(cursor, job, after, limit):
+    cursor.execute("""
+        SELECT u.user_id, u.email, st.first_name AS name, SUM(l.balance) AS outstanding
+        FROM fee_ledger l
+        JOIN students st ON l.student_id = st.student_id
+        JOIN users u ON st.user_id = u.user_id
+        WHERE l.balance > 0 AND u.is_active = TRUE AND u.user_id > %s
+        GROUP BY u.user_id, u.email, st.first_name
+        ORDER BY u.user_id
+        LIMIT %s
+    """, (after, limit))
+    return cursor.fetchall()
+
+
+def _notification_context(cursor, job):
+    cursor.execute('SELECT title, content, type FROM admin_notifications WHERE notification_id = %s',
+                   (job['reference_id'],))
+    return {'notification': cursor.fetchone()}
+
+
+# kind -> (recipient query, template, per-recipient rendering?, shared context loader)
+KINDS = {
+    'notification': (_notification_recipients, 'email/notification.txt', False,
+                     _notification_context),
+    'fee_reminder': (_fee_reminder_recipients, 'email/fee_reminder.txt', True,
+                     lambda cursor, job: {}),
+}
+
+
+def create_job(cursor, kind, subject, reference_id=None, created_by=None):
+    """Queue a dispatch job; returns its job_id"""
+    if kind not in KINDS:
+        raise ValueError(f'Unknown dispatch kind: {kind!r}')
+    if kind == 'notification':
+        cursor.execute('SELECT 1 FROM admin_notifications WHERE notification_id = %s',
+                       (reference_id,))
+        if cursor.fetchone() is None:
+            raise ValueError(f'Unknown notification_id: {reference_id}')
+    cursor.execute("""
+        INSERT INTO dispatch_jobs (kind, reference_id, subject, status, created_by)
+        VALUES (%s, %s, %s, 'Queued', %s)
+    """, (kind, reference_id, subject, created_by))
+    return cursor.lastrowid
+
+
+def get_job(cursor, job_id):
+    cursor.execute("""
+        SELECT job_id, kind, reference_id, subject, status, recipients, sent, failed,
+               created_at, finished_at
+        FROM dispatch_jobs WHERE job_id = %s
+    """, (job_id,))
+    return cursor.fetchone()
+
+
+def _record_results(cursor, job_id, results):
+    """One multi-row upsert of (user_id, address, status, attempts, error) results"""
+    placeholders = ', '.join(["(%s, %s, %s, %s, %s, %s, CASE WHEN %s = 'Sent' THEN NOW() END)"]
+                             * len(results))
+    cursor.execute(f"""
+        INSERT INTO dispatch_deliveries
+            (job_id, user_id, address, status, attempts, last_error, sent_at)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            status = VALUES(status), attempts = attempts + VALUES(attempts),
+            last_error = VALUES(last_error), sent_at = VALUES(sent_at)
+    """, tuple(
+        value
+        for user_id, address, status, attempts, error in results
+        for value in (job_id, user_id, address, status, attempts, error, status)
+    ))
+
+
+def run_job(job_id, progress=None):
+    """Deliver a job to every recipient not already Sent; returns the job row
+
+    progress, if given, is called with the job's counters after each chunk.
+    """
+    config = current_app.config
+    chunk_size = config.get('DISPATCH_CHUNK_SIZE', 500)
+    cursor = db.get_cursor()
+    job = get_job(cursor, job_id)
+    if job is None:
+        raise ValueError(f'Unknown dispatch job: {job_id}')
+    recipients_for, template_name, personal, context_for = KINDS[job['kind']]
+    
+    cursor.execute("UPDATE dispatch_jobs SET status = 'Running' WHERE job_id = %s", (job_id,))
+    db.commit()
+    
+    template = current_app.jinja_env.get_template(template_name)
+    context = context_for(cursor, job)
+    shared_body = None if personal else template.render(**context)
+    counters = {'recipients': 0, 'sent': 0, 'failed': 0, 'skipped': 0}
+
+    def build(recipient):
+        message = EmailMessage()
+        message['To'] = recipient['email']
+        message['Subject'] = job['subject']
+        body = shared_body if shared_body is not None else template.render(recipient=recipient, **context)
+        message.set_content(body)
+        return message
+        
+    mailer = create_mailer()
+    workers = config.get('MAIL_POOL_SIZE', 4)
+    after = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                chunk = recipients_for(cursor, job, after, chunk_size)
+                if not chunk:
+                    break
+                after = chunk[-1]['user_id']
+                counters['recipients'] += len(chunk)
+        
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"""
+                    SELECT user_id FROM dispatch_deliveries
+                    WHERE job_id = %s AND status = 'Sent' AND user_id IN ({placeholders})
+                """, (job_id,) + tuple(recipient['user_id'] for recipient in chunk))
+                done = {row['user_id'] for row in cursor.fetchall()}
+                pending = [recipient for recipient in chunk if recipient['user_id'] not in done]
+                counters['skipped'] += len(chunk) - len(pending)
+                if not pending:
+                    continue
+        
+                outcomes = pool.map(mailer.send, [build(recipient) for recipient in pending])
+                results = []
+                for recipient, (delivered, attempts, error) in zip(pending, outcomes):
+                    counters['sent' if delivered else 'failed'] += 1
+                    results.append((recipient['user_id'], recipient['email'],
+                                    'Sent' if delivered else 'Failed', attempts, error))
+                _record_results(cursor, job_id, results)
+                cursor.execute("""
+                    UPDATE dispatch_jobs SET recipients = %s, sent = %s, failed = %s
+                    WHERE job_id = %s
+                """, (counters['recipients'], counters['sent'] + counters['skipped'],
+                      counters['failed'], job_id))
+                db.commit()
+                if progress:
+                    progress(counters)
+    except Exception:
+        db.rollback()
+        cursor.execute("UPDATE dispatch_jobs SET status = 'Failed' WHERE job_id = %s", (job_id,))
+        db.commit()
+        raise
+    finally:
+        mailer.close()
+        
+    status = 'Done' if counters['failed'] == 0 else 'Failed'
+    cursor.execute("""
+        UPDATE dispatch_jobs
+        SET status = %s, recipients = %s, sent = %s, failed = %s, finished_at = NOW()
+        WHERE job_id = %s
+    """, (status, counters['recipients'], counters['sent'] + counters['skipped'],
+          counters['failed'], job_id))
+    db.commit()
+    return get_job(cursor, job_id)
+
+
+def start_job(app, job_id):
+    """Run a job on a background thread so the request that queued it can return
+
+    A job cut short by a worker restart stays Running; `flask dispatch run`
+    resumes it.
+    """
+    def target():
+        with app.app_context():
+            try:
+                run_job(job_id)
+            except Exception:
+                app.logger.exception('Dispatch job %s failed', job_id)
+        
+    thread = threading.Thread(target=target, name=f'dispatch-{job_id}', daemon=True)
+    thread.start()
+    return thread
+
+
+def pending_jobs(cursor):
+    """IDs of jobs that are queued, were interrupted or have failed deliveries"""
+    cursor.execute("""
+        SELECT job_id FROM dispatch_jobs
+        WHERE status IN ('Queued', 'Running', 'Failed')
+        ORDER BY job_id
+    """)
+    return [row['job_id'] for row in cursor.fetchall()]
+
+
+def benchmark(recipients=2000, port=None):
+    """Send synthetic messages through the pooled mailer to a local sink
+
+    Returns (messages per second, SMTP connections opened).
+    """
+    from unihub.smtp_sink import SMTPSink
+    
+    config = current_app.config
+    with SMTPSink(port=port or 0) as sink:
+        saved = config['MAIL_SERVER'], config['MAIL_PORT']
+        config['MAIL_SERVER'], config['MAIL_PORT'] = sink.address
+        try:
+            mailer = create_mailer()
+            messages = []
+            for number in range(recipients):
+                message = EmailMessage()
+                message['To'] = f'student{number}@unihub.local'
+                message['Subject'] = 'Benchmark'
+                message.set_content('Benchmark message')
+                messages.append(message)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=config['MAIL_POOL_SIZE']) as pool:
+                list(pool.map(mailer.send, messages))
+            elapsed = time.perf_counter() - started
+            mailer.close()
+        finally:
+            config['MAIL_SERVER'], config['MAIL_PORT'] = saved
+    return recipients / elapsed, mailer.pool.opened
@@ -0,0 +1,218 @@
+"""Streaming CSV and PDF report exports
+
+Rows come from db.stream_rows (an unbuffered server-side cursor on a
+connection of its own) and are encoded as they arrive, so a generator
+response holds one CSV chunk or one PDF page in memory however many rows
+the export covers. The PDF writer emits each page as soon as it is full
+and only keeps object offsets until the cross-reference table at the end.
+"""
+
+import csv
+import io
+from datetime import date
+
+from flask import Response, current_app
+
+from unihub import db
+
+# Each report: SELECT list and joins, the filters it accepts, ORDER BY, and
+# (header, PDF column width in characters) per output column
+REPORTS = {
+    'attendance': {
+        'title': 'Attendance Report',
+        'query': """
+            SELECT st.enrollment_number, s.subject_code, a.attendance_date, a.status, a.remarks
+            FROM attendance a
+            JOIN students st ON a.student_id = st.student_id
+            JOIN subjects s ON a.subject_id = s.subject_id
+        """,
+        'filters': {
+            'student_id': 'a.student_id', 'subject_id': 'a.subject_id',
+            'course_id': 'st.course_id', 'semester': 's.semester',
+        },
+        'order_by': 'st.enrollment_number, s.subject_code, a.attendance_date',
+        'columns': (
+            ('Enrollment', 14), ('Subject', 10), ('Date', 11), ('Status', 8), ('Remarks', 40),
+        ),
+    },
+    'grades': {
+        'title': 'Grade Sheet',
+        'query': """
+            SELECT st.enrollment_number, s.subject_code, s.subject_name, g.semester,
+                   g.academic_year, g.internal_marks, g.external_marks, g.total_marks,
+                   g.grade, g.grade_points, g.status
+            FROM grades g
+            JOIN students st ON g.student_id = st.student_id
+            JOIN subjects s ON g.subject_id = s.subject_id
+        """,
+        'filters': {
+            'student_id': 'g.student_id', 'subject_id': 'g.subject_id',
+            'course_id': 'st.course_id', 'semester': 'g.semester',
+        },
+        'order_by': 'st.enrollment_number, g.semester, s.subject_code',
+        'columns': (
+            ('Enrollment', 14), ('Subject', 10), ('Name', 28), ('Sem', 4), ('Year', 8),
+            ('Internal', 9), ('External', 9), ('Total', 7), ('Grade', 6), ('Points', 7),
+            ('Status', 8),
+        ),
+    },
+    'fee_payments': {
+        'title': 'Fee Payments',
+        'query': """
+            SELECT st.enrollment_number, p.receipt_number, p.payment_date, fs.semester,
+                   fs.academic_year, p.amount_paid, p.payment_method, p.transaction_id,
+                   p.status
+            FROM fee_payments p
+            JOIN students st ON p.student_id = st.student_id
+            JOIN fee_structure fs ON p.fee_structure_id = fs.fee_structure_id
+        """,
+        'filters': {
+            'student_id': 'p.student_id', 'course_id': 'st.course_id', 'semester': 'fs.semester',
+        },
+        'order_by': 'st.enrollment_number, p.payment_date, p.payment_id',
+        'columns': (
+            ('Enrollment', 14), ('Receipt', 14), ('Date', 11), ('Sem', 4), ('Year', 8),
+            ('Amount', 11), ('Method', 8), ('Transaction', 22), ('Status', 10),
+        ),
+    },
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'pdf': 'application/pdf',
+}
+
+
+def _query(report, filters):
+    """(sql, params) for a report restricted by the given filter values"""
+    spec = REPORTS[report]
+    clauses, params = [], []
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name not in spec['filters']:
+            raise ValueError(f'{report} cannot be filtered by {name}')
+        clauses.append(f"{spec['filters'][name]} = %s")
+        params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return f"{spec['query']} {where} ORDER BY {spec['order_by']}", tuple(params)
+
+
+def _cell(value):
+    """Text for one exported value"""
+    if value is None:
+        return ''
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def csv_chunks(headers, rows, chunk_rows=500):
+    """Yield CSV text chunk_rows rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    pending = 0
+    for row in rows:
+        writer.writerow([_cell(value) for value in row.values()])
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue()
+
+
+def _pdf_text(text):
+    """Escape a string for a PDF literal, Latin-1 only (Courier has no more)"""
+    text = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('latin-1', 'replace')
+
+
+def pdf_pages(title, columns, rows, rows_per_page=50):
+    """Yield a landscape A4 PDF as bytes, one page at a time
+
+    Object 1 is the catalog, 2 the page tree and 3 the font; both trees are
+    written last, once every page object number is known.
+    """
+    offsets = {}
+    position = 0
+    next_id = 4
+    page_ids = []
+
+    def emit(object_id, body):
+        nonlocal position
+        offsets[object_id] = position
+        data = b'%d 0 obj\n' % object_id + body + b'\nendobj\n'
+        position += len(data)
+        return data
+
+    def page(lines, number):
+        nonlocal next_id
+        content = [b'BT /F1 8 Tf 11 TL 30 560 Td']
+        content.append(b'(' + _pdf_text(f'{title} - page {number}') + b') Tj T* T*')
+        content.extend(b'(' + _pdf_text(line) + b') Tj T*' for line in lines)
+        content.append(b'ET')
+        stream = b'\n'.join(content)
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        page_ids.append(page_id)
+        return emit(content_id, b'<< /Length %d >>\nstream\n' % len(stream) + stream
+                    + b'\nendstream') + emit(page_id, (
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 842 595] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id
+        ))
+
+    def line(values):
+        return ' '.join(value[:width].ljust(width) for value, (_, width) in zip(values, columns))
+
+    header = [line([name for name, _ in columns]),
+              '-' * sum(width + 1 for _, width in columns)]
+
+    head = b'%PDF-1.4\n'
+    position = len(head)
+    yield head + emit(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>')
+
+    lines = []
+    for row in rows:
+        lines.append(line([_cell(value) for value in row.values()]))
+        if len(lines) >= rows_per_page:
+            yield page(header + lines, len(page_ids) + 1)
+            lines = []
+    if lines or not page_ids:
+        yield page(header + lines, len(page_ids) + 1)
+
+    kids = b' '.join(b'%d 0 R' % page_id for page_id in page_ids)
+    tail = emit(2, b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(page_ids))
+    tail += emit(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    xref = [b'xref\n0 %d\n' % next_id, b'0000000000 65535 f \n']
+    xref.extend(b'%010d 00000 n \n' % offsets[object_id] for object_id in range(1, next_id))
+    yield tail + b''.join(xref) + (
+        b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (next_id, position)
+    )
+
+
+def export_response(report, fmt, filters=None):
+    """Streaming download of a report as csv or pdf
+
+    filters maps filter names (student_id, subject_id, course_id, semester)
+    to values; None values are ignored. Raises KeyError for an unknown report
+    or format and ValueError for a filter the report does not support.
+    """
+    spec = REPORTS[report]
+    mimetype = FORMATS[fmt]
+    sql, params = _query(report, filters or {})
+    rows = db.stream_rows(sql, params)
+    config = current_app.config
+
+    if fmt == 'csv':
+        body = csv_chunks([name for name, _ in spec['columns']], rows,
+                          config.get('EXPORT_CSV_CHUNK_ROWS', 500))
+    else:
+        body = pdf_pages(spec['title'], spec['columns'], rows,
+                         config.get('EXPORT_PDF_ROWS_PER_PAGE', 50))
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{report}.{fmt}"',
+        'Cache-Control': 'no-store',
+    })
@@ -0,0 +1,334 @@
+"""Fee payments and the per-student fee_ledger they maintain
+
+fee_ledger holds one row per (student, fee_structure) with the structure's
+total, the sum of Completed payments against it and the outstanding
+balance. Payments are written through record_payment and
+set_payment_status, which adjust the ledger in the same transaction; like
+the attendance and grade helpers, nothing here commits. Pending and Failed
+payments never count as paid.
+
+Fee structures are edited through update_fee_structure, which re-totals
+their ledger rows and bumps the FEE_STRUCTURE_VERSION row of
+cache_versions; the fees API's ETag includes it.
+"""
+
+from unihub.changes import bump_student_data, bump_versions, mark_changed
+from unihub.pagination import seek_page
+
+PAYMENT_STATUSES = ('Pending', 'Completed', 'Failed')
+PAYMENT_METHODS = ('Cash', 'Card', 'Online', 'Cheque')
+
+FEE_STRUCTURE_VERSION = 'fee_structure'
+
+CREATE_LEDGER_TABLE = """
+    CREATE TABLE IF NOT EXISTS fee_ledger (
+        student_id INT NOT NULL,
+        fee_structure_id INT NOT NULL,
+        course_id INT NOT NULL,
+        semester INT NOT NULL,
+        academic_year VARCHAR(10) NOT NULL,
+        total_fee DECIMAL(10,2) NOT NULL,
+        paid DECIMAL(10,2) NOT NULL DEFAULT 0,
+        balance DECIMAL(10,2) NOT NULL,
+        PRIMARY KEY (student_id, fee_structure_id),
+        INDEX idx_fee_ledger_balance (balance)
+    )
+"""
+
+# Ledger rows for the latest fee structure of every active student's
+# current course and semester; existing rows are left alone
+_CHARGE_CURRENT = """
+    INSERT IGNORE INTO fee_ledger
+        (student_id, fee_structure_id, course_id, semester, academic_year, total_fee, paid, balance)
+    SELECT st.student_id, fs.fee_structure_id, fs.course_id, fs.semester, fs.academic_year,
+           fs.total_fee, 0, fs.total_fee
+    FROM students st
+    JOIN fee_structure fs ON fs.course_id = st.course_id AND fs.semester = st.semester
+    WHERE st.status = 'Active'
+      AND fs.academic_year = (
+          SELECT MAX(latest.academic_year) FROM fee_structure latest
+          WHERE latest.course_id = fs.course_id AND latest.semester = fs.semester
+      )
+"""
+
+
+def _check_status(status):
+    if status not in PAYMENT_STATUSES:
+        raise ValueError(f"Unknown payment status: {status!r}")
+
+
+def _adjust_paid(cursor, student_id, fee_structure_id, delta):
+    """Add delta to a ledger row's paid total, creating the row if needed"""
+    cursor.execute("""
+        INSERT INTO fee_ledger
+            (student_id, fee_structure_id, course_id, semester, academic_year, total_fee, paid, balance)
+        SELECT %s, fee_structure_id, course_id, semester, academic_year, total_fee, %s, total_fee - %s
+        FROM fee_structure WHERE fee_structure_id = %s
+        ON DUPLICATE KEY UPDATE
+            balance = balance - VALUES(paid),
+            paid = paid + VALUES(paid)
+    """, (student_id, delta, delta, fee_structure_id))
+    if cursor.rowcount == 0:
+        # MySQL also reports 0 rows when a zero delta leaves the row unchanged
+        cursor.execute('SELECT 1 FROM fee_structure WHERE fee_structure_id = %s',
+                       (fee_structure_id,))
+        if cursor.fetchone() is None:
+            raise ValueError(f"Unknown fee_structure_id: {fee_structure_id}")
+    mark_changed(cursor, [student_id], 'fees')
+
+
+def record_payment(cursor, student_id, fee_structure_id, amount_paid, payment_date,
+                   payment_method, receipt_number, transaction_id=None, status='Completed'):
+    """Insert one payment and, if Completed, credit it to the ledger
+
+    Returns the new payment_id. A receipt_number or transaction_id that is
+    already recorded raises the backend's integrity error.
+    """
+    _check_status(status)
+    if payment_method not in PAYMENT_METHODS:
+        raise ValueError(f"Unknown payment method: {payment_method!r}")
+    cursor.execute('SELECT 1 FROM fee_structure WHERE fee_structure_id = %s', (fee_structure_id,))
+    if cursor.fetchone() is None:
+        raise ValueError(f"Unknown fee_structure_id: {fee_structure_id}")
+    cursor.execute('SELECT 1 FROM students WHERE student_id = %s', (student_id,))
+    if cursor.fetchone() is None:
+        raise ValueError(f"Unknown student_id: {student_id}")
+    cursor.execute("""
+        INSERT INTO fee_payments
+            (student_id, fee_structure_id, amount_paid, payment_date, payment_method,
+             transaction_id, receipt_number, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, (student_id, fee_structure_id, amount_paid, payment_date, payment_method,
+          transaction_id, receipt_number, status))
+    payment_id = cursor.lastrowid
+    if status == 'Completed':
+        _adjust_paid(cursor, student_id, fee_structure_id, amount_paid)
+    else:
+        bump_versions(cursor, [student_id], 'fees')
+    return payment_id
+
+
+def set_payment_status(cursor, payment_id, status):
+    """Change a payment's status and move its amount in or out of the ledger
+
+    Returns True if the status changed.
+    """
+    _check_status(status)
+    cursor.execute("""
+        SELECT student_id, fee_structure_id, amount_paid, status FROM fee_payments
+        WHERE payment_id = %s
+        FOR UPDATE
+    """, (payment_id,))
+    payment = cursor.fetchone()
+    if payment is None:
+        raise ValueError(f"Unknown payment_id: {payment_id}")
+    if payment['status'] == status:
+        return False
+    
+    cursor.execute('UPDATE fee_payments SET status = %s WHERE payment_id = %s', (status, payment_id))
+    if 'Completed' in (payment['status'], status):
+        sign = 1 if status == 'Completed' else -1
+        _adjust_paid(cursor, payment['student_id'], payment['fee_structure_id'],
+                     sign * payment['amount_paid'])
+    else:
+        bump_versions(cursor, [payment['student_id']], 'fees')
+    return True
+
+
+def charge_current_fees(cursor):
+    """Open ledger rows for every active student's current semester fees
+
+    Run after fee structures are published or students are promoted.
+    Returns the number of rows added.
+    """
+    cursor.execute(_CHARGE_CURRENT)
+    rows = cursor.rowcount
+    if rows:
+        bump_student_data(cursor)
+    return rows
+
+
+def update_fee_structure(cursor, fee_structure_id, tuition_fee, library_fee=0, lab_fee=0,
+                         other_fee=0):
+    """Change a fee structure's fees and re-total the ledger rows charged from it
+
+    Students with a ledger row are flagged for re-scoring. Returns the
+    number of ledger rows updated.
+    """
+    cursor.execute('SELECT 1 FROM fee_structure WHERE fee_structure_id = %s', (fee_structure_id,))
+    if cursor.fetchone() is None:
+        raise ValueError(f"Unknown fee_structure_id: {fee_structure_id}")
+    total_fee = tuition_fee + library_fee + lab_fee + other_fee
+    cursor.execute("""
+        UPDATE fee_structure
+        SET tuition_fee = %s, library_fee = %s, lab_fee = %s, other_fee = %s, total_fee = %s
+        WHERE fee_structure_id = %s
+    """, (tuition_fee, library_fee, lab_fee, other_fee, total_fee, fee_structure_id))
+    cursor.execute("""
+        INSERT INTO cache_versions (name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, (FEE_STRUCTURE_VERSION,))
+    cursor.execute('SELECT student_id FROM fee_ledger WHERE fee_structure_id = %s',
+                   (fee_structure_id,))
+    student_ids = [row['student_id'] for row in cursor.fetchall()]
+    cursor.execute("""
+        UPDATE fee_ledger SET total_fee = %s, balance = %s - paid
+        WHERE fee_structure_id = %s
+    """, (total_fee, total_fee, fee_structure_id))
+    mark_changed(cursor, student_ids, 'fees')
+    return len(student_ids)
+
+
+# Student-facing reads, shared with the async views in unihub.asgi
+FEE_STRUCTURE_QUERY = """
+    SELECT fee_structure_id, tuition_fee, library_fee, lab_fee, other_fee,
+           total_fee, academic_year
+    FROM fee_structure
+    WHERE course_id = %s AND semester = %s
+    ORDER BY academic_year DESC
+    LIMIT 1
+"""
+
+LEDGER_QUERY = """
+    SELECT total_fee, paid, balance FROM fee_ledger
+    WHERE student_id = %s AND fee_structure_id = %s
+"""
+
+LEDGER_TOTALS_QUERY = """
+    SELECT SUM(total_fee) AS total_fee, SUM(paid) AS paid,
+           SUM(CASE WHEN balance > 0 THEN balance ELSE 0 END) AS outstanding
+    FROM fee_ledger
+    WHERE student_id = %s
+"""
+
+PAYMENT_HISTORY_SELECT = """
+    SELECT payment_id, payment_date, receipt_number, payment_method, amount_paid, status
+    FROM fee_payments
+"""
+
+PAYMENT_HISTORY_KEY = ['payment_date', 'payment_id']
+
+
+def current_fee_structure(cursor, course_id, semester):
+    """Latest academic year's fee structure for a course and semester, or None"""
+    cursor.execute(FEE_STRUCTURE_QUERY, (course_id, semester))
+    return cursor.fetchone()
+
+
+def get_ledger(cursor, student_id, fee_structure_id):
+    """Primary-key lookup of one ledger row, or None"""
+    cursor.execute(LEDGER_QUERY, (student_id, fee_structure_id))
+    return cursor.fetchone()
+
+
+def get_outstanding(cursor, student_id):
+    """Sum of positive balances across a student's ledger rows"""
+    cursor.execute("""
+        SELECT SUM(balance) AS outstanding FROM fee_ledger
+        WHERE student_id = %s AND balance > 0
+    """, (student_id,))
+    row = cursor.fetchone()
+    return row['outstanding'] or 0
+
+
+def ledger_totals(cursor, student_id):
+    """A student's fees charged, paid and outstanding, summed over their ledger rows"""
+    cursor.execute(LEDGER_TOTALS_QUERY, (student_id,))
+    return totals_from_row(cursor.fetchone())
+
+
+def totals_from_row(row):
+    """ledger_totals' dict from its aggregate row (SUMs are NULL without rows)"""
+    return {column: row[column] or 0 for column in ('total_fee', 'paid', 'outstanding')}
+
+
+def payment_history(cursor, student_id, after=None, limit=20):
+    """One page of a student's payments, newest first, and the next page's cursor
+
+    Seeks on idx_fee_payments_student_date; payment_id breaks ties between
+    payments made on the same day.
+    """
+    return seek_page(cursor, PAYMENT_HISTORY_SELECT, ['student_id = %s'], [student_id],
+                     PAYMENT_HISTORY_KEY, after, limit)
+
+
+def defaulters(cursor, academic_year=None, course_id=None, min_balance=0):
+    """Students owing more than min_balance, largest debt first
+
+    One range scan of idx_fee_ledger_balance grouped per student, instead
+    of a balance lookup per student.
+    """
+    clauses, params = ['l.balance > %s'], [min_balance]
+    if academic_year is not None:
+        clauses.append('l.academic_year = %s')
+        params.append(academic_year)
+    if course_id is not None:
+        clauses.append('l.course_id = %s')
+        params.append(course_id)
+    cursor.execute(f"""
+        SELECT l.student_id, st.enrollment_number, st.first_name, st.last_name, st.course_id,
+               COUNT(*) AS open_items, SUM(l.total_fee) AS total_fee,
+               SUM(l.paid) AS paid, SUM(l.balance) AS outstanding
+        FROM fee_ledger l
+        JOIN students st ON l.student_id = st.student_id
+        WHERE {' AND '.join(clauses)}
+        GROUP BY l.student_id, st.enrollment_number, st.first_name, st.last_name, st.course_id
+        ORDER BY outstanding DESC
+    """, tuple(params))
+    return cursor.fetchall()
+
+
+_AGGREGATE_PAYMENTS = """
+    SELECT p.student_id, fs.fee_structure_id, fs.course_id, fs.semester, fs.academic_year,
+           fs.total_fee, SUM(p.amount_paid) AS paid
+    FROM fee_payments p
+    JOIN fee_structure fs ON p.fee_structure_id = fs.fee_structure_id
+    WHERE p.status = 'Completed'
+    GROUP BY p.student_id, fs.fee_structure_id, fs.course_id, fs.semester, fs.academic_year,
+             fs.total_fee
+"""
+
+
+def rebuild_ledger(cursor):
+    """Recompute fee_ledger from fee_payments and charge current fees
+
+    Returns the number of ledger rows written.
+    """
+    cursor.execute('DELETE FROM fee_ledger')
+    bump_student_data(cursor)
+    cursor.execute(f"""
+        INSERT INTO fee_ledger
+            (student_id, fee_structure_id, course_id, semester, academic_year, total_fee, paid, balance)
+        SELECT student_id, fee_structure_id, course_id, semester, academic_year,
+               total_fee, paid, total_fee - paid
+        FROM ({_AGGREGATE_PAYMENTS}) completed
+    """)
+    rows = cursor.rowcount
+    return rows + charge_current_fees(cursor)
+
+
+def verify_ledger(cursor):
+    """Compare ledger rows with a fresh aggregate of Completed payments
+
+    Returns a list of (student_id, fee_structure_id, stored, actual) tuples of
+    (paid, balance) pairs that disagree. Rows with no payments should show
+    nothing paid and the full fee outstanding.
+    """
+    cursor.execute(_AGGREGATE_PAYMENTS)
+    actual = {
+        (row['student_id'], row['fee_structure_id']):
+            (round(float(row['paid']), 2), round(float(row['total_fee'] - row['paid']), 2))
+        for row in cursor.fetchall()
+    }
+    cursor.execute('SELECT student_id, fee_structure_id, total_fee, paid, balance FROM fee_ledger')
+    stored = {}
+    for row in cursor.fetchall():
+        key = (row['student_id'], row['fee_structure_id'])
+        stored[key] = (round(float(row['paid']), 2), round(float(row['balance']), 2))
+        actual.setdefault(key, (0.0, round(float(row['total_fee']), 2)))
+    
+    return [
+        (key[0], key[1], stored.get(key), actual[key])
+        for key in sorted(actual)
+        if stored.get(key) != actual[key]
+    ]
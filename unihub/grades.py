@@ -0,0 +1,332 @@
+"""Grade writes and the semester GPA / CGPA rollups they maintain
+
+Like unihub.attendance, every function takes the caller's DictCursor and
+never commits, so a grade row and its rollups change in one transaction.
+Rows whose grade_points are still NULL (results pending) do not count
+towards either GPA.
+"""
+
+from unihub.changes import bump_student_data, bump_versions, mark_changed
+
+CREATE_ROLLUP_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS semester_gpa (
+        student_id INT NOT NULL,
+        semester INT NOT NULL,
+        weighted_points DECIMAL(8,2) NOT NULL DEFAULT 0,
+        credits INT NOT NULL DEFAULT 0,
+        gpa DECIMAL(4,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (student_id, semester)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS student_cgpa (
+        student_id INT NOT NULL PRIMARY KEY,
+        weighted_points DECIMAL(10,2) NOT NULL DEFAULT 0,
+        credits INT NOT NULL DEFAULT 0,
+        cgpa DECIMAL(4,2) NOT NULL DEFAULT 0
+    )
+    """,
+)
+
+
+def _ratio(weighted_points, credits):
+    """GPA rounded to 2 decimal places, 0.0 when no credits are graded"""
+    return round(float(weighted_points) / credits, 2) if credits > 0 else 0.0
+
+
+def _subject_credits(cursor, subject_id):
+    """Credits carried by a subject"""
+    cursor.execute('SELECT credits FROM subjects WHERE subject_id = %s', (subject_id,))
+    row = cursor.fetchone()
+    if row is None:
+        raise ValueError(f"Unknown subject_id: {subject_id}")
+    return row['credits']
+
+
+def _contribution(grade_points, credits):
+    """(weighted points, credits) a grade row adds to the rollups
+
+    Stored points come back as Decimal from MySQL and float from SQLite,
+    new ones as float, so the product is always a float.
+    """
+    if grade_points is None:
+        return 0.0, 0
+    return float(grade_points) * credits, credits
+
+
+def _adjust_rollups(cursor, deltas):
+    """Apply weighted-points/credits deltas to the semester GPAs and CGPAs
+
+    deltas maps (student_id, semester) to (points_delta, credits_delta); all
+    rows go out in one multi-row upsert per rollup table. Returns the set of
+    students whose rollups changed.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    if not deltas:
+        return set()
+    cumulative = {}
+    for (student_id, _), (points, credits) in deltas.items():
+        total = cumulative.get(student_id, (0, 0))
+        cumulative[student_id] = (total[0] + points, total[1] + credits)
+    
+    # The ratio is assigned first so it reads the pre-update columns on every
+    # backend; MySQL would otherwise see the already-incremented values. SQLite
+    # stores whole-number DECIMALs as integers, hence the * 1.0 before dividing.
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s)'] * len(deltas))
+    cursor.execute(f"""
+        INSERT INTO semester_gpa (student_id, semester, weighted_points, credits, gpa)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            gpa = CASE WHEN credits + VALUES(credits) > 0
+                       THEN ROUND((weighted_points + VALUES(weighted_points)) * 1.0
+                                  / (credits + VALUES(credits)), 2)
+                       ELSE 0 END,
+            weighted_points = weighted_points + VALUES(weighted_points),
+            credits = credits + VALUES(credits)
+    """, tuple(
+        value
+        for (student_id, semester), (points, credits) in deltas.items()
+        for value in (student_id, semester, points, credits, _ratio(points, credits))
+    ))
+    placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(cumulative))
+    cursor.execute(f"""
+        INSERT INTO student_cgpa (student_id, weighted_points, credits, cgpa)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            cgpa = CASE WHEN credits + VALUES(credits) > 0
+                        THEN ROUND((weighted_points + VALUES(weighted_points)) * 1.0
+                                   / (credits + VALUES(credits)), 2)
+                        ELSE 0 END,
+            weighted_points = weighted_points + VALUES(weighted_points),
+            credits = credits + VALUES(credits)
+    """, tuple(
+        value
+        for student_id, (points, credits) in cumulative.items()
+        for value in (student_id, points, credits, _ratio(points, credits))
+    ))
+    mark_changed(cursor, cumulative, 'grades')
+    return set(cumulative)
+
+
+def _current_grade_points(cursor, student_id, subject_id, semester, academic_year):
+    """Locked read of an existing grade row; returns (exists, grade_points)"""
+    cursor.execute("""
+        SELECT grade_points FROM grades
+        WHERE student_id = %s AND subject_id = %s AND semester = %s AND academic_year = %s
+        FOR UPDATE
+    """, (student_id, subject_id, semester, academic_year))
+    row = cursor.fetchone()
+    return (row is not None), (row['grade_points'] if row else None)
+
+
+def save_grade(cursor, student_id, subject_id, semester, academic_year,
+               internal_marks=None, external_marks=None, total_marks=None,
+               grade=None, grade_points=None, status=None):
+    """Insert or update one grade row and refresh the GPA rollups"""
+    credits = _subject_credits(cursor, subject_id)
+    exists, previous_points = _current_grade_points(
+        cursor, student_id, subject_id, semester, academic_year
+    )
+    
+    values = (internal_marks, external_marks, total_marks, grade, grade_points, status)
+    if exists:
+        cursor.execute("""
+            UPDATE grades
+            SET internal_marks = %s, external_marks = %s, total_marks = %s,
+                grade = %s, grade_points = %s, status = %s
+            WHERE student_id = %s AND subject_id = %s AND semester = %s AND academic_year = %s
+        """, values + (student_id, subject_id, semester, academic_year))
+    else:
+        cursor.execute("""
+            INSERT INTO grades
+                (internal_marks, external_marks, total_marks, grade, grade_points, status,
+                 student_id, subject_id, semester, academic_year)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, values + (student_id, subject_id, semester, academic_year))
+    
+    old_points, old_credits = _contribution(previous_points, credits)
+    new_points, new_credits = _contribution(grade_points, credits)
+    changed = _adjust_rollups(cursor, {
+        (student_id, semester): (new_points - old_points, new_credits - old_credits),
+    })
+    if not changed:
+        bump_versions(cursor, [student_id], 'grades')
+
+
+def save_grades_batch(cursor, subject_id, semester, academic_year, records):
+    """Upsert one subject's grades for many students with multi-row statements
+
+    records maps student_id to (internal_marks, external_marks, total_marks,
+    grade, grade_points, status). The rollups are adjusted in the same
+    transaction. Returns the number of rows written.
+    """
+    if not records:
+        return 0
+    credits = _subject_credits(cursor, subject_id)
+    student_ids = list(records)
+    
+    placeholders = ', '.join(['%s'] * len(student_ids))
+    cursor.execute(f"""
+        SELECT student_id, grade_points FROM grades
+        WHERE subject_id = %s AND semester = %s AND academic_year = %s
+          AND student_id IN ({placeholders})
+        FOR UPDATE
+    """, (subject_id, semester, academic_year) + tuple(student_ids))
+    previous = {row['student_id']: row['grade_points'] for row in cursor.fetchall()}
+    
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(student_ids))
+    cursor.execute(f"""
+        INSERT INTO grades
+            (internal_marks, external_marks, total_marks, grade, grade_points, status,
+             student_id, subject_id, semester, academic_year)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            internal_marks = VALUES(internal_marks), external_marks = VALUES(external_marks),
+            total_marks = VALUES(total_marks), grade = VALUES(grade),
+            grade_points = VALUES(grade_points), status = VALUES(status)
+    """, tuple(
+        value
+        for student_id in student_ids
+        for value in tuple(records[student_id]) + (student_id, subject_id, semester, academic_year)
+    ))
+    
+    deltas = {}
+    for student_id in student_ids:
+        old_points, old_credits = _contribution(previous.get(student_id), credits)
+        new_points, new_credits = _contribution(records[student_id][4], credits)
+        deltas[(student_id, semester)] = (new_points - old_points, new_credits - old_credits)
+    changed = _adjust_rollups(cursor, deltas)
+    bump_versions(cursor, set(student_ids) - changed, 'grades')
+    return len(student_ids)
+
+
+def delete_grade(cursor, student_id, subject_id, semester, academic_year):
+    """Delete one grade row and remove it from the GPA rollups
+
+    Returns True if a row was deleted.
+    """
+    exists, previous_points = _current_grade_points(
+        cursor, student_id, subject_id, semester, academic_year
+    )
+    if not exists:
+        return False
+    
+    cursor.execute("""
+        DELETE FROM grades
+        WHERE student_id = %s AND subject_id = %s AND semester = %s AND academic_year = %s
+    """, (student_id, subject_id, semester, academic_year))
+    points, credits = _contribution(previous_points, _subject_credits(cursor, subject_id))
+    if not _adjust_rollups(cursor, {(student_id, semester): (-points, -credits)}):
+        bump_versions(cursor, [student_id], 'grades')
+    return True
+
+
+# Student-facing reads, shared with the async views in unihub.asgi
+SEMESTER_GRADES_QUERY = """
+    SELECT g.subject_id, s.subject_code, s.subject_name, s.credits, g.academic_year,
+           g.internal_marks, g.external_marks, g.total_marks, g.grade, g.grade_points,
+           g.status
+    FROM grades g
+    JOIN subjects s ON g.subject_id = s.subject_id
+    WHERE g.student_id = %s AND g.semester = %s
+    ORDER BY s.subject_code
+"""
+
+GPA_QUERY = 'SELECT gpa FROM semester_gpa WHERE student_id = %s AND semester = %s'
+
+CGPA_QUERY = 'SELECT cgpa FROM student_cgpa WHERE student_id = %s'
+
+
+def get_semester_grades(cursor, student_id, semester):
+    """A student's grade rows for one semester with subject names and credits"""
+    cursor.execute(SEMESTER_GRADES_QUERY, (student_id, semester))
+    return cursor.fetchall()
+
+
+def get_gpa(cursor, student_id, semester):
+    """Primary-key lookup of a student's GPA for one semester"""
+    cursor.execute(GPA_QUERY, (student_id, semester))
+    row = cursor.fetchone()
+    return float(row['gpa']) if row else 0.0
+
+
+def get_cgpa(cursor, student_id):
+    """Primary-key lookup of a student's cumulative GPA"""
+    cursor.execute(CGPA_QUERY, (student_id,))
+    row = cursor.fetchone()
+    return float(row['cgpa']) if row else 0.0
+
+
+_AGGREGATE_SEMESTERS = """
+    SELECT g.student_id, g.semester,
+           SUM(g.grade_points * s.credits) AS weighted_points,
+           SUM(s.credits) AS credits
+    FROM grades g
+    JOIN subjects s ON g.subject_id = s.subject_id
+    WHERE g.grade_points IS NOT NULL
+    GROUP BY g.student_id, g.semester
+"""
+
+
+def rebuild_rollups(cursor):
+    """Recompute semester_gpa and student_cgpa from the grades table
+
+    Returns the number of semester rows written.
+    """
+    for statement in CREATE_ROLLUP_TABLES:
+        cursor.execute(statement)
+    cursor.execute('DELETE FROM semester_gpa')
+    cursor.execute('DELETE FROM student_cgpa')
+    bump_student_data(cursor)
+    
+    cursor.execute(_AGGREGATE_SEMESTERS)
+    rows = cursor.fetchall()
+    cumulative = {}
+    for row in rows:
+        cursor.execute("""
+            INSERT INTO semester_gpa (student_id, semester, weighted_points, credits, gpa)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (row['student_id'], row['semester'], row['weighted_points'], row['credits'],
+              _ratio(row['weighted_points'], row['credits'])))
+        points, credits = cumulative.get(row['student_id'], (0, 0))
+        cumulative[row['student_id']] = (points + row['weighted_points'], credits + row['credits'])
+    
+    for student_id, (points, credits) in cumulative.items():
+        cursor.execute("""
+            INSERT INTO student_cgpa (student_id, weighted_points, credits, cgpa)
+            VALUES (%s, %s, %s, %s)
+        """, (student_id, points, credits, _ratio(points, credits)))
+    return len(rows)
+
+
+def verify_rollups(cursor):
+    """Compare stored semester rollups with a fresh aggregate of grades
+
+    Returns a list of (student_id, semester, stored, actual) tuples of
+    (weighted_points, credits) pairs that disagree. Semester -1 marks a
+    CGPA row.
+    """
+    def totals(rows, key):
+        return {
+            key(row): (round(float(row['weighted_points'] or 0), 2), int(row['credits'] or 0))
+            for row in rows
+        }
+    
+    cursor.execute(_AGGREGATE_SEMESTERS)
+    actual = totals(cursor.fetchall(), lambda row: (row['student_id'], row['semester']))
+    cursor.execute('SELECT student_id, semester, weighted_points, credits FROM semester_gpa')
+    stored = totals(cursor.fetchall(), lambda row: (row['student_id'], row['semester']))
+    
+    for (student_id, _), (points, credits) in list(actual.items()):
+        previous = actual.get((student_id, -1), (0.0, 0))
+        actual[(student_id, -1)] = (round(previous[0] + points, 2), previous[1] + credits)
+    cursor.execute('SELECT student_id, weighted_points, credits FROM student_cgpa')
+    stored.update(totals(cursor.fetchall(), lambda row: (row['student_id'], -1)))
+    
+    empty = (0.0, 0)
+    return [
+        (key[0], key[1], stored.get(key, empty), actual.get(key, empty))
+        for key in sorted(set(actual) | set(stored))
+        if stored.get(key, empty) != actual.get(key, empty)
+    ]
@@ -0,0 +1,173 @@
+"""Streaming bulk imports for the admin panel
+
+CSV files are read row by row and written in chunks of IMPORT_CHUNK_SIZE
+rows, each chunk in its own transaction with multi-row upserts, so memory
+use is bounded by the chunk and not by the file. Student and subject
+references are validated against cached ID maps, and invalid rows are
+reported by line number instead of aborting the import.
+"""
+
+import csv
+import time
+from datetime import date
+
+from flask import current_app
+
+from unihub import cache, db
+from unihub.attendance import STATUS_COLUMNS, mark_attendance_batch
+
+
+class ImportReport:
+    """Counters, per-row rejects and throughput for one import run"""
+
+    def __init__(self, max_rejects=1000):
+        self.max_rejects = max_rejects
+        self.rows_read = 0
+        self.rows_written = 0
+        self.rejected = 0
+        self.rejects = []
+        self.chunks = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def reject(self, line, reason):
+        self.rejected += 1
+        if len(self.rejects) < self.max_rejects:
+            self.rejects.append({'line': line, 'reason': reason})
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows_read / self.elapsed, 1) if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            'rows_read': self.rows_read,
+            'rows_written': self.rows_written,
+            'rejected': self.rejected,
+            'chunks': self.chunks,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': self.rows_per_second,
+            'rejects': self.rejects,
+            'rejects_truncated': self.rejected > len(self.rejects),
+        }
+
+
+def _reference_cache():
+    return cache.get_cache(
+        'reference_ids', maxsize=8,
+        ttl=current_app.config.get('REFERENCE_CACHE_TTL', 300),
+    )
+
+
+def _load_ids(table, id_column, code_column):
+    cursor = db.get_cursor()
+    cursor.execute(f'SELECT {id_column}, {code_column} FROM {table}')
+    rows = cursor.fetchall()
+    return {
+        'ids': frozenset(row[id_column] for row in rows),
+        'codes': {row[code_column]: row[id_column] for row in rows},
+    }
+
+
+def student_ids():
+    """Cached {'ids': set of student_id, 'codes': enrollment_number -> student_id}"""
+    return _reference_cache().get_or_load(
+        'students', lambda: _load_ids('students', 'student_id', 'enrollment_number')
+    )
+
+
+def subject_ids():
+    """Cached {'ids': set of subject_id, 'codes': subject_code -> subject_id}"""
+    return _reference_cache().get_or_load(
+        'subjects', lambda: _load_ids('subjects', 'subject_id', 'subject_code')
+    )
+
+
+def _resolve(row, id_column, code_column, reference):
+    """ID named by row[id_column] or row[code_column], or None if unknown"""
+    raw_id = (row.get(id_column) or '').strip()
+    if raw_id:
+        try:
+            value = int(raw_id)
+        except ValueError:
+            return None
+        return value if value in reference['ids'] else None
+    return reference['codes'].get((row.get(code_column) or '').strip())
+
+
+def _parse_attendance_row(row, students, subjects, marked_by):
+    """(record, None) for a valid CSV row, otherwise (None, reason)"""
+    student_id = _resolve(row, 'student_id', 'enrollment_number', students)
+    if student_id is None:
+        return None, 'unknown student'
+    subject_id = _resolve(row, 'subject_id', 'subject_code', subjects)
+    if subject_id is None:
+        return None, 'unknown subject'
+    try:
+        attendance_date = date.fromisoformat((row.get('attendance_date') or '').strip())
+    except ValueError:
+        return None, f"invalid attendance_date {row.get('attendance_date')!r}"
+    status = (row.get('status') or '').strip().capitalize()
+    if status not in STATUS_COLUMNS:
+        return None, f"invalid status {row.get('status')!r}"
+    remarks = (row.get('remarks') or '').strip() or None
+    return (student_id, subject_id, attendance_date.isoformat(), status, marked_by, remarks), None
+
+
+def _write_chunk(chunk, report):
+    """Upsert one chunk in its own transaction; on failure reject its rows"""
+    try:
+        report.rows_written += mark_attendance_batch(db.get_cursor(), [record for _, record in chunk])
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        for line, _ in chunk:
+            report.reject(line, f'database error: {exc}')
+    report.chunks += 1
+
+
+def import_attendance_csv(stream, marked_by=None, chunk_size=None, progress=None):
+    """Import attendance from a CSV text stream; returns an ImportReport
+
+    Required columns: student_id or enrollment_number, subject_id or
+    subject_code, attendance_date (YYYY-MM-DD) and status; remarks is
+    optional. progress, if given, is called with the report after each chunk.
+    """
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', 1000)
+    report = ImportReport()
+    reader = csv.DictReader(stream)
+    
+    columns = set(reader.fieldnames or ())
+    missing = [
+        name for name, options in (
+            ('student', {'student_id', 'enrollment_number'}),
+            ('subject', {'subject_id', 'subject_code'}),
+            ('attendance_date', {'attendance_date'}),
+            ('status', {'status'}),
+        ) if not columns & options
+    ]
+    if missing:
+        report.reject(1, f"missing column(s): {', '.join(missing)}")
+        return report.finish()
+    
+    students, subjects = student_ids(), subject_ids()
+    chunk = []
+    for row in reader:
+        report.rows_read += 1
+        record, reason = _parse_attendance_row(row, students, subjects, marked_by)
+        if record is None:
+            report.reject(reader.line_num, reason)
+            continue
+        chunk.append((reader.line_num, record))
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, report)
+            chunk = []
+            if progress:
+                progress(report)
+    if chunk:
+        _write_chunk(chunk, report)
+    return report.finish()
@@ -0,0 +1,83 @@
+"""Internship writes and history reads
+
+There is no maintained aggregate for internships, so credit totals are a
+single SUM over the student's idx_internships_student_start range rather
+than a sum over rows fetched into Python. Writes go through add_internship
+and set_internship_status, which bump the student's internships version;
+nothing here commits.
+"""
+
+from unihub.changes import bump_versions
+from unihub.pagination import seek_page
+
+INTERNSHIP_STATUSES = ('Ongoing', 'Completed', 'Verified')
+
+# Student-facing reads, shared with the async views in unihub.asgi
+INTERNSHIP_TOTALS_QUERY = """
+    SELECT COUNT(*) AS internships, SUM(credits_earned) AS total_credits
+    FROM internships
+    WHERE student_id = %s
+"""
+
+INTERNSHIP_HISTORY_SELECT = """
+    SELECT internship_id, company_name, position, start_date, end_date,
+           credits_earned, status
+    FROM internships
+"""
+
+INTERNSHIP_HISTORY_KEY = ['start_date', 'internship_id']
+
+
+def add_internship(cursor, student_id, company_name, position, start_date, end_date,
+                   duration_months, credits_earned=0, description=None, status='Ongoing'):
+    """Insert one internship; returns its internship_id"""
+    if status not in INTERNSHIP_STATUSES:
+        raise ValueError(f"Unknown internship status: {status!r}")
+    cursor.execute("""
+        INSERT INTO internships
+            (student_id, company_name, position, start_date, end_date, duration_months,
+             description, credits_earned, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, (student_id, company_name, position, start_date, end_date, duration_months,
+          description, credits_earned, status))
+    internship_id = cursor.lastrowid
+    bump_versions(cursor, [student_id], 'internships')
+    return internship_id
+
+
+def set_internship_status(cursor, internship_id, status, verified_by=None, credits_earned=None):
+    """Move an internship to a new status, optionally awarding credits
+
+    Returns True if the internship exists.
+    """
+    if status not in INTERNSHIP_STATUSES:
+        raise ValueError(f"Unknown internship status: {status!r}")
+    cursor.execute('SELECT student_id FROM internships WHERE internship_id = %s', (internship_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return False
+    cursor.execute("""
+        UPDATE internships
+        SET status = %s, verified_by = COALESCE(%s, verified_by),
+            credits_earned = COALESCE(%s, credits_earned)
+        WHERE internship_id = %s
+    """, (status, verified_by, credits_earned, internship_id))
+    bump_versions(cursor, [row['student_id']], 'internships')
+    return True
+
+
+def internship_totals(cursor, student_id):
+    """Number of internships and credits earned"""
+    cursor.execute(INTERNSHIP_TOTALS_QUERY, (student_id,))
+    return totals_from_row(cursor.fetchone())
+
+
+def totals_from_row(row):
+    """internship_totals' dict from its aggregate row"""
+    return {'internships': row['internships'], 'total_credits': int(row['total_credits'] or 0)}
+
+
+def internship_history(cursor, student_id, after=None, limit=20):
+    """One page of a student's internships, latest start first, and the next cursor"""
+    return seek_page(cursor, INTERNSHIP_HISTORY_SELECT, ['student_id = %s'], [student_id],
+                     INTERNSHIP_HISTORY_KEY, after, limit)
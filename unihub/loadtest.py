@@ -0,0 +1,232 @@
+"""HTTP load generation for the deployment benchmarks
+
+serve() starts a server command and waits until it accepts connections.
+run_load() replays a list of paths with a session cookie from
+login_cookie() over keep-alive connections, one per client thread, and
+reports throughput and latency percentiles. Any status other than 200
+counts as an error. run_sessions() instead plays whole student visits:
+sign in, then a weighted mix of pages, reported per route as well.
+"""
+
+import http.client
+import itertools
+import os
+import random
+import re
+import socket
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+
+class ServerFailed(Exception):
+    """Raised when a benchmarked server exits or never starts listening"""
+
+
+@contextmanager
+def serve(command, port, host='127.0.0.1', timeout=30.0, env=None):
+    """Run command (argv) until the block ends; it must listen on host:port
+
+    env, if given, is added to this process's environment for the server.
+    """
+    environment = dict(os.environ, **env) if env else None
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               env=environment)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise ServerFailed(f'{command[0]} exited with status {process.returncode}')
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise ServerFailed(f'Nothing listening on {host}:{port} after {timeout}s')
+                time.sleep(0.2)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of a process and its descendants; 0 without /proc"""
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as stream:
+                match = re.search(r'^VmRSS:\s+(\d+) kB', stream.read(), re.MULTILINE)
+            tasks = os.listdir(f'/proc/{current}/task')
+        except OSError:
+            continue
+        if match:
+            total += int(match.group(1)) * 1024
+        for task in tasks:
+            try:
+                with open(f'/proc/{current}/task/{task}/children') as stream:
+                    pending.extend(int(child) for child in stream.read().split())
+            except OSError:
+                pass
+    return total
+
+
+def _post_login(conn, enrollment_number, password):
+    """Sign in on conn; returns the response and its session cookie (None on failure)"""
+    conn.request('POST', '/login',
+                 urlencode({'enrollment_number': enrollment_number, 'password': password}),
+                 {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    cookie = response.headers.get('Set-Cookie')
+    if response.status != 302 or not cookie:
+        return response, None
+    return response, cookie.split(';', 1)[0]
+
+
+def login_cookie(host, port, enrollment_number, password):
+    """Cookie header value of a fresh student session"""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        response, cookie = _post_login(conn, enrollment_number, password)
+    finally:
+        conn.close()
+    if cookie is None:
+        raise ServerFailed(f'Login as {enrollment_number} failed with status {response.status}')
+    return cookie
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(latencies, errors, elapsed):
+    """requests, errors, seconds, rps and p50/p95/p99 latencies in ms"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_load(host, port, paths, cookie=None, requests=1000, concurrency=16):
+    """Issue requests GETs cycling through paths from concurrency client threads
+
+    Returns requests, errors, seconds, rps and p50/p95/p99 latencies in ms.
+    """
+    headers = {'Cookie': cookie} if cookie else {}
+    issued = itertools.count()
+    
+    def client(_):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        latencies, errors = [], 0
+        while True:
+            number = next(issued)
+            if number >= requests:
+                break
+            started = time.perf_counter()
+            try:
+                conn.request('GET', paths[number % len(paths)], headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+            latencies.append(time.perf_counter() - started)
+        conn.close()
+        return latencies, errors
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as clients:
+        results = list(clients.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    
+    return summarize([latency for own, _ in results for latency in own],
+                     sum(errors for _, errors in results), elapsed)
+
+
+def run_sessions(host, port, accounts, mix, requests=1000, concurrency=16,
+                 pages_per_session=(4, 12), seed=0):
+    """Issue requests from concurrency clients, each playing student visits
+
+    A visit signs in (POST /login) as a random one of accounts, a list of
+    (enrollment_number, password), then GETs pages_per_session pages drawn
+    from mix, a {path: weight} dict, on the same keep-alive connection.
+    Client i draws from random.Random(seed + i), so a run is repeatable.
+
+    Returns the run_load() figures plus 'routes', the same figures per path
+    ('/login' included). Where the server sends X-Query-Count, each also
+    has queries_per_request.
+    """
+    issued = itertools.count()
+    paths, weights = list(mix), list(mix.values())
+    
+    def client(number):
+        rng = random.Random(seed + number)
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        samples = []  # (path, seconds, ok, queries)
+        cookie, remaining = None, 0
+        while next(issued) < requests:
+            if cookie is None or remaining == 0:
+                path = '/login'
+            else:
+                path = rng.choices(paths, weights)[0]
+            started = time.perf_counter()
+            queries, ok = None, False
+            try:
+                if path == '/login':
+                    response, cookie = _post_login(conn, *rng.choice(accounts))
+                    ok = cookie is not None
+                    remaining = rng.randint(*pages_per_session)
+                else:
+                    conn.request('GET', path, headers={'Cookie': cookie})
+                    response = conn.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                    remaining -= 1
+                queries = response.headers.get('X-Query-Count')
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+            samples.append((path, time.perf_counter() - started, ok,
+                            int(queries) if queries is not None else None))
+        conn.close()
+        return samples
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as clients:
+        samples = [sample for own in clients.map(client, range(concurrency)) for sample in own]
+    elapsed = time.perf_counter() - started
+    
+    def figures(subset):
+        result = summarize([seconds for _, seconds, _, _ in subset],
+                           sum(1 for _, _, ok, _ in subset if not ok), elapsed)
+        counted = [queries for _, _, _, queries in subset if queries is not None]
+        if counted:
+            result['queries_per_request'] = sum(counted) / len(counted)
+        return result
+    
+    result = figures(samples)
+    result['routes'] = {
+        path: figures([sample for sample in samples if sample[0] == path])
+        for path in sorted({sample[0] for sample in samples})
+    }
+    return result
@@ -0,0 +1,154 @@
+"""Pooled SMTP delivery with bounded concurrency and retry
+
+A Mailer keeps up to MAIL_POOL_SIZE authenticated SMTP sessions open and
+sends many messages over each one, so a bulk run pays the connect, EHLO,
+STARTTLS and AUTH round trips once per connection rather than once per
+message. Transient failures (dropped connections, 4xx replies) are retried
+with exponential backoff on a fresh connection; 5xx replies fail at once.
+"""
+
+import queue
+import smtplib
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+
+
+class SMTPConnectionPool:
+    """Bounded pool of open SMTP sessions"""
+
+    def __init__(self, host, port, size=4, timeout=10.0, username=None, password=None,
+                 use_tls=False):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self.opened = 0
+
+    def _open(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.use_tls:
+            smtp.starttls()
+            smtp.ehlo()
+        if self.username:
+            smtp.login(self.username, self.password)
+        self.opened += 1
+        return smtp
+
+    @staticmethod
+    def _discard(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    @contextmanager
+    def connection(self):
+        """Check out a session; it is returned to the pool unless the block broke it
+
+        An SMTP error reply leaves the session usable (smtplib resets the
+        transaction), so only other exceptions drop the connection.
+        """
+        self._slots.acquire()
+        try:
+            try:
+                smtp = self._idle.get_nowait()
+            except queue.Empty:
+                smtp = self._open()
+            try:
+                yield smtp
+            except smtplib.SMTPResponseException:
+                self._idle.put(smtp)
+                raise
+            except smtplib.SMTPRecipientsRefused:
+                self._idle.put(smtp)
+                raise
+            except BaseException:
+                self._discard(smtp)
+                raise
+            self._idle.put(smtp)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def _permanent(exc):
+    """True for SMTP errors that retrying cannot fix"""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    code = getattr(exc, 'smtp_code', None)
+    return code is not None and code >= 500
+
+
+class Mailer:
+    """Sends EmailMessages over a connection pool, retrying transient failures"""
+
+    def __init__(self, pool, sender, max_attempts=3, backoff=0.5):
+        self.pool = pool
+        self.sender = sender
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def send(self, message):
+        """Deliver one message; returns (delivered, attempts, error or None)"""
+        if 'From' not in message:
+            message['From'] = self.sender
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with self.pool.connection() as smtp:
+                    smtp.send_message(message)
+                return True, attempt, None
+            except (smtplib.SMTPException, OSError, socket.timeout) as exc:
+                error = f'{type(exc).__name__}: {exc}'[:255]
+                if _permanent(exc):
+                    return False, attempt, error
+            if attempt < self.max_attempts:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+        return False, self.max_attempts, error
+
+    def close(self):
+        self.pool.close()
+
+
+def init_app(app):
+    """Defaults for the outbound mail settings"""
+    app.config.setdefault('MAIL_SERVER', 'localhost')
+    app.config.setdefault('MAIL_PORT', 25)
+    app.config.setdefault('MAIL_USERNAME', None)
+    app.config.setdefault('MAIL_PASSWORD', None)
+    app.config.setdefault('MAIL_USE_TLS', False)
+    app.config.setdefault('MAIL_SENDER', 'UniHub <noreply@unihub.local>')
+    app.config.setdefault('MAIL_POOL_SIZE', 4)
+    app.config.setdefault('MAIL_TIMEOUT', 10.0)
+    app.config.setdefault('MAIL_MAX_ATTEMPTS', 3)
+    app.config.setdefault('MAIL_RETRY_BACKOFF', 0.5)
+
+
+def create_mailer():
+    """A new Mailer (with its own pool) from the current app's config"""
+    config = current_app.config
+    pool = SMTPConnectionPool(
+        config['MAIL_SERVER'], config['MAIL_PORT'],
+        size=config['MAIL_POOL_SIZE'],
+        timeout=config['MAIL_TIMEOUT'],
+        username=config['MAIL_USERNAME'],
+        password=config['MAIL_PASSWORD'],
+        use_tls=config['MAIL_USE_TLS'],
+    )
+    return Mailer(pool, config['MAIL_SENDER'], config['MAIL_MAX_ATTEMPTS'],
+                  config['MAIL_RETRY_BACKOFF'])
@@ -0,0 +1,147 @@
+"""Bulk marks import with vectorized grade conversion
+
+A marks sheet covers one subject, so it is loaded whole into a DataFrame
+and validated, totalled and graded column-wise with NumPy instead of row
+by row. Valid rows are then written in a single transaction with
+multi-row upserts (IMPORT_CHUNK_SIZE rows per statement), and the GPA
+rollups are adjusted in the same transaction.
+"""
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+
+from unihub import db
+from unihub.grades import save_grades_batch
+from unihub.imports import ImportReport, student_ids
+
+# Percentage cut-offs (lower bound inclusive) and the grade each band earns
+GRADE_BOUNDARIES = np.array([50, 60, 70, 80, 90])
+GRADE_LETTERS = np.array(['F', 'C', 'B', 'B+', 'A', 'A+'])
+GRADE_POINTS = np.array([0.0, 6.0, 7.0, 8.0, 9.0, 10.0])
+
+
+def convert_marks(internal, external, max_internal, max_external):
+    """Vectorized (total_marks, grade, grade_points, status) arrays for marks arrays"""
+    total = np.round(np.asarray(internal, dtype=float) + np.asarray(external, dtype=float), 2)
+    percentage = total / (max_internal + max_external) * 100
+    band = np.searchsorted(GRADE_BOUNDARIES, percentage, side='right')
+    points = GRADE_POINTS[band]
+    status = np.where(points > 0, 'Pass', 'Fail')
+    return total, GRADE_LETTERS[band], points, status
+
+
+def _load_subject(cursor, subject_id=None, subject_code=None):
+    """Subject row with its semester and mark limits, or None"""
+    if subject_id is not None:
+        cursor.execute("""
+            SELECT subject_id, semester, max_marks_internal, max_marks_external
+            FROM subjects WHERE subject_id = %s
+        """, (subject_id,))
+    else:
+        cursor.execute("""
+            SELECT subject_id, semester, max_marks_internal, max_marks_external
+            FROM subjects WHERE subject_code = %s
+        """, (subject_code,))
+    return cursor.fetchone()
+
+
+def _reject_rows(report, frame, mask, reason):
+    """Reject every row selected by mask and return the remaining rows"""
+    for line in frame.index[mask]:
+        report.reject(int(line), reason)
+    return frame[~mask]
+
+
+def _student_column(frame, students):
+    """Series of student_id resolved from student_id or enrollment_number"""
+    if 'student_id' in frame:
+        ids = pd.to_numeric(frame['student_id'], errors='coerce')
+        known = ids.isin(list(students['ids']))
+        resolved = ids.where(known)
+    else:
+        resolved = pd.Series(np.nan, index=frame.index)
+    if 'enrollment_number' in frame:
+        codes = frame['enrollment_number'].fillna('').str.strip().map(students['codes'])
+        resolved = resolved.fillna(codes)
+    return resolved
+
+
+def import_marks_csv(stream, academic_year, subject_id=None, subject_code=None,
+                     chunk_size=None):
+    """Import one subject's marks from a CSV text stream; returns an ImportReport
+
+    Required columns: student_id or enrollment_number, internal_marks and
+    external_marks. Marks must lie between 0 and the subject's
+    max_marks_internal / max_marks_external.
+    """
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', 1000)
+    report = ImportReport()
+    cursor = db.get_cursor()
+    subject = _load_subject(cursor, subject_id, subject_code)
+    if subject is None:
+        report.reject(1, f'unknown subject {subject_code or subject_id!r}')
+        return report.finish()
+    
+    frame = pd.read_csv(stream, dtype=str, keep_default_na=False, skipinitialspace=True)
+    frame.columns = [column.strip() for column in frame.columns]
+    missing = [
+        name for name, options in (
+            ('student', {'student_id', 'enrollment_number'}),
+            ('internal_marks', {'internal_marks'}),
+            ('external_marks', {'external_marks'}),
+        ) if not set(frame.columns) & options
+    ]
+    if missing:
+        report.reject(1, f"missing column(s): {', '.join(missing)}")
+        return report.finish()
+    
+    # Index by CSV line number (header is line 1) so rejects point at the file
+    frame.index = frame.index + 2
+    report.rows_read = len(frame)
+    frame['student'] = _student_column(frame, student_ids())
+    frame = _reject_rows(report, frame, frame['student'].isna(), 'unknown student')
+    
+    limits = {
+        'internal_marks': float(subject['max_marks_internal']),
+        'external_marks': float(subject['max_marks_external']),
+    }
+    for column, limit in limits.items():
+        values = pd.to_numeric(frame[column], errors='coerce')
+        frame = _reject_rows(report, frame, values.isna(), f'invalid {column}')
+        values = values[frame.index]
+        frame = _reject_rows(report, frame, (values < 0) | (values > limit),
+                             f'{column} outside 0-{limit:g}')
+        frame[column] = values[frame.index]
+    
+    frame = _reject_rows(report, frame, frame['student'].duplicated(keep=False),
+                         'student appears more than once')
+    
+    total, grade, points, status = convert_marks(
+        frame['internal_marks'], frame['external_marks'],
+        limits['internal_marks'], limits['external_marks'],
+    )
+    records = {
+        int(student): (float(internal), float(external), float(total_marks),
+                       str(letter), float(grade_points), str(result))
+        for student, internal, external, total_marks, letter, grade_points, result in zip(
+            frame['student'], frame['internal_marks'], frame['external_marks'],
+            total, grade, points, status,
+        )
+    }
+    
+    students = list(records)
+    try:
+        for start in range(0, len(students), chunk_size):
+            report.rows_written += save_grades_batch(
+                cursor, subject['subject_id'], subject['semester'], academic_year,
+                {student: records[student] for student in students[start:start + chunk_size]},
+            )
+            report.chunks += 1
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        report.rows_written = 0
+        for line in frame.index:
+            report.reject(int(line), f'database error: {exc}')
+    return report.finish()
@@ -0,0 +1,443 @@
+"""Request and query instrumentation, exported on /metrics
+
+Every connection the pool opens is wrapped so that its cursors time each
+statement. Statements are grouped by fingerprint (the SQL with literals,
+placeholders and IN lists normalized), and each fingerprint gets a latency
+histogram and a count of the rows fetched. Statements slower than
+SLOW_QUERY_THRESHOLD seconds also go to the 'unihub.slow_queries' logger
+(and the SLOW_QUERY_LOG file, if set) with the request that ran them.
+
+RequestMetricsMiddleware times each request end to end, streamed bodies
+included, into a histogram per route (the URL rule, not the raw path) and
+counts the statements it ran. The ASGI deployment records its async views
+and queries into the same registry.
+
+/metrics renders it all in the Prometheus text format, with the connection
+pool and cache counters. It answers loopback clients, or, when
+METRICS_TOKEN is set, requests carrying it as a bearer token (set one
+behind a reverse proxy). Values are per process: under several gunicorn
+workers, each scrape reports the worker that answered it.
+"""
+
+import hmac
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import lru_cache
+
+from flask import Response, abort, current_app, request
+from werkzeug.wsgi import ClosingIterator
+
+from unihub import cache
+from unihub.profiler import Sampler
+
+slow_query_log = logging.getLogger('unihub.slow_queries')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+LOOPBACK = ('127.0.0.1', '::1')
+
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%(?:\(\w+\))?s|\?')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """sql with comments, literals, placeholders and list lengths normalized
+
+    Statements differing only in their values, or in how many values an IN
+    list or multi-row VALUES holds, share a fingerprint.
+    """
+    sql = _COMMENT.sub(' ', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    sql = _ROWS.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def family(name, kind, help_text, samples):
+    """Prometheus text lines for one metric; samples are (labels dict, value)"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    for labels, value in samples:
+        lines.append(f'{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}')
+    return lines
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._series = {}
+
+    def inc(self, values, amount=1):
+        self._series[values] = self._series.get(values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for values, total in sorted(self._series.items()):
+            lines.append(f'{self.name}{_labels(self.labels, values)} {_number(total)}')
+        return lines
+
+
+class Histogram:
+    """Bucketed observations per label set, rendered cumulatively"""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [count per bucket..., overflow, sum]
+
+    def observe(self, values, amount):
+        series = self._series.get(values)
+        if series is None:
+            series = self._series[values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, amount)] += 1
+        series[-1] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        names = self.labels + ('le',)
+        for values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(names, values + (_number(bound),))} '
+                             f'{cumulative}')
+            labels = _labels(self.labels, values)
+            lines.append(f'{self.name}_sum{labels} {_number(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class RequestRecord:
+    """What the request being served has done so far"""
+
+    def __init__(self, method, path, route=None):
+        self.method = method
+        self.path = path
+        self.route = route
+        self.status = None
+        self.queries = 0
+        self.started = time.perf_counter()
+
+
+# Set for the duration of each request in the thread or task serving it
+_current = ContextVar('unihub_request_record', default=None)
+
+
+def current_record():
+    """RequestRecord of the request being served here, if any"""
+    return _current.get()
+
+
+class Registry:
+    """The process's request and statement metrics"""
+
+    def __init__(self, slow_query_threshold=0.1):
+        self.slow_query_threshold = slow_query_threshold
+        self._lock = threading.Lock()
+        self.requests = Counter(
+            'unihub_http_requests_total', 'Requests served',
+            ('method', 'route', 'status'))
+        self.request_seconds = Histogram(
+            'unihub_http_request_duration_seconds', 'Time to serve a request, body included',
+            ('method', 'route'), LATENCY_BUCKETS)
+        self.request_queries = Histogram(
+            'unihub_http_request_queries', 'Statements run per request',
+            ('route',), QUERY_COUNT_BUCKETS)
+        self.query_seconds = Histogram(
+            'unihub_db_query_duration_seconds', 'Statement execution time by fingerprint',
+            ('fingerprint',), QUERY_BUCKETS)
+        self.query_rows = Counter(
+            'unihub_db_query_rows_total', 'Rows fetched by fingerprint',
+            ('fingerprint',))
+        self.slow_queries = Counter(
+            'unihub_db_slow_queries_total', 'Statements slower than the slow-query threshold',
+            ('fingerprint',))
+
+    def start_request(self, method, path, route=None):
+        """Begin a RequestRecord and make it current for this thread or task"""
+        record = RequestRecord(method, path, route)
+        _current.set(record)
+        return record
+
+    def finish_request(self, record, status):
+        elapsed = time.perf_counter() - record.started
+        route = record.route or 'unmatched'
+        if _current.get() is record:
+            _current.set(None)
+        with self._lock:
+            self.requests.inc((record.method, route, str(status)))
+            self.request_seconds.observe((record.method, route), elapsed)
+            self.request_queries.observe((route,), record.queries)
+
+    def observe_query(self, sql, seconds):
+        """Record one statement; returns its fingerprint for observe_rows()"""
+        statement = fingerprint(sql)
+        record = _current.get()
+        if record is not None:
+            record.queries += 1
+        with self._lock:
+            self.query_seconds.observe((statement,), seconds)
+            if seconds >= self.slow_query_threshold:
+                self.slow_queries.inc((statement,))
+        if seconds >= self.slow_query_threshold:
+            where = f'{record.method} {record.path}' if record else 'no request'
+            slow_query_log.warning('%.1f ms (%s): %s', seconds * 1000, where, statement)
+        return statement
+
+    def observe_rows(self, statement, count):
+        if count:
+            with self._lock:
+                self.query_rows.inc((statement,), count)
+
+    def instrument(self, connect):
+        """Wrap a connection factory so its connections' cursors are timed"""
+        def instrumented_connect():
+            return InstrumentedConnection(connect(), self)
+        
+        return instrumented_connect
+
+    def render(self):
+        with self._lock:
+            metrics = (self.requests, self.request_seconds, self.request_queries,
+                       self.query_seconds, self.query_rows, self.slow_queries)
+            return [line for metric in metrics for line in metric.render()]
+
+
+class InstrumentedCursor:
+    """DB-API cursor proxy timing each statement and counting fetched rows"""
+
+    def __init__(self, cursor, registry):
+        self._cursor = cursor
+        self._registry = registry
+        self._statement = None
+
+    def _timed(self, method, sql, args):
+        started = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            self._statement = self._registry.observe_query(sql, time.perf_counter() - started)
+
+    def execute(self, sql, *args):
+        return self._timed(self._cursor.execute, sql, args)
+
+    def executemany(self, sql, *args):
+        return self._timed(self._cursor.executemany, sql, args)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._registry.observe_rows(self._statement, 1)
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._registry.observe_rows(self._statement, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._registry.observe_rows(self._statement, len(rows))
+        return rows
+
+    def __iter__(self):
+        count = 0
+        try:
+            for row in self._cursor:
+                count += 1
+                yield row
+        finally:
+            self._registry.observe_rows(self._statement, count)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are InstrumentedCursors"""
+
+    def __init__(self, conn, registry):
+        self._conn = conn
+        self._registry = registry
+
+    def cursor(self, *args):
+        return InstrumentedCursor(self._conn.cursor(*args), self._registry)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def authorized(environ, token):
+    """Whether a request may read metrics or ask for a profile"""
+    if token:
+        supplied = environ.get('HTTP_AUTHORIZATION', '')
+        return hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
+    return environ.get('REMOTE_ADDR') in LOOPBACK
+
+
+class RequestMetricsMiddleware:
+    """Records each request into the registry, optionally under the profiler
+
+    With profile_dir set, an authorized request sent with 'X-Profile: 1' is
+    sampled every profile_interval seconds; the folded stacks are written
+    to profile_dir and the file name returned in the X-Profile header.
+    With query_header, responses carry X-Query-Count, the statements run
+    before the response started (all of them, unless the body streams).
+    """
+
+    def __init__(self, app, registry, token=None, profile_dir=None, profile_interval=0.005,
+                 query_header=False):
+        self.app = app
+        self.registry = registry
+        self.token = token
+        self.query_header = query_header
+        self.profile_dir = profile_dir
+        self.profile_interval = profile_interval
+        self._profiles = itertools.count(1)
+
+    def _wants_profile(self, environ):
+        return (self.profile_dir is not None and environ.get('HTTP_X_PROFILE') == '1'
+                and authorized(environ, self.token))
+
+    def __call__(self, environ, start_response):
+        record = self.registry.start_request(environ.get('REQUEST_METHOD', 'GET'),
+                                            environ.get('PATH_INFO', '/'))
+        sampler, profile = None, []
+        if self._wants_profile(environ):
+            sampler = Sampler(threading.get_ident(), self.profile_interval).start()
+        
+        def _start_response(status, headers, exc_info=None):
+            record.status = status.split(' ', 1)[0]
+            if self.query_header:
+                headers.append(('X-Query-Count', str(record.queries)))
+            if sampler is not None:
+                route = re.sub(r'[^A-Za-z0-9]+', '_', record.route or 'unmatched').strip('_')
+                name = (f"{time.strftime('%Y%m%d-%H%M%S')}-{route or 'index'}-"
+                        f'{os.getpid()}-{next(self._profiles)}.folded')
+                profile.append(name)
+                headers.append(('X-Profile', name))
+            return start_response(status, headers, exc_info)
+        
+        def finish():
+            self.registry.finish_request(record, record.status or 500)
+            if sampler is not None:
+                sampler.stop()
+                if profile:
+                    os.makedirs(self.profile_dir, exist_ok=True)
+                    sampler.write(os.path.join(self.profile_dir, profile[0]))
+        
+        try:
+            body = self.app(environ, _start_response)
+        except BaseException:
+            finish()
+            raise
+        return ClosingIterator(body, finish)
+
+
+def _note_route():
+    record = _current.get()
+    if record is not None and request.url_rule is not None:
+        record.route = request.url_rule.rule
+
+
+def get_registry():
+    """The current application's metrics registry"""
+    return current_app.extensions['metrics']
+
+
+def scrape_lines():
+    """Pool and cache counters, read at scrape time"""
+    pool = current_app.extensions['db_pool'].stats()
+    caches = cache.cache_stats()
+    lines = family('unihub_db_pool_connections', 'gauge', 'Pooled connections by state',
+                   [({'state': 'in_use'}, pool['in_use']), ({'state': 'idle'}, pool['idle'])])
+    for counter in ('checkouts', 'waits', 'timeouts'):
+        lines += family(f'unihub_db_pool_{counter}_total', 'counter', f'Pool {counter}',
+                        [({}, pool[counter])])
+    for counter in ('hits', 'misses'):
+        lines += family(f'unihub_cache_{counter}_total', 'counter', f'Local cache {counter}',
+                        [({'cache': name}, stats[counter]) for name, stats in sorted(caches.items())])
+    lines += family('unihub_cache_entries', 'gauge', 'Entries held in each local cache',
+                    [({'cache': name}, stats['size']) for name, stats in sorted(caches.items())])
+    return lines
+
+
+def metrics_view():
+    """Prometheus text exposition of this process's metrics"""
+    if not authorized(request.environ, current_app.config['METRICS_TOKEN']):
+        abort(404)
+    lines = get_registry().render() + scrape_lines()
+    return Response('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_app(app):
+    """Create the registry, hook requests and register /metrics
+
+    Must run before db.init_app so that the pool's connections are wrapped.
+    """
+    app.config.setdefault('METRICS_ENABLED', True)
+    app.config.setdefault('METRICS_TOKEN', None)
+    app.config.setdefault('METRICS_QUERY_HEADER', False)
+    app.config.setdefault('SLOW_QUERY_THRESHOLD', 0.1)
+    app.config.setdefault('SLOW_QUERY_LOG', None)
+    app.config.setdefault('PROFILER_ENABLED', False)
+    app.config.setdefault('PROFILER_DIR', 'profiles')
+    app.config.setdefault('PROFILER_INTERVAL', 0.005)
+    
+    config = app.config
+    if not config['METRICS_ENABLED']:
+        return
+    registry = Registry(config['SLOW_QUERY_THRESHOLD'])
+    app.extensions['metrics'] = registry
+    if config['SLOW_QUERY_LOG']:
+        handler = logging.FileHandler(config['SLOW_QUERY_LOG'])
+        handler.setFormatter(logging.Formatter('%(asctime)s %(process)d %(message)s'))
+        slow_query_log.addHandler(handler)
+        slow_query_log.setLevel(logging.WARNING)
+    
+    app.before_request(_note_route)
+    app.wsgi_app = RequestMetricsMiddleware(
+        app.wsgi_app, registry,
+        token=config['METRICS_TOKEN'],
+        profile_dir=config['PROFILER_DIR'] if config['PROFILER_ENABLED'] else None,
+        profile_interval=config['PROFILER_INTERVAL'],
+        query_header=config['METRICS_QUERY_HEADER'],
+    )
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,140 @@
+"""Admin notifications and the versioned, cached feed shown on dashboards
+
+Every write bumps the 'notifications' row of cache_versions in the same
+transaction. Feeds are cached per (audience, version), so readers never
+query admin_notifications until an admin changes something. Each worker
+re-reads the version at most every NOTIFICATIONS_VERSION_TTL seconds, and
+its own writes are visible immediately after commit.
+"""
+
+import threading
+import time
+
+from flask import current_app, render_template
+from markupsafe import Markup
+
+from unihub import cache, db
+
+VERSION_KEY = 'notifications'
+
+AUDIENCES = {
+    'Students': ('All', 'Students'),
+    'Faculty': ('All', 'Faculty'),
+}
+
+FEED_COLUMNS = ('title', 'content', 'type', 'target_audience', 'attachment_path', 'is_active')
+
+VERSION_QUERY = 'SELECT version FROM cache_versions WHERE name = %s'
+
+FEED_QUERY = """
+    SELECT title, content, created_at
+    FROM admin_notifications
+    WHERE is_active = TRUE AND target_audience IN (%s, %s)
+    ORDER BY created_at DESC LIMIT %s
+"""
+
+_version_lock = threading.Lock()
+
+
+def _version_state():
+    return current_app.extensions.setdefault(
+        'notifications_version', {'version': None, 'checked_at': 0.0}
+    )
+
+
+def _read_version(cursor):
+    cursor.execute(VERSION_QUERY, (VERSION_KEY,))
+    row = cursor.fetchone()
+    return row['version'] if row else 0
+
+
+def current_version():
+    """Latest notifications version, re-read at most every NOTIFICATIONS_VERSION_TTL seconds"""
+    state = _version_state()
+    ttl = current_app.config.get('NOTIFICATIONS_VERSION_TTL', 1.0)
+    now = time.monotonic()
+    if state['version'] is None or now - state['checked_at'] > ttl:
+        version = _read_version(db.get_cursor())
+        with _version_lock:
+            state['version'] = version
+            state['checked_at'] = now
+    return state['version']
+
+
+def _bump_version(cursor):
+    """Increment the notifications version inside the caller's transaction"""
+    cursor.execute("""
+        INSERT INTO cache_versions (name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, (VERSION_KEY,))
+    # Force this worker to pick up the new version as soon as the write commits
+    db.on_commit(lambda: _version_state().update(version=None))
+
+
+def feed_entry(items):
+    """Cache entry for a feed: its rows and the rendered fragment"""
+    html = render_template('_notifications.html', notifications=items)
+    return {'items': items, 'html': str(html)}
+
+
+def _load_feed(audience, limit):
+    cursor = db.get_cursor()
+    cursor.execute(FEED_QUERY, AUDIENCES[audience] + (limit,))
+    return feed_entry(cursor.fetchall())
+
+
+def feed_cache():
+    """The 'notifications_feed' cache, keyed by (audience, limit, version)"""
+    return cache.get_cache(
+        'notifications_feed',
+        maxsize=64,
+        ttl=current_app.config.get('NOTIFICATIONS_FEED_TTL', 3600),
+    )
+
+
+def get_feed(audience='Students', limit=5, version=None):
+    """Latest active notifications for an audience: {'items': rows, 'html': Markup}
+
+    version defaults to current_version(); callers that already read the
+    version (API ETags) pass it so the feed is never older than it.
+    """
+    if audience not in AUDIENCES:
+        raise ValueError(f'Unknown notification audience: {audience!r}')
+    key = (audience, limit, current_version() if version is None else version)
+    feed = feed_cache().get_or_load(key, lambda: _load_feed(audience, limit))
+    return {'items': feed['items'], 'html': Markup(feed['html'])}
+
+
+def post_notification(cursor, title, content, type, created_by,
+                      target_audience='All', attachment_path=None):
+    """Publish a notification; returns its notification_id"""
+    cursor.execute("""
+        INSERT INTO admin_notifications
+            (title, content, type, target_audience, attachment_path, created_by)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (title, content, type, target_audience, attachment_path, created_by))
+    notification_id = cursor.lastrowid
+    _bump_version(cursor)
+    return notification_id
+
+
+def update_notification(cursor, notification_id, **fields):
+    """Edit columns of a notification"""
+    unknown = set(fields) - set(FEED_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown notification columns: {', '.join(sorted(unknown))}")
+    if not fields:
+        return 0
+    
+    assignments = ', '.join(f'{column} = %s' for column in fields)
+    cursor.execute(
+        f'UPDATE admin_notifications SET {assignments} WHERE notification_id = %s',
+        tuple(fields.values()) + (notification_id,),
+    )
+    _bump_version(cursor)
+    return cursor.rowcount
+
+
+def deactivate_notification(cursor, notification_id):
+    """Hide a notification from every feed"""
+    return update_notification(cursor, notification_id, is_active=False)
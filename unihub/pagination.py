@@ -0,0 +1,92 @@
+"""Keyset (seek) pagination over indexed sort keys
+
+A page continues from the last row of the previous one with
+WHERE key < last_key instead of OFFSET, so every page is one index seek
+however deep the reader goes, and rows written in between never shift,
+repeat or skip entries. Sort keys end in the primary key, which makes them
+unique and the cursors stable. Cursors are opaque URL-safe tokens holding
+the last row's key values.
+"""
+
+import base64
+import json
+from datetime import date
+
+
+def encode_cursor(values):
+    """Opaque token for a row's sort key values"""
+    values = [value.isoformat() if isinstance(value, date) else value for value in values]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, count):
+    """Sort key values from a token; ValueError if it is not a cursor of count keys"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise ValueError('Malformed page cursor') from None
+    if not isinstance(values, list) or len(values) != count:
+        raise ValueError('Malformed page cursor')
+    if not all(isinstance(value, (str, int)) for value in values):
+        raise ValueError('Malformed page cursor')
+    return values
+
+
+def _seek_clause(columns, descending):
+    """(a < %s OR (a = %s AND b < %s)), the expanded row comparison
+
+    Spelled out rather than as (a, b) < (%s, %s) so MySQL turns it into a
+    range scan on the index whatever the server version.
+    """
+    operator = '<' if descending else '>'
+    terms = []
+    for position, column in enumerate(columns):
+        equal = [f'{previous} = %s' for previous in columns[:position]]
+        terms.append('(' + ' AND '.join(equal + [f'{column} {operator} %s']) + ')')
+    return '(' + ' OR '.join(terms) + ')'
+
+
+def seek_query(select, conditions, params, order_by, after=None, limit=20, descending=True):
+    """(sql, params) fetching one page plus one row; see seek_page
+
+    Raises ValueError for a malformed cursor.
+    """
+    conditions, params = list(conditions), list(params)
+    if after:
+        values = decode_cursor(after, len(order_by))
+        conditions.append(_seek_clause(order_by, descending))
+        for position in range(len(order_by)):
+            params.extend(values[:position + 1])
+    direction = ' DESC' if descending else ''
+    sql = f"""
+        {select}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {', '.join(column + direction for column in order_by)}
+        LIMIT %s
+    """
+    return sql, tuple(params) + (limit + 1,)
+
+
+def seek_result(rows, order_by, limit=20):
+    """Trim the rows of a seek_query to a page and build the next page's cursor"""
+    # The extra row only says whether another page exists
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([last[column.rsplit('.', 1)[-1]] for column in order_by])
+
+
+def seek_page(cursor, select, conditions, params, order_by, after=None, limit=20,
+              descending=True):
+    """One page of rows and the cursor of the next page (None on the last page)
+
+    select is the SELECT ... FROM ... part, conditions a list of WHERE terms
+    matching params, and order_by the sort key columns ending in the primary
+    key. Each key column must be selected under its unqualified name.
+    """
+    sql, params = seek_query(select, conditions, params, order_by, after, limit, descending)
+    cursor.execute(sql, params)
+    return seek_result(cursor.fetchall(), order_by, limit)
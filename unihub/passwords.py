@@ -0,0 +1,205 @@
+"""Password hashing and verification on a bounded worker pool
+
+Passwords are stored with werkzeug's slow KDF (scrypt by default). Checking
+one costs tens of milliseconds of CPU, so verification runs on a thread or
+process pool. At most PASSWORD_QUEUE_DEPTH verifications may be queued or
+running at once; beyond that, callers wait up to PASSWORD_QUEUE_TIMEOUT
+seconds and then get PasswordServiceBusy instead of piling up behind the
+pool. Legacy unsalted SHA-256 hashes still verify, and the caller gets a
+KDF hash back to store in their place. Sign-ins for accounts that do not
+exist are checked against a dummy hash, so they take as long as a wrong
+password and response times do not reveal which accounts exist.
+"""
+
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+_LEGACY_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+class PasswordServiceBusy(Exception):
+    """Raised when the verification queue is full (back-pressure)"""
+
+
+def hash_password(password, method='scrypt'):
+    """Salted KDF hash for storing a new password"""
+    return generate_password_hash(password, method=method)
+
+
+@lru_cache(maxsize=4)
+def dummy_hash(method):
+    """Hash of a random password, checked in place of a missing account's"""
+    return generate_password_hash(secrets.token_urlsafe(16), method=method)
+
+
+def is_legacy_hash(stored_hash):
+    """True for the original unsalted SHA-256 hex digests"""
+    return bool(_LEGACY_SHA256.match(stored_hash or ''))
+
+
+def _verify_job(password, stored_hash, method):
+    """Worker-side check; returns (ok, replacement_hash_or_None, hash_seconds)"""
+    started = time.perf_counter()
+    if is_legacy_hash(stored_hash):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        ok = hmac.compare_digest(legacy, stored_hash)
+        upgraded = generate_password_hash(password, method=method) if ok else None
+    else:
+        ok = check_password_hash(stored_hash, password)
+        upgraded = None
+    return ok, upgraded, time.perf_counter() - started
+
+
+class LatencyRecorder:
+    """Sliding window of durations with percentile summaries"""
+
+    def __init__(self, window=4096):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def percentiles(self, points=(50, 95, 99)):
+        """Nearest-rank percentiles in milliseconds over the current window"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {f'p{point}': None for point in points}
+        return {
+            f'p{point}': round(samples[min(len(samples) - 1, int(len(samples) * point / 100))] * 1000, 2)
+            for point in points
+        }
+
+
+class PasswordService:
+    """Runs password verification on a bounded executor with a queue limit"""
+
+    def __init__(self, workers=None, queue_depth=None, queue_timeout=0.5,
+                 kind='thread', method='scrypt'):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_depth = queue_depth or self.workers * 4
+        self.queue_timeout = queue_timeout
+        self.kind = kind
+        self.method = method
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+        self.upgraded = 0
+        self.latency = LatencyRecorder()
+        self.hash_time = LatencyRecorder()
+
+    def _get_executor(self):
+        # Created lazily so a preloading server can fork before any pool exists
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.kind == 'process':
+                        self._executor = ProcessPoolExecutor(self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            self.workers, thread_name_prefix='password-kdf'
+                        )
+        return self._executor
+
+    def verify(self, password, stored_hash):
+        """Check a password; returns (ok, replacement_hash_or_None)
+
+        Raises PasswordServiceBusy if no queue slot frees up within
+        queue_timeout seconds.
+        """
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._counter_lock:
+                self.rejected += 1
+            raise PasswordServiceBusy(
+                f'{self.queue_depth} password verifications already queued'
+            )
+        with self._counter_lock:
+            self._in_flight += 1
+        try:
+            future = self._get_executor().submit(_verify_job, password, stored_hash, self.method)
+            ok, upgraded, hash_seconds = future.result()
+        finally:
+            with self._counter_lock:
+                self._in_flight -= 1
+            self._slots.release()
+        
+        self.hash_time.record(hash_seconds)
+        self.latency.record(time.perf_counter() - started)
+        if upgraded:
+            with self._counter_lock:
+                self.upgraded += 1
+        return ok, upgraded
+
+    def stats(self):
+        """Pool sizing figures: queue usage, rejections and latency percentiles"""
+        return {
+            'kind': self.kind,
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'in_flight': self._in_flight,
+            'verifications': self.latency.count,
+            'rejected': self.rejected,
+            'upgraded': self.upgraded,
+            'latency_ms': self.latency.percentiles(),
+            'hash_ms': self.hash_time.percentiles(),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def init_app(app):
+    """Create the application's password service from app.config"""
+    app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config.setdefault('PASSWORD_POOL_KIND', 'thread')  # or 'process'
+    app.config.setdefault('PASSWORD_POOL_WORKERS', None)  # defaults to the CPU count
+    app.config.setdefault('PASSWORD_QUEUE_DEPTH', None)  # defaults to 4x workers
+    app.config.setdefault('PASSWORD_QUEUE_TIMEOUT', 0.5)
+    
+    config = app.config
+    app.extensions['password_service'] = PasswordService(
+        workers=config['PASSWORD_POOL_WORKERS'],
+        queue_depth=config['PASSWORD_QUEUE_DEPTH'],
+        queue_timeout=config['PASSWORD_QUEUE_TIMEOUT'],
+        kind=config['PASSWORD_POOL_KIND'],
+        method=config['PASSWORD_HASH_METHOD'],
+    )
+
+
+def get_service():
+    """The current application's password service"""
+    return current_app.extensions['password_service']
+
+
+def verify_password(password, stored_hash):
+    """Verify on the application's pool; returns (ok, replacement_hash_or_None)
+
+    A stored_hash of None (no such account) costs a full check against
+    dummy_hash and always fails.
+    """
+    service = get_service()
+    if stored_hash is None:
+        service.verify(password, dummy_hash(service.method))
+        return False, None
+    return service.verify(password, stored_hash)
@@ -0,0 +1,146 @@
+"""Cached student profiles: identity, course, semester and status
+
+Profiles change a couple of times a year, so routes read them from the
+'student_profile' cache rather than joining students and courses on every
+request. update_student() is the write path; it bumps the 'profiles' row of
+cache_versions in the same transaction. Entries are cached per
+(student_id, version), and like the notifications feed each worker re-reads
+the version at most every PROFILE_VERSION_TTL seconds, so a write in one
+worker reaches the others that quickly without a shared cache tier.
+"""
+
+import threading
+import time
+
+from flask import current_app
+
+from unihub import cache, db
+from unihub.changes import bump_versions
+from unihub.notifications import VERSION_QUERY
+
+VERSION_KEY = 'profiles'
+
+STUDENT_COLUMNS = (
+    'user_id', 'enrollment_number', 'first_name', 'last_name', 'profile_photo',
+    'date_of_birth', 'gender', 'phone', 'address', 'course_id', 'semester',
+    'admission_date', 'status',
+)
+
+
+PROFILE_SELECT = """
+    SELECT s.student_id, s.user_id, s.enrollment_number, s.first_name, s.last_name,
+           s.course_id, s.semester, s.status, c.course_name, c.course_code
+    FROM students s
+    JOIN courses c ON s.course_id = c.course_id
+"""
+
+PROFILE_QUERY = PROFILE_SELECT + 'WHERE s.student_id = %s'
+
+_version_lock = threading.Lock()
+
+
+def _version_state():
+    return current_app.extensions.setdefault(
+        'profiles_version', {'version': None, 'checked_at': 0.0}
+    )
+
+
+def current_version():
+    """Latest profiles version, re-read at most every PROFILE_VERSION_TTL seconds"""
+    state = _version_state()
+    ttl = current_app.config.get('PROFILE_VERSION_TTL', 1.0)
+    now = time.monotonic()
+    if state['version'] is None or now - state['checked_at'] > ttl:
+        cursor = db.get_cursor()
+        cursor.execute(VERSION_QUERY, (VERSION_KEY,))
+        row = cursor.fetchone()
+        with _version_lock:
+            state['version'] = row['version'] if row else 0
+            state['checked_at'] = now
+    return state['version']
+
+
+def profile_cache():
+    """The 'student_profile' cache, keyed by (student_id, version)"""
+    config = current_app.config
+    return cache.get_cache(
+        'student_profile',
+        maxsize=config.get('PROFILE_CACHE_SIZE', 10000),
+        ttl=config.get('PROFILE_CACHE_TTL', 3600),
+    )
+
+
+def load_profile(cursor, student_id):
+    """Read one profile from the database"""
+    cursor.execute(PROFILE_QUERY, (student_id,))
+    return with_display_name(cursor.fetchone())
+
+
+def with_display_name(profile):
+    """Add the 'name' key to a PROFILE_QUERY row (None passes through)"""
+    if profile is not None:
+        profile['name'] = f"{profile['first_name']} {profile['last_name']}"
+    return profile
+
+
+def get_profile(student_id, version=None):
+    """Cached profile for a student, or None if the student does not exist
+
+    version defaults to current_version(); unihub.api passes the one its
+    ETag was computed from.
+    """
+    if version is None:
+        version = current_version()
+    return profile_cache().get_or_load(
+        (student_id, version), lambda: load_profile(db.get_cursor(), student_id)
+    )
+
+
+def warm_profiles(cursor, limit):
+    """Load up to limit active students' profiles into this process's cache
+
+    One query instead of one per first visit. Only the local tier is
+    filled; a shared tier stays warm across deploys by itself. Returns the
+    number of profiles loaded.
+    """
+    # The version is read first, so no row is older than the key it is stored under
+    version = current_version()
+    cursor.execute(PROFILE_SELECT + """
+        WHERE s.status = 'Active'
+        ORDER BY s.student_id
+        LIMIT %s
+    """, (limit,))
+    rows = cursor.fetchall()
+    local = profile_cache().local
+    for row in rows:
+        local.set((row['student_id'], version), with_display_name(row))
+    return len(rows)
+
+
+def _bump_version(cursor):
+    """Increment the profiles version inside the caller's transaction"""
+    cursor.execute("""
+        INSERT INTO cache_versions (name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, (VERSION_KEY,))
+    # This worker reads the new version as soon as the write commits
+    db.on_commit(lambda: _version_state().update(version=None))
+
+
+def update_student(cursor, student_id, **fields):
+    """Update columns of a students row and bump the profiles version"""
+    unknown = set(fields) - set(STUDENT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown student columns: {', '.join(sorted(unknown))}")
+    if not fields:
+        return 0
+    
+    assignments = ', '.join(f'{column} = %s' for column in fields)
+    cursor.execute(
+        f'UPDATE students SET {assignments} WHERE student_id = %s',
+        tuple(fields.values()) + (student_id,),
+    )
+    updated = cursor.rowcount
+    bump_versions(cursor, [student_id], 'profile')
+    _bump_version(cursor)
+    return updated
@@ -0,0 +1,265 @@
+"""Nightly at-risk scoring of active students
+
+Features come from the maintained aggregates in a handful of set-based
+queries per course (attendance_summary, semester_gpa and fee_ledger) and
+are scored column-wise with pandas. Courses are scored in parallel on a
+process pool, each worker with its own connection; the parent writes
+every score with multi-row upserts in one transaction and records the run.
+
+An incremental run re-scores only the students flagged in student_changes
+(see unihub.changes) by attendance, grade and fee payment writes.
+The risk_scores and risk_score_runs DDL lives in unihub.schema.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+
+from unihub import db
+
+ATTENDANCE_THRESHOLD = 75.0  # percent below which attendance adds risk
+GPA_THRESHOLD = 6.0  # latest GPA below which grades add risk
+MAX_DECLINE = 2.0  # GPA points lost per semester that counts as full trend risk
+WEIGHTS = {'attendance': 40, 'gpa': 30, 'trend': 15, 'arrears': 15}
+LEVELS = ((50, 'High'), (25, 'Medium'))
+
+
+def _in_clause(column, student_ids):
+    """(' AND column IN (...)', params) restricting a query to student_ids"""
+    if student_ids is None:
+        return '', ()
+    return f" AND {column} IN ({', '.join(['%s'] * len(student_ids))})", tuple(student_ids)
+
+
+def _frame(cursor, sql, params, columns):
+    cursor.execute(sql, params)
+    return pd.DataFrame.from_records(
+        [tuple(row[column] for column in columns) for row in cursor.fetchall()],
+        columns=columns,
+    )
+
+
+def extract_features(cursor, course_id, student_ids=None):
+    """One row per active student of a course with the scoring features"""
+    extra, ids = _in_clause('st.student_id', student_ids)
+    students = _frame(cursor, f"""
+        SELECT st.student_id, st.semester FROM students st
+        WHERE st.course_id = %s AND st.status = 'Active'{extra}
+    """, (course_id,) + ids, ['student_id', 'semester'])
+    if students.empty:
+        return students
+    
+    attendance = _frame(cursor, f"""
+        SELECT a.student_id, SUM(a.present_count) AS present,
+               SUM(a.present_count + a.absent_count + a.late_count) AS total
+        FROM attendance_summary a
+        JOIN students st ON a.student_id = st.student_id
+        WHERE st.course_id = %s{extra}
+        GROUP BY a.student_id
+    """, (course_id,) + ids, ['student_id', 'present', 'total'])
+    gpas = _frame(cursor, f"""
+        SELECT g.student_id, g.semester, g.gpa
+        FROM semester_gpa g
+        JOIN students st ON g.student_id = st.student_id
+        WHERE st.course_id = %s AND g.credits > 0{extra}
+    """, (course_id,) + ids, ['student_id', 'semester', 'gpa'])
+    fees = _frame(cursor, f"""
+        SELECT l.student_id, SUM(l.total_fee) AS due,
+               SUM(CASE WHEN l.balance > 0 THEN l.balance ELSE 0 END) AS arrears
+        FROM fee_ledger l
+        JOIN students st ON l.student_id = st.student_id
+        WHERE st.course_id = %s{extra}
+        GROUP BY l.student_id
+    """, (course_id,) + ids, ['student_id', 'due', 'arrears'])
+    
+    features = students.set_index('student_id')
+    attendance = attendance.set_index('student_id').astype(float)
+    total = attendance['total'].where(attendance['total'] > 0)
+    features['attendance_pct'] = (attendance['present'] / total * 100).reindex(features.index)
+    
+    # Least-squares slope of GPA over semester, from per-student sums
+    gpas = gpas.astype({'semester': float, 'gpa': float})
+    gpas = gpas.assign(xy=gpas['semester'] * gpas['gpa'], xx=gpas['semester'] ** 2)
+    sums = gpas.groupby('student_id').agg(
+        n=('gpa', 'size'), x=('semester', 'sum'), y=('gpa', 'sum'),
+        xy=('xy', 'sum'), xx=('xx', 'sum'),
+    )
+    denominator = sums['n'] * sums['xx'] - sums['x'] ** 2
+    slope = (sums['n'] * sums['xy'] - sums['x'] * sums['y']) / denominator.where(denominator > 0)
+    features['gpa_trend'] = slope.reindex(features.index).fillna(0.0)
+    latest = gpas.sort_values('semester').groupby('student_id')['gpa'].last()
+    features['latest_gpa'] = latest.reindex(features.index)
+    
+    fees = fees.set_index('student_id').astype(float).reindex(features.index).fillna(0.0)
+    features['due'] = fees['due']
+    features['arrears'] = fees['arrears']
+    features['course_id'] = course_id
+    return features.reset_index()
+
+
+def score_features(features):
+    """Add score (0-100) and risk_level columns to a features frame"""
+    # Each component is 0 (no risk) to 1; missing data contributes nothing
+    attendance = (1 - features['attendance_pct'] / ATTENDANCE_THRESHOLD).clip(0, 1).fillna(0.0)
+    gpa = (1 - features['latest_gpa'] / GPA_THRESHOLD).clip(0, 1).fillna(0.0)
+    trend = (-features['gpa_trend'] / MAX_DECLINE).clip(0, 1)
+    due = features['due'].where(features['due'] > 0)
+    arrears = (features['arrears'] / due).clip(0, 1).fillna(0.0)
+    
+    score = (WEIGHTS['attendance'] * attendance + WEIGHTS['gpa'] * gpa
+             + WEIGHTS['trend'] * trend + WEIGHTS['arrears'] * arrears).round(2)
+    levels = np.select([score >= threshold for threshold, _ in LEVELS],
+                       [level for _, level in LEVELS], default='Low')
+    return features.assign(score=score, risk_level=levels)
+
+
+def _score_partition(backend, course_id, student_ids):
+    """Worker entry point: features and scores for one course, as plain tuples"""
+    conn = backend.connect()
+    try:
+        scored = score_features(extract_features(conn.cursor(), course_id, student_ids))
+    finally:
+        conn.close()
+    if scored.empty:
+        return []
+
+    def nullable(value):
+        return None if pd.isna(value) else round(float(value), 2)
+        
+    return [
+        (int(row.student_id), int(row.course_id), nullable(row.attendance_pct),
+         nullable(row.latest_gpa), round(float(row.gpa_trend), 2), round(float(row.arrears), 2),
+         float(row.score), row.risk_level)
+        for row in scored.itertuples(index=False)
+    ]
+
+
+def _partitions(cursor, full):
+    """{course_id: student_ids or None} to score; None means the whole course"""
+    if full:
+        cursor.execute("SELECT DISTINCT course_id FROM students WHERE status = 'Active'")
+        return {row['course_id']: None for row in cursor.fetchall()}
+    
+    cursor.execute("""
+        SELECT st.student_id, st.course_id
+        FROM student_changes c
+        JOIN students st ON c.student_id = st.student_id
+    """)
+    partitions = {}
+    for row in cursor.fetchall():
+        partitions.setdefault(row['course_id'], []).append(row['student_id'])
+    return partitions
+
+
+def _write_scores(cursor, run_id, rows, chunk_size):
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(chunk))
+        cursor.execute(f"""
+            INSERT INTO risk_scores
+                (student_id, course_id, attendance_pct, latest_gpa, gpa_trend, arrears,
+                 score, risk_level, run_id)
+            VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE
+                course_id = VALUES(course_id), attendance_pct = VALUES(attendance_pct),
+                latest_gpa = VALUES(latest_gpa), gpa_trend = VALUES(gpa_trend),
+                arrears = VALUES(arrears), score = VALUES(score),
+                risk_level = VALUES(risk_level), run_id = VALUES(run_id)
+        """, tuple(value for row in chunk for value in row + (run_id,)))
+
+
+def score_students(full=False, workers=None):
+    """Run the scoring pipeline; returns a summary dict
+
+    Falls back to a full run when there is no previous run to be
+    incremental against.
+    """
+    config = current_app.config
+    workers = workers or config.get('RISK_WORKERS') or None
+    started = time.perf_counter()
+    cursor = db.get_cursor()
+    
+    cursor.execute('SELECT NOW() AS now')
+    run_started = cursor.fetchone()['now']
+    cursor.execute('SELECT run_id FROM risk_score_runs ORDER BY run_id DESC LIMIT 1')
+    full = full or cursor.fetchone() is None
+    partitions = _partitions(cursor, full)
+    db.rollback()
+    
+    # Large incremental sets are split so each IN list stays bounded
+    backend = db.get_backend()
+    size = config.get('RISK_PARTITION_SIZE', 5000)
+    jobs = []
+    for course_id, student_ids in partitions.items():
+        if student_ids is None:
+            jobs.append((backend, course_id, None))
+            continue
+        for start in range(0, len(student_ids), size):
+            jobs.append((backend, course_id, student_ids[start:start + size]))
+    if workers == 1 or len(jobs) <= 1:
+        results = [_score_partition(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_score_partition, *zip(*jobs)))
+    rows = [row for result in results for row in result]
+    
+    cursor.execute("""
+        INSERT INTO risk_score_runs (started_at, mode) VALUES (%s, %s)
+    """, (run_started, 'full' if full else 'incremental'))
+    run_id = cursor.lastrowid
+    _write_scores(cursor, run_id, rows, config.get('RISK_CHUNK_SIZE', 1000))
+    if full:
+        # Students no longer active keep no stale score
+        cursor.execute('DELETE FROM risk_scores WHERE run_id <> %s', (run_id,))
+    else:
+        scored = {row[0] for row in rows}
+        stale = [student_id for ids in partitions.values() for student_id in ids
+                 if student_id not in scored]
+        if stale:
+            placeholders = ', '.join(['%s'] * len(stale))
+            cursor.execute(f'DELETE FROM risk_scores WHERE student_id IN ({placeholders})',
+                           tuple(stale))
+    # Changes flagged after this run started stay queued for the next one
+    cursor.execute('DELETE FROM student_changes WHERE changed_at < %s', (run_started,))
+    cursor.execute("""
+        UPDATE risk_score_runs SET finished_at = NOW(), students_scored = %s WHERE run_id = %s
+    """, (len(rows), run_id))
+    db.commit()
+    
+    levels = {}
+    for row in rows:
+        levels[row[-1]] = levels.get(row[-1], 0) + 1
+    return {
+        'run_id': run_id,
+        'mode': 'full' if full else 'incremental',
+        'courses': len(partitions),
+        'students_scored': len(rows),
+        'levels': levels,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def at_risk_students(cursor, level=None, course_id=None, limit=100):
+    """Highest-scoring students from the last runs, optionally filtered"""
+    clauses, params = [], []
+    if level is not None:
+        clauses.append('r.risk_level = %s')
+        params.append(level)
+    if course_id is not None:
+        clauses.append('r.course_id = %s')
+        params.append(course_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    cursor.execute(f"""
+        SELECT r.student_id, st.enrollment_number, st.first_name, st.last_name,
+               r.course_id, r.attendance_pct, r.latest_gpa, r.gpa_trend, r.arrears,
+               r.score, r.risk_level
+        FROM risk_scores r
+        JOIN students st ON r.student_id = st.student_id
+        {where}
+        ORDER BY r.score DESC
+        LIMIT %s
+    """, tuple(params) + (limit,))
+    return cursor.fetchall()
@@ -0,0 +1,272 @@
+"""DDL for the UniHub schema documented in script.py
+
+Statements are written in MySQL syntax; unihub.backends translates them for
+SQLite. Secondary indexes are declared inline (INDEX name (columns)) so the
+same text works for both engines.
+"""
+
+import re
+
+from unihub.attendance import CREATE_CALENDAR_TABLE, CREATE_SUMMARY_TABLE
+from unihub.changes import CREATE_CHANGES_TABLE, CREATE_VERSIONS_TABLE
+from unihub.fees import CREATE_LEDGER_TABLE
+from unihub.grades import CREATE_ROLLUP_TABLES
+from unihub.sessions import CREATE_SESSIONS_TABLE
+
+TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INT PRIMARY KEY AUTO_INCREMENT,
+        username VARCHAR(50) NOT NULL UNIQUE,
+        email VARCHAR(100) NOT NULL UNIQUE,
+        password_hash VARCHAR(255) NOT NULL,
+        user_type ENUM('student', 'faculty', 'admin') NOT NULL,
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_login TIMESTAMP NULL,
+        INDEX idx_user_email (email)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS courses (
+        course_id INT PRIMARY KEY AUTO_INCREMENT,
+        course_code VARCHAR(20) NOT NULL UNIQUE,
+        course_name VARCHAR(100) NOT NULL,
+        department VARCHAR(100) NOT NULL,
+        duration_years INT NOT NULL,
+        total_semesters INT NOT NULL,
+        description TEXT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS students (
+        student_id INT PRIMARY KEY AUTO_INCREMENT,
+        user_id INT UNIQUE,
+        enrollment_number VARCHAR(20) NOT NULL UNIQUE,
+        first_name VARCHAR(50) NOT NULL,
+        last_name VARCHAR(50) NOT NULL,
+        profile_photo VARCHAR(255) NULL,
+        date_of_birth DATE NOT NULL,
+        gender ENUM('Male', 'Female', 'Other') NOT NULL,
+        phone VARCHAR(15) NULL,
+        address TEXT NULL,
+        course_id INT,
+        semester INT NOT NULL,
+        admission_date DATE NOT NULL,
+        status ENUM('Active', 'Inactive', 'Graduated') DEFAULT 'Active',
+        FOREIGN KEY (user_id) REFERENCES users(user_id),
+        FOREIGN KEY (course_id) REFERENCES courses(course_id),
+        INDEX idx_student_enrollment (enrollment_number)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS subjects (
+        subject_id INT PRIMARY KEY AUTO_INCREMENT,
+        subject_code VARCHAR(20) NOT NULL UNIQUE,
+        subject_name VARCHAR(100) NOT NULL,
+        course_id INT,
+        semester INT NOT NULL,
+        credits INT NOT NULL,
+        max_marks_internal INT DEFAULT 30,
+        max_marks_external INT DEFAULT 70,
+        description TEXT NULL,
+        FOREIGN KEY (course_id) REFERENCES courses(course_id),
+        INDEX idx_subject_semester (subject_id, semester)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS attendance (
+        attendance_id INT PRIMARY KEY AUTO_INCREMENT,
+        student_id INT,
+        subject_id INT,
+        attendance_date DATE NOT NULL,
+        status ENUM('Present', 'Absent', 'Late') NOT NULL,
+        marked_by INT,
+        remarks TEXT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY (student_id, subject_id, attendance_date),
+        FOREIGN KEY (student_id) REFERENCES students(student_id),
+        FOREIGN KEY (subject_id) REFERENCES subjects(subject_id),
+        FOREIGN KEY (marked_by) REFERENCES users(user_id),
+        INDEX idx_attendance_date (attendance_date),
+        INDEX idx_attendance_student_date (student_id, attendance_date)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS grades (
+        grade_id INT PRIMARY KEY AUTO_INCREMENT,
+        student_id INT,
+        subject_id INT,
+        internal_marks DECIMAL(5,2) NULL,
+        external_marks DECIMAL(5,2) NULL,
+        total_marks DECIMAL(5,2) NULL,
+        grade VARCHAR(2) NULL,
+        grade_points DECIMAL(3,2) NULL,
+        semester INT NOT NULL,
+        academic_year VARCHAR(10) NOT NULL,
+        status ENUM('Pass', 'Fail', 'Pending') NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY (student_id, subject_id, semester, academic_year),
+        FOREIGN KEY (student_id) REFERENCES students(student_id),
+        FOREIGN KEY (subject_id) REFERENCES subjects(subject_id),
+        INDEX idx_grades_student_semester (student_id, semester)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS internships (
+        internship_id INT PRIMARY KEY AUTO_INCREMENT,
+        student_id INT,
+        company_name VARCHAR(100) NOT NULL,
+        position VARCHAR(100) NOT NULL,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        duration_months INT NOT NULL,
+        description TEXT NULL,
+        credits_earned INT DEFAULT 0,
+        certificate_path VARCHAR(255) NULL,
+        status ENUM('Ongoing', 'Completed', 'Verified') DEFAULT 'Ongoing',
+        verified_by INT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (student_id) REFERENCES students(student_id),
+        FOREIGN KEY (verified_by) REFERENCES users(user_id),
+        INDEX idx_internships_student_start (student_id, start_date)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fee_structure (
+        fee_structure_id INT PRIMARY KEY AUTO_INCREMENT,
+        course_id INT,
+        semester INT NOT NULL,
+        tuition_fee DECIMAL(10,2) NOT NULL,
+        library_fee DECIMAL(10,2) DEFAULT 0,
+        lab_fee DECIMAL(10,2) DEFAULT 0,
+        other_fee DECIMAL(10,2) DEFAULT 0,
+        total_fee DECIMAL(10,2) NOT NULL,
+        academic_year VARCHAR(10) NOT NULL,
+        UNIQUE KEY (course_id, semester, academic_year),
+        FOREIGN KEY (course_id) REFERENCES courses(course_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fee_payments (
+        payment_id INT PRIMARY KEY AUTO_INCREMENT,
+        student_id INT,
+        fee_structure_id INT,
+        amount_paid DECIMAL(10,2) NOT NULL,
+        payment_date DATE NOT NULL,
+        payment_method ENUM('Cash', 'Card', 'Online', 'Cheque') NOT NULL,
+        transaction_id VARCHAR(100) NULL UNIQUE,
+        receipt_number VARCHAR(50) NOT NULL UNIQUE,
+        status ENUM('Pending', 'Completed', 'Failed') DEFAULT 'Completed',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (student_id) REFERENCES students(student_id),
+        FOREIGN KEY (fee_structure_id) REFERENCES fee_structure(fee_structure_id),
+        INDEX idx_fee_payments_student_date (student_id, payment_date)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS admin_notifications (
+        notification_id INT PRIMARY KEY AUTO_INCREMENT,
+        title VARCHAR(200) NOT NULL,
+        content TEXT NOT NULL,
+        type ENUM('Circular', 'Announcement', 'Alert') NOT NULL,
+        target_audience ENUM('All', 'Students', 'Faculty') DEFAULT 'All',
+        attachment_path VARCHAR(255) NULL,
+        created_by INT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_active BOOLEAN DEFAULT TRUE,
+        FOREIGN KEY (created_by) REFERENCES users(user_id)
+    )
+    """,
+    CREATE_SUMMARY_TABLE,
+    CREATE_CALENDAR_TABLE,
+) + CREATE_ROLLUP_TABLES + (
+    """
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        name VARCHAR(50) PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+    CREATE_SESSIONS_TABLE,
+    CREATE_CHANGES_TABLE,
+    CREATE_VERSIONS_TABLE,
+    CREATE_LEDGER_TABLE,
+    """
+    CREATE TABLE IF NOT EXISTS risk_score_runs (
+        run_id INT PRIMARY KEY AUTO_INCREMENT,
+        started_at TIMESTAMP NOT NULL,
+        finished_at TIMESTAMP NULL,
+        mode ENUM('full', 'incremental') NOT NULL,
+        students_scored INT NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS risk_scores (
+        student_id INT NOT NULL PRIMARY KEY,
+        course_id INT NOT NULL,
+        attendance_pct DECIMAL(5,2) NULL,
+        latest_gpa DECIMAL(4,2) NULL,
+        gpa_trend DECIMAL(5,2) NOT NULL DEFAULT 0,
+        arrears DECIMAL(10,2) NOT NULL DEFAULT 0,
+        score DECIMAL(5,2) NOT NULL,
+        risk_level ENUM('Low', 'Medium', 'High') NOT NULL,
+        run_id INT NOT NULL,
+        INDEX idx_risk_scores_level (risk_level, score)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dispatch_jobs (
+        job_id INT PRIMARY KEY AUTO_INCREMENT,
+        kind ENUM('notification', 'fee_reminder') NOT NULL,
+        reference_id INT NULL,
+        subject VARCHAR(200) NOT NULL,
+        status ENUM('Queued', 'Running', 'Done', 'Failed') NOT NULL DEFAULT 'Queued',
+        recipients INT NOT NULL DEFAULT 0,
+        sent INT NOT NULL DEFAULT 0,
+        failed INT NOT NULL DEFAULT 0,
+        created_by INT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dispatch_deliveries (
+        job_id INT NOT NULL,
+        user_id INT NOT NULL,
+        address VARCHAR(100) NOT NULL,
+        status ENUM('Pending', 'Sent', 'Failed') NOT NULL DEFAULT 'Pending',
+        attempts INT NOT NULL DEFAULT 0,
+        last_error VARCHAR(255) NULL,
+        sent_at TIMESTAMP NULL,
+        PRIMARY KEY (job_id, user_id),
+        INDEX idx_dispatch_deliveries_status (job_id, status)
+    )
+    """,
+)
+
+
+def table_name(statement):
+    """Table created by a CREATE TABLE statement"""
+    return re.search(r'CREATE TABLE (?:IF NOT EXISTS )?(\w+)', statement).group(1)
+
+
+def _conflict_key(statement):
+    """Columns an upsert on this table conflicts on
+
+    The first composite UNIQUE KEY wins, then a table-level PRIMARY KEY, then a
+    non auto-increment inline PRIMARY KEY column.
+    """
+    unique = re.search(r'UNIQUE KEY \(([^)]*)\)', statement)
+    if unique:
+        return unique.group(1)
+    primary = re.search(r'^\s*PRIMARY KEY \(([^)]*)\)', statement, re.MULTILINE)
+    if primary:
+        return primary.group(1)
+    inline = re.search(r'^\s*(\w+) [^,\n]*PRIMARY KEY(?![^,\n]*AUTO_INCREMENT)', statement, re.MULTILINE)
+    return inline.group(1) if inline else None
+
+
+CONFLICT_KEYS = {
+    table_name(statement): _conflict_key(statement)
+    for statement in TABLES
+}
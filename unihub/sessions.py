@@ -0,0 +1,283 @@
+"""Server-side sessions: the cookie carries only an opaque session ID
+
+Session data lives in a SessionStore (in-memory for single-process runs,
+or the user_sessions table through the connection pool). Records are
+stored in a compact positional format, expiry slides forward on use, and
+expired records are removed in bulk sweeps. Because the data stays on the
+server, revoke_user_sessions() can sign a user out everywhere.
+"""
+
+import json
+import secrets
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+CREATE_SESSIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS user_sessions (
+        session_id VARCHAR(64) PRIMARY KEY,
+        user_id INT NULL,
+        data VARCHAR(1024) NOT NULL,
+        expires_at BIGINT NOT NULL,
+        INDEX idx_user_sessions_user (user_id),
+        INDEX idx_user_sessions_expiry (expires_at)
+    )
+"""
+
+# Keys stored by position; anything else goes in a trailing dict. Only
+# append: records written before a key was added still decode.
+RECORD_KEYS = ('loggedin', 'user_id', 'student_id', 'enrollment_number', 'name', 'user_type')
+
+
+def encode_record(data):
+    """Serialize session data as a compact JSON array"""
+    record = [data.get(key) for key in RECORD_KEYS]
+    extras = {key: value for key, value in data.items() if key not in RECORD_KEYS}
+    if extras:
+        record.append(extras)
+    else:
+        while record and record[-1] is None:
+            record.pop()
+    return json.dumps(record, separators=(',', ':'))
+
+
+def decode_record(raw):
+    """Inverse of encode_record"""
+    record = json.loads(raw)
+    data = {}
+    if record and isinstance(record[-1], dict):
+        data.update(record.pop())
+    for key, value in zip(RECORD_KEYS, record):
+        if value is not None:
+            data[key] = value
+    return data
+
+
+class MemorySessionStore:
+    """Process-local store; sessions do not survive restarts or span workers"""
+
+    def __init__(self):
+        self._records = {}  # session_id -> (user_id, data, expires_at)
+        self._lock = threading.Lock()
+
+    def load(self, session_id, now):
+        record = self._records.get(session_id)
+        if record is None or record[2] <= now:
+            return None
+        return record[1], record[2]
+
+    def save(self, session_id, user_id, data, expires_at):
+        with self._lock:
+            self._records[session_id] = (user_id, data, expires_at)
+
+    def touch(self, session_id, expires_at):
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is not None:
+                self._records[session_id] = (record[0], record[1], expires_at)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._records.pop(session_id, None)
+
+    def revoke_user(self, user_id):
+        with self._lock:
+            doomed = [sid for sid, record in self._records.items() if record[0] == user_id]
+            for sid in doomed:
+                del self._records[sid]
+        return len(doomed)
+
+    def sweep(self, now):
+        with self._lock:
+            expired = [sid for sid, record in self._records.items() if record[2] <= now]
+            for sid in expired:
+                del self._records[sid]
+        return len(expired)
+
+
+class SqlSessionStore:
+    """user_sessions table accessed through the application's connection pool
+
+    Each call checks out its own connection so session writes never commit
+    a route's unfinished transaction.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def _run(self, sql, params, fetch=False):
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            result = cursor.fetchone() if fetch else cursor.rowcount
+            conn.commit()
+        except Exception:
+            self.pool.release(conn, discard=True)
+            raise
+        self.pool.release(conn)
+        return result
+
+    def load(self, session_id, now):
+        row = self._run("""
+            SELECT data, expires_at FROM user_sessions
+            WHERE session_id = %s AND expires_at > %s
+        """, (session_id, now), fetch=True)
+        return (row['data'], row['expires_at']) if row else None
+
+    def save(self, session_id, user_id, data, expires_at):
+        self._run("""
+            INSERT INTO user_sessions (session_id, user_id, data, expires_at)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                user_id = VALUES(user_id), data = VALUES(data), expires_at = VALUES(expires_at)
+        """, (session_id, user_id, data, expires_at))
+
+    def touch(self, session_id, expires_at):
+        self._run('UPDATE user_sessions SET expires_at = %s WHERE session_id = %s',
+                  (expires_at, session_id))
+
+    def delete(self, session_id):
+        self._run('DELETE FROM user_sessions WHERE session_id = %s', (session_id,))
+
+    def revoke_user(self, user_id):
+        return self._run('DELETE FROM user_sessions WHERE user_id = %s', (user_id,))
+
+    def sweep(self, now):
+        return self._run('DELETE FROM user_sessions WHERE expires_at <= %s', (now,))
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its ID and when it was last modified"""
+
+    def __init__(self, initial=None, session_id=None, expires_at=0):
+        def on_update(self):
+            self.modified = True
+        
+        super().__init__(initial, on_update)
+        self.session_id = session_id
+        self.expires_at = expires_at
+        self.previous_id = None
+        self.modified = False
+
+    def regenerate(self):
+        """Issue a new ID on next save (call at login to prevent session fixation)"""
+        if self.session_id is not None:
+            self.previous_id = self.session_id
+            self.session_id = None
+        self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface backed by a SessionStore
+
+    idle_timeout is the sliding expiry in seconds. The stored expiry is only
+    extended once touch_interval seconds have passed since the last
+    extension, so read-only requests do not write on every hit. Expired
+    records are swept at most every sweep_interval seconds per process.
+    """
+
+    def __init__(self, store, idle_timeout=1800, touch_interval=60, sweep_interval=300):
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.touch_interval = touch_interval
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def _maybe_sweep(self, now):
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + self.sweep_interval
+            self.store.sweep(int(now))
+        finally:
+            self._sweep_lock.release()
+
+    def open_session(self, app, request):
+        now = time.time()
+        self._maybe_sweep(now)
+        session_id = request.cookies.get(self.get_cookie_name(app))
+        if session_id:
+            record = self.store.load(session_id, int(now))
+            if record is not None:
+                data, expires_at = record
+                return ServerSession(decode_record(data), session_id, expires_at)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        
+        if session.previous_id is not None:
+            self.store.delete(session.previous_id)
+        
+        if not session:
+            if session.session_id is not None and session.modified:
+                self.store.delete(session.session_id)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        
+        now = int(time.time())
+        expires_at = now + self.idle_timeout
+        if session.session_id is None:
+            session.session_id = secrets.token_urlsafe(32)
+        elif not session.modified:
+            # Slide the expiry forward, but at most once per touch_interval
+            if session.expires_at - now <= self.idle_timeout - self.touch_interval:
+                self.store.touch(session.session_id, expires_at)
+            return
+        
+        self.store.save(session.session_id, session.get('user_id'), encode_record(session), expires_at)
+        response.set_cookie(
+            name,
+            session.session_id,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def init_app(app):
+    """Install server-side sessions unless SESSION_BACKEND is 'cookie'"""
+    app.config.setdefault('SESSION_BACKEND', 'sql')  # 'sql', 'memory' or 'cookie'
+    app.config.setdefault('SESSION_IDLE_TIMEOUT', 1800)
+    app.config.setdefault('SESSION_TOUCH_INTERVAL', 60)
+    app.config.setdefault('SESSION_SWEEP_INTERVAL', 300)
+    
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'cookie':
+        return
+    if backend == 'memory':
+        store = MemorySessionStore()
+    elif backend == 'sql':
+        store = SqlSessionStore(app.extensions['db_pool'])
+    else:
+        raise ValueError(f'Unknown SESSION_BACKEND: {backend!r}')
+    
+    app.session_interface = ServerSessionInterface(
+        store,
+        idle_timeout=app.config['SESSION_IDLE_TIMEOUT'],
+        touch_interval=app.config['SESSION_TOUCH_INTERVAL'],
+        sweep_interval=app.config['SESSION_SWEEP_INTERVAL'],
+    )
+
+
+def rotate_session(session):
+    """Start a fresh session ID before storing login state"""
+    if isinstance(session, ServerSession):
+        session.regenerate()
+    session.clear()
+
+
+def revoke_user_sessions(app, user_id):
+    """Sign a user out of every session; returns the number removed"""
+    if not isinstance(app.session_interface, ServerSessionInterface):
+        raise RuntimeError('Cookie sessions cannot be revoked server-side')
+    return app.session_interface.store.revoke_user(user_id)
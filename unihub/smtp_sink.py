@@ -0,0 +1,121 @@
+"""Local SMTP sink for exercising the notification dispatcher
+
+Speaks just enough SMTP (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+to accept messages from smtplib on a local port. Messages are counted and
+optionally kept in memory or appended to an mbox-style file; nothing is
+relayed. fail_every makes every Nth message fail with a 451 reply to
+exercise retries.
+"""
+
+import socketserver
+import threading
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        sink = self.server.sink
+        with sink._lock:
+            sink.connections += 1
+        self.reply('220 unihub-sink ESMTP')
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb == 'EHLO':
+                self.reply('250-unihub-sink')
+                self.reply('250 8BITMIME')
+            elif verb == 'HELO':
+                self.reply('250 unihub-sink')
+            elif verb == 'MAIL':
+                sender, recipients = command[10:].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command[8:].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data[1:] if data.startswith(b'..') else data)
+                if sink.accept(sender, recipients, b''.join(lines)):
+                    self.reply('250 OK queued')
+                else:
+                    self.reply('451 Temporary failure, try again')
+                sender, recipients = None, []
+            elif verb == 'RSET':
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """Threaded SMTP server that swallows mail; use start()/stop() or a with block"""
+
+    def __init__(self, host='127.0.0.1', port=1025, keep=False, mbox_path=None, fail_every=0):
+        self.keep = keep
+        self.mbox_path = mbox_path
+        self.fail_every = fail_every
+        self.received = 0
+        self.rejected = 0
+        self.connections = 0
+        self.messages = []
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def accept(self, sender, recipients, data):
+        with self._lock:
+            if self.fail_every and (self.received + self.rejected + 1) % self.fail_every == 0:
+                self.rejected += 1
+                return False
+            self.received += 1
+            if self.keep:
+                self.messages.append((sender, recipients, data))
+            if self.mbox_path:
+                with open(self.mbox_path, 'ab') as mbox:
+                    mbox.write(b'From ' + sender.encode() + b'\n' + data + b'\n')
+        return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
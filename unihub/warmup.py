@@ -0,0 +1,74 @@
+"""Cache warm-up before a server starts taking requests
+
+warm_up() compiles every template and fills the caches the first requests
+would otherwise fill one miss at a time: the notification feed of each
+audience, the student/subject ID maps used by imports, and the profiles of
+active students (up to PROFILE_CACHE_SIZE). With WARMUP_ANALYTICS it also
+loads the cohort analytics snapshots.
+
+unihub.wsgi runs it at import, which under gunicorn's preload_app is in
+the master: every worker forks with warm caches and compiled templates,
+shared copy-on-write, including workers recycled by max_requests.
+Afterwards the pool's idle connections are closed so no database socket
+is inherited by several workers; each worker then opens its own
+DB_POOL_MIN_SIZE connections with warm_pool() (gunicorn's post_fork hook),
+so its first requests do not pay the connect cost.
+"""
+
+import logging
+import time
+
+from unihub import analytics, db, imports
+from unihub.notifications import AUDIENCES, get_feed
+from unihub.profiles import warm_profiles
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up(app):
+    """Fill the process's caches; returns what was loaded and how long it took"""
+    started = time.perf_counter()
+    report = {}
+    
+    environment = app.jinja_env
+    names = environment.list_templates()
+    for name in names:
+        environment.get_template(name)
+    report['templates'] = len(names)
+    
+    with app.app_context():
+        for audience in AUDIENCES:
+            get_feed(audience)
+        report['feeds'] = len(AUDIENCES)
+        report['students'] = len(imports.student_ids()['ids'])
+        report['subjects'] = len(imports.subject_ids()['ids'])
+        report['profiles'] = warm_profiles(db.get_cursor(), app.config['PROFILE_CACHE_SIZE'])
+        if app.config['WARMUP_ANALYTICS']:
+            stats = analytics.get_analytics(refresh=True).stats()
+            report['analytics_rows'] = stats['attendance_rows'] + stats['grade_rows']
+    
+    # The app context has returned its connection; drop it and any other idle ones
+    app.extensions['db_pool'].close()
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    logger.info('Warm-up: %s', report)
+    return report
+
+
+def warm_pool(app):
+    """Open the pool's min_size connections; returns how many are idle
+
+    Call once per worker after fork. If the database is unreachable the
+    worker still starts and connects on demand.
+    """
+    pool = app.extensions['db_pool']
+    try:
+        pool.fill()
+    except Exception:
+        logger.warning('Could not pre-open database connections', exc_info=True)
+    return pool.stats()['idle']
+
+
+def init_app(app):
+    """Defaults for the warm-up settings"""
+    app.config.setdefault('PROFILE_CACHE_SIZE', 10000)
+    app.config.setdefault('WARMUP_ANALYTICS', False)
@@ -0,0 +1,153 @@
+"""Write-behind buffering for high-frequency, loss-tolerant column updates
+
+Logins record last_login here instead of committing an UPDATE on the
+request path. A background thread writes the buffered timestamps as one
+batched statement every WRITE_BEHIND_INTERVAL seconds, or sooner once
+WRITE_BEHIND_MAX_ENTRIES users are pending. The buffer is flushed again at
+interpreter exit so a graceful restart loses nothing.
+"""
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Coalesces key -> value updates in memory and hands them to flush() in batches
+
+    flush is called with a dict of pending updates from the flusher thread.
+    If it raises, the batch is merged back (newer values win) and retried on
+    the next interval.
+    """
+
+    def __init__(self, flush, interval=5.0, max_entries=500, name='write-behind'):
+        self._flush = flush
+        self.interval = interval
+        self.max_entries = max_entries
+        self.name = name
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self.flushes = 0
+        self.flushed_entries = 0
+        self.failures = 0
+
+    def _ensure_thread(self):
+        # Started on first use so the thread is created in the worker, not
+        # in a preloading parent that forks afterwards
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def record(self, key, value):
+        """Queue an update; the latest value per key wins"""
+        with self._lock:
+            self._pending[key] = value
+            full = len(self._pending) >= self.max_entries
+            self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write everything pending now; returns the number of entries written"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            self._flush(batch)
+        except Exception:
+            self.failures += 1
+            logger.exception('%s flush of %d entries failed; will retry', self.name, len(batch))
+            with self._lock:
+                batch.update(self._pending)
+                self._pending = batch
+            return 0
+        self.flushes += 1
+        self.flushed_entries += len(batch)
+        return len(batch)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the flusher thread and write whatever is still pending"""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 1)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'flushes': self.flushes,
+            'flushed_entries': self.flushed_entries,
+            'failures': self.failures,
+        }
+
+
+def _flush_last_login(pool, batch):
+    """One UPDATE ... CASE statement setting last_login for every buffered user"""
+    user_ids = list(batch)
+    cases = ' '.join(['WHEN %s THEN %s'] * len(user_ids))
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    params = []
+    for user_id in user_ids:
+        params.extend((user_id, batch[user_id]))
+    params.extend(user_ids)
+    
+    conn = pool.acquire()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f'UPDATE users SET last_login = CASE user_id {cases} END '
+            f'WHERE user_id IN ({placeholders})',
+            tuple(params),
+        )
+        conn.commit()
+    except Exception:
+        pool.release(conn, discard=True)
+        raise
+    pool.release(conn)
+
+
+def init_app(app):
+    """Create the last_login buffer on the application's connection pool"""
+    app.config.setdefault('WRITE_BEHIND_INTERVAL', 5.0)
+    app.config.setdefault('WRITE_BEHIND_MAX_ENTRIES', 500)
+    
+    pool = app.extensions['db_pool']
+    buffer = WriteBehindBuffer(
+        lambda batch: _flush_last_login(pool, batch),
+        interval=app.config['WRITE_BEHIND_INTERVAL'],
+        max_entries=app.config['WRITE_BEHIND_MAX_ENTRIES'],
+        name='last-login-writer',
+    )
+    app.extensions['last_login_buffer'] = buffer
+    atexit.register(buffer.close)
+
+
+def record_login(user_id, when=None):
+    """Buffer a user's last_login timestamp (server local time, like NOW())"""
+    when = when or datetime.now()
+    current_app.extensions['last_login_buffer'].record(
+        user_id, when.strftime('%Y-%m-%d %H:%M:%S')
+    )
+
+
+def flush_logins():
+    """Write buffered last_login timestamps immediately"""
+    return current_app.extensions['last_login_buffer'].flush()
@@ -0,0 +1,13 @@
+"""Production WSGI entry point
+
+    gunicorn -c gunicorn.conf.py unihub.wsgi:app
+
+Importing this module warms the caches (see unihub.warmup), so a server
+that preloads it forks workers that are ready for traffic. `flask run` and
+`python -m unihub.app` remain the development servers.
+"""
+
+from unihub.app import app
+from unihub.warmup import warm_up
+
+warmup_report = warm_up(app)